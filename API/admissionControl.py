@@ -0,0 +1,168 @@
+import os
+import json
+import asyncio
+import logging
+import contextvars
+from typing import Dict, Optional
+
+from mysql.connector import Error
+from starlette.routing import Match
+
+logger = logging.getLogger("admissionControl")
+
+# -----------------------------------------------------------------
+# Admission Control and Backpressure
+# -----------------------------------------------------------------
+# Requests are admitted per route class, each with its own concurrency limit
+# and bounded wait queue:
+#
+#   lookup  GET routes with path parameters (/employees/{employee_id}, ...)
+#   scan    other GET routes: lists, filters, KPIs
+#   write   every other method
+#
+# A request that finds its class's queue full is rejected at once with 429;
+# one that waited longer than the class allows gets 503. Both carry
+# Retry-After, so ETL clients back off instead of piling up. A flood of
+# scans therefore queues behind the scan limit while lookups keep their own
+# slots. ADMISSION_LIMITS overrides the defaults, as
+# "class=concurrency:queue:wait_seconds", comma separated.
+#
+# SELECTs run while a lookup or scan is being served also get a server-side
+# time limit (the session's max_execution_time, in milliseconds), so an
+# expensive scan is cut off by MySQL rather than holding a connection.
+# 0 disables the limit. It is set on the connection when a request leases
+# it, and only when it differs from what the session already has; the SQL
+# text is left alone, so prepared statements stay prepared whatever the
+# class of the request running them.
+ADMISSION_LIMITS = os.getenv("ADMISSION_LIMITS", "lookup=24:256:1,scan=4:16:10,write=8:64:5")
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+LOOKUP_MAX_EXECUTION_MS = int(os.getenv("LOOKUP_MAX_EXECUTION_MS", "2000"))
+SCAN_MAX_EXECUTION_MS = int(os.getenv("SCAN_MAX_EXECUTION_MS", "30000"))
+
+MAX_EXECUTION_MS = {"lookup": LOOKUP_MAX_EXECUTION_MS, "scan": SCAN_MAX_EXECUTION_MS}
+EXEMPT_PATHS = ("/metrics", "/ready", "/token", "/docs", "/redoc", "/openapi.json")
+
+current_max_execution_ms: contextvars.ContextVar[int] = contextvars.ContextVar("current_max_execution_ms", default=0)
+
+def parse_limits(value: str) -> Dict[str, tuple]:
+    limits = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, spec = item.partition("=")
+        concurrency, queue, wait = spec.split(":")
+        limits[name.strip()] = (int(concurrency), int(queue), float(wait))
+    return limits
+
+def apply_execution_limit(cnx):
+    """Set the session's max_execution_time to the current request's limit, unless it already is."""
+    ms = current_max_execution_ms.get()
+    raw = getattr(cnx, "_cnx", cnx)  # the pooled connection's session
+    if getattr(raw, "_max_execution_ms", None) == (raw.connection_id, ms):
+        return
+    try:
+        cursor = cnx.cursor()
+        cursor.execute("SET SESSION max_execution_time = %s", (ms,))
+        cursor.close()
+    except Error as e:
+        logger.warning(f"Could not set max_execution_time: {e}")
+    # Keyed by connection id: a reconnect starts from the server default.
+    raw._max_execution_ms = (raw.connection_id, ms)
+
+class AdmissionQueue:
+    def __init__(self, name: str, concurrency: int, queue: int, wait: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.wait = wait
+        self.active = 0
+        self.waiting = 0
+        self.slots: Optional[asyncio.Semaphore] = None
+
+    async def acquire(self) -> Optional[int]:
+        """None once admitted, otherwise the status to reject with."""
+        if self.slots is None:
+            # Created on first use, inside the worker's event loop.
+            self.slots = asyncio.Semaphore(self.concurrency)
+        if self.slots.locked():
+            if self.waiting >= self.queue:
+                return 429
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self.slots.acquire(), self.wait)
+            except asyncio.TimeoutError:
+                return 503
+            finally:
+                self.waiting -= 1
+        else:
+            await self.slots.acquire()
+        self.active += 1
+        return None
+
+    def release(self):
+        self.active -= 1
+        self.slots.release()
+
+class AdmissionControlMiddleware:
+    def __init__(self, app, routes, limits: str = ADMISSION_LIMITS):
+        self.app = app
+        self.routes = routes
+        self.queues = {name: AdmissionQueue(name, *spec) for name, spec in parse_limits(limits).items()}
+
+    def route_class(self, scope) -> Optional[str]:
+        # Under the gateway's mounts the path may still carry the mount prefix
+        path, root_path = scope["path"], scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        if path in EXEMPT_PATHS or path.startswith("/admin/"):
+            return None
+        if scope["method"] not in ("GET", "HEAD"):
+            return "write"
+        for route in self.routes:
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                return "lookup" if child_scope.get("path_params") else "scan"
+        return None  # unknown path: let the router answer 404
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        queue = self.queues.get(self.route_class(scope))
+        if queue is None:
+            await self.app(scope, receive, send)
+            return
+
+        rejected = await queue.acquire()
+        if rejected is not None:
+            await self.reject(send, rejected, queue)
+            return
+        token = current_max_execution_ms.set(MAX_EXECUTION_MS.get(queue.name, 0))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_max_execution_ms.reset(token)
+            queue.release()
+
+    @staticmethod
+    async def reject(send, status: int, queue: AdmissionQueue):
+        detail = "Too many queued requests" if status == 429 else "Timed out waiting for capacity"
+        body = json.dumps({"detail": f"{detail} ({queue.name})"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(ADMISSION_RETRY_AFTER_SECONDS).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+def install_admission_control(app, limits: str = ADMISSION_LIMITS):
+    """Limit concurrent requests to `app` per route class.
+
+    Install before single-flight, so coalesced followers do not take a slot.
+    """
+    app.add_middleware(AdmissionControlMiddleware, routes=app.router.routes, limits=limits)
@@ -0,0 +1,263 @@
+import time
+import threading
+import contextvars
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+# -----------------------------------------------------------------
+# Per-Request Accounting
+# -----------------------------------------------------------------
+# The middleware puts a RequestStats object into a context variable for the
+# duration of each request. Starlette copies the context into the thread
+# that runs sync endpoints, so DB helpers and encoders can add to the same
+# object wherever they run.
+class RequestStats:
+    __slots__ = ("scope", "db_seconds", "serialize_seconds", "rows",
+                 "compress_seconds", "compress_in_bytes", "compress_out_bytes")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.rows = 0
+        self.compress_seconds = 0.0
+        self.compress_in_bytes = 0
+        self.compress_out_bytes = 0
+
+    @property
+    def route(self) -> Optional[str]:
+        # The router stores the matched route in the scope before calling the
+        # endpoint; report its template (e.g. /employees/{employee_id}).
+        return getattr(self.scope.get("route"), "path", None)
+
+current_stats: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("current_stats", default=None)
+
+@contextmanager
+def db_timer():
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = current_stats.get()
+        if stats is not None:
+            stats.db_seconds += time.perf_counter() - start
+
+@contextmanager
+def serialize_timer():
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = current_stats.get()
+        if stats is not None:
+            stats.serialize_seconds += time.perf_counter() - start
+
+def add_rows(count: int):
+    stats = current_stats.get()
+    if stats is not None:
+        stats.rows += count
+
+def add_compression(in_bytes: int, out_bytes: int, cpu_seconds: float):
+    stats = current_stats.get()
+    if stats is not None:
+        stats.compress_in_bytes += in_bytes
+        stats.compress_out_bytes += out_bytes
+        stats.compress_seconds += cpu_seconds
+
+def current_route() -> Optional[str]:
+    stats = current_stats.get()
+    return stats.route if stats is not None else None
+
+# Observers are called as observer(cursor, query, params, elapsed_seconds)
+# after every statement run through timed_execute, even if it raised.
+_query_observers: List[Callable] = []
+
+def add_query_observer(observer: Callable):
+    _query_observers.append(observer)
+
+def timed_execute(cursor, query: str, params: tuple = ()):
+    start = time.perf_counter()
+    try:
+        cursor.execute(query, params)
+    finally:
+        elapsed = time.perf_counter() - start
+        stats = current_stats.get()
+        if stats is not None:
+            stats.db_seconds += elapsed
+        for observer in _query_observers:
+            observer(cursor, query, params, elapsed)
+
+# -----------------------------------------------------------------
+# Metric Storage
+# -----------------------------------------------------------------
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUANTILES = (0.5, 0.95, 0.99)
+QUANTILE_WINDOW = 2048  # most recent samples per route used for p50/p95/p99
+
+class RouteMetrics:
+    def __init__(self):
+        self.count = 0
+        self.latency_sum = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.recent = deque(maxlen=QUANTILE_WINDOW)
+        self.statuses: Dict[int, int] = {}
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.rows = 0
+        self.response_bytes = 0
+        self.compress_seconds = 0.0
+        self.compress_in_bytes = 0
+        self.compress_out_bytes = 0
+
+    def observe(self, status: int, elapsed: float, stats: RequestStats, body_bytes: int):
+        self.count += 1
+        self.latency_sum += elapsed
+        self.buckets[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+        self.recent.append(elapsed)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.db_seconds += stats.db_seconds
+        self.serialize_seconds += stats.serialize_seconds
+        self.rows += stats.rows
+        self.response_bytes += body_bytes
+        self.compress_seconds += stats.compress_seconds
+        self.compress_in_bytes += stats.compress_in_bytes
+        self.compress_out_bytes += stats.compress_out_bytes
+
+    def quantiles(self) -> Dict[float, float]:
+        samples = sorted(self.recent)
+        if not samples:
+            return {}
+        return {q: samples[min(len(samples) - 1, int(q * len(samples)))] for q in QUANTILES}
+
+class ServiceMetrics:
+    def __init__(self, service: str):
+        self.service = service
+        self.in_flight = 0
+        self.routes: Dict[tuple, RouteMetrics] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, method: str, route: str, status: int, elapsed: float, stats: RequestStats, body_bytes: int):
+        with self.lock:
+            metrics = self.routes.get((method, route))
+            if metrics is None:
+                metrics = self.routes[(method, route)] = RouteMetrics()
+            metrics.observe(status, elapsed, stats, body_bytes)
+
+    def render(self) -> str:
+        return render_metrics([self])
+
+FAMILIES = {
+    "api_request_duration_seconds": ("histogram", "Request latency."),
+    "api_request_latency_seconds": ("summary", "Request latency quantiles over recent requests."),
+    "api_requests_total": ("counter", "Requests by status code."),
+    "api_db_seconds_total": ("counter", "Time spent executing queries and fetching rows."),
+    "api_serialize_seconds_total": ("counter", "Time spent encoding response bodies."),
+    "api_rows_returned_total": ("counter", "Rows returned by list endpoints."),
+    "api_response_bytes_total": ("counter", "Response body bytes sent, after compression."),
+    "api_compress_cpu_seconds_total": ("counter", "CPU time spent compressing response bodies."),
+    "api_compress_input_bytes_total": ("counter", "Response bytes before compression."),
+    "api_compress_output_bytes_total": ("counter", "Response bytes after compression."),
+    "api_compression_ratio": ("gauge", "Input bytes over output bytes for compressed responses."),
+}
+
+def _route_samples(svc: str, method: str, route: str, m: RouteMetrics, samples: Dict[str, List[str]]):
+    labels = f'service="{svc}",method="{method}",route="{route}"'
+    out = samples["api_request_duration_seconds"]
+    cumulative = 0
+    for bound, count in zip(LATENCY_BUCKETS, m.buckets):
+        cumulative += count
+        out.append(f'api_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+    out.append(f'api_request_duration_seconds_bucket{{{labels},le="+Inf"}} {m.count}')
+    out.append(f"api_request_duration_seconds_sum{{{labels}}} {m.latency_sum}")
+    out.append(f"api_request_duration_seconds_count{{{labels}}} {m.count}")
+    out = samples["api_request_latency_seconds"]
+    for q, value in m.quantiles().items():
+        out.append(f'api_request_latency_seconds{{{labels},quantile="{q}"}} {value}')
+    out.append(f"api_request_latency_seconds_sum{{{labels}}} {m.latency_sum}")
+    out.append(f"api_request_latency_seconds_count{{{labels}}} {m.count}")
+    for status, count in sorted(m.statuses.items()):
+        samples["api_requests_total"].append(f'api_requests_total{{{labels},status="{status}"}} {count}')
+    if m.compress_out_bytes:
+        samples["api_compression_ratio"].append(
+            f"api_compression_ratio{{{labels}}} {m.compress_in_bytes / m.compress_out_bytes}")
+    for name, value in (
+        ("api_db_seconds_total", m.db_seconds),
+        ("api_serialize_seconds_total", m.serialize_seconds),
+        ("api_rows_returned_total", m.rows),
+        ("api_response_bytes_total", m.response_bytes),
+        ("api_compress_cpu_seconds_total", m.compress_seconds),
+        ("api_compress_input_bytes_total", m.compress_in_bytes),
+        ("api_compress_output_bytes_total", m.compress_out_bytes),
+    ):
+        samples[name].append(f"{name}{{{labels}}} {value}")
+
+def render_metrics(services: List[ServiceMetrics]) -> str:
+    """Prometheus text exposition format (version 0.0.4), each family once across all `services`."""
+    lines = [
+        "# HELP api_requests_in_flight Requests currently being served.",
+        "# TYPE api_requests_in_flight gauge",
+    ]
+    samples: Dict[str, List[str]] = {name: [] for name in FAMILIES}
+    for service in services:
+        lines.append(f'api_requests_in_flight{{service="{service.service}"}} {service.in_flight}')
+        with service.lock:
+            for (method, route), m in sorted(service.routes.items()):
+                _route_samples(service.service, method, route, m, samples)
+    for name, (kind, help_text) in FAMILIES.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples[name])
+    return "\n".join(lines) + "\n"
+
+# -----------------------------------------------------------------
+# ASGI Middleware
+# -----------------------------------------------------------------
+class MetricsMiddleware:
+    def __init__(self, app, metrics: ServiceMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = current_stats.set(stats)
+        status = 500
+        body_bytes = 0
+
+        async def send_wrapper(message):
+            nonlocal status, body_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                body_bytes += len(message.get("body", b""))
+            await send(message)
+
+        self.metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.metrics.in_flight -= 1
+            current_stats.reset(token)
+            route = stats.route or "unmatched"
+            self.metrics.observe(scope["method"], route, status, elapsed, stats, body_bytes)
+
+def install_metrics(app: FastAPI, service: str) -> ServiceMetrics:
+    """Instrument every route of `app` and expose the results on GET /metrics."""
+    metrics = ServiceMetrics(service)
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+    @app.get("/metrics", include_in_schema=False)
+    def get_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+    return metrics
@@ -0,0 +1,202 @@
+import os
+import json
+import asyncio
+from collections import defaultdict
+from typing import Callable, Dict, List, Literal, Optional, Tuple
+
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import compile_path
+
+from apiMetrics import add_rows, db_timer, serialize_timer, timed_execute
+from fastJson import dumps
+
+# -----------------------------------------------------------------
+# Batch Endpoint: Many GETs in One Round Trip
+# -----------------------------------------------------------------
+# POST /batch takes up to BATCH_MAX_REQUESTS sub-requests:
+#
+#   {"requests": [{"id": "c1", "path": "/courses/3"},
+#                 {"id": "c2", "path": "/courses/8"},
+#                 {"id": "e", "path": "/enrollments"}]}
+#
+# and answers {"responses": [{"id": ..., "status": ..., "body": ...}, ...]} in
+# the same order. Point lookups on a route registered with lookup() are
+# merged: all sub-requests for /courses/{course_id} become one
+# CourseID $in [...] query (or one SQL IN (...)). Every other sub-request is
+# dispatched through the app in-process, at most BATCH_CONCURRENCY at a
+# time, with the caller's Authorization header, so it behaves exactly like
+# the same GET sent on its own.
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "100"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+class SubRequest(BaseModel):
+    id: Optional[str] = None
+    method: Literal["GET"] = "GET"
+    path: str
+
+class BatchRequest(BaseModel):
+    requests: List[SubRequest]
+
+# -- lookup loaders: ids -> {id: row} ---------------------------------
+def sql_lookup(pools, select: str, key: str, model=None) -> Callable[[list], Dict]:
+    """Load rows of `select` (no WHERE clause) whose `key` column is among the ids, in one IN query.
+
+    With a model, rows are narrowed to its fields and TINYINT flags become
+    booleans, as the route's response_model would do.
+    """
+    fields = list(model.__fields__) if model is not None else None
+    flags = [name for name, field in model.__fields__.items() if field.type_ is bool] if model is not None else []
+
+    def load(ids: list) -> Dict:
+        placeholders = ", ".join(["%s"] * len(ids))
+        with pools.borrow(write=False) as cnx:
+            cursor = cnx.cursor(dictionary=True)
+            timed_execute(cursor, f"{select} WHERE {key} IN ({placeholders});", ids)
+            with db_timer():
+                rows = cursor.fetchall()
+            cursor.close()
+        by_key = {}
+        for row in rows:
+            if fields is not None:
+                row = {f: row.get(f) for f in fields}
+            for flag in flags:
+                if row[flag] is not None:
+                    row[flag] = bool(row[flag])
+            by_key.setdefault(row[key], row)  # the first row, as the single-row route returns
+        return by_key
+    return load
+
+def mongo_lookup(collection, key: str, model=None) -> Callable[[list], Dict]:
+    """Load documents whose `key` is among the ids, in one $in query."""
+    projection = {f: 1 for f in model.__fields__} if model is not None else {}
+    projection["_id"] = 0
+
+    def load(ids: list) -> Dict:
+        with db_timer():
+            documents = list(collection.find({key: {"$in": ids}}, projection))
+        return {document[key]: document for document in documents}
+    return load
+
+class Lookup:
+    def __init__(self, template: str, load: Callable[[list], Dict], not_found: str, key_type: type):
+        self.regex, _, _ = compile_path(template)
+        self.load = load
+        self.not_found = not_found
+        self.key_type = key_type
+
+    def match(self, path: str):
+        match = self.regex.match(path)
+        if match is None:
+            return None
+        try:
+            return self.key_type(next(iter(match.groupdict().values())))
+        except ValueError:
+            return None  # let the route itself answer with its 422
+
+class BatchHandler:
+    def __init__(self, app: FastAPI):
+        self.app = app
+        self.lookups: List[Lookup] = []
+
+    def lookup(self, template: str, load: Callable[[list], Dict], not_found: str = "Not found",
+               key_type: type = int):
+        """Merge batched GETs of `template` (one path parameter) into a single load(ids) call."""
+        self.lookups.append(Lookup(template, load, not_found, key_type))
+
+    def _plan(self, requests: List[SubRequest]):
+        merged = defaultdict(list)  # Lookup -> [(position, id)]
+        dispatched = []
+        for position, sub in enumerate(requests):
+            if "?" not in sub.path:
+                for lookup in self.lookups:
+                    key = lookup.match(sub.path)
+                    if key is not None:
+                        merged[lookup].append((position, key))
+                        break
+                else:
+                    dispatched.append(position)
+            else:
+                dispatched.append(position)
+        return merged, dispatched
+
+    async def _dispatch(self, request: Request, sub: SubRequest, slots: asyncio.Semaphore) -> Tuple[int, bytes, str]:
+        path, _, query = sub.path.partition("?")
+        headers = [(b"authorization", request.headers.get("authorization", "").encode("latin-1"))]
+        scope = {
+            "type": "http",
+            "asgi": request.scope.get("asgi", {"version": "3.0"}),
+            "http_version": request.scope.get("http_version", "1.1"),
+            "method": "GET",
+            "scheme": request.scope.get("scheme", "http"),
+            "server": request.scope.get("server"),
+            "client": request.scope.get("client"),
+            "root_path": request.scope.get("root_path", ""),
+            "path": path,
+            "raw_path": path.encode("utf-8"),
+            "query_string": query.encode("utf-8"),
+            "headers": headers,
+        }
+        status, body, content_type = 500, [], ""
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            nonlocal status, content_type
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"").decode("latin-1")
+            elif message["type"] == "http.response.body":
+                body.append(message.get("body", b""))
+
+        async with slots:
+            await self.app(scope, receive, send)
+        return status, b"".join(body), content_type
+
+    async def run(self, request: Request, batch: BatchRequest) -> Response:
+        if len(batch.requests) > BATCH_MAX_REQUESTS:
+            raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_REQUESTS} requests per batch")
+        merged, dispatched = self._plan(batch.requests)
+        results: List[Optional[Tuple[int, bytes]]] = [None] * len(batch.requests)
+
+        async def run_lookup(lookup: Lookup, wanted: List[tuple]):
+            try:
+                rows = await run_in_threadpool(lookup.load, list({key for _, key in wanted}))
+            except Exception as e:
+                for position, _ in wanted:
+                    results[position] = (500, dumps({"detail": str(e)}))
+                return
+            add_rows(len(rows))
+            for position, key in wanted:
+                row = rows.get(key)
+                results[position] = (200, dumps(row)) if row is not None else \
+                    (404, dumps({"detail": lookup.not_found}))
+
+        async def run_dispatched(position: int):
+            status, body, content_type = await self._dispatch(request, batch.requests[position], slots)
+            if not content_type.startswith("application/json"):
+                body = dumps(body.decode("utf-8", errors="replace"))
+            results[position] = (status, body or b"null")
+
+        slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+        await asyncio.gather(*[run_lookup(lookup, wanted) for lookup, wanted in merged.items()],
+                             *[run_dispatched(position) for position in dispatched])
+
+        with serialize_timer():
+            parts = [
+                b'{"id":%s,"status":%d,"body":%s}' % (json.dumps(sub.id).encode("utf-8"), status, body)
+                for sub, (status, body) in zip(batch.requests, results)
+            ]
+            content = b'{"responses":[' + b",".join(parts) + b"]}"
+        return Response(content, media_type="application/json")
+
+def install_batch(app: FastAPI, auth_dependency: Callable) -> BatchHandler:
+    handler = BatchHandler(app)
+
+    @app.post("/batch", tags=["batch"])
+    async def post_batch(batch: BatchRequest, request: Request, user: str = Depends(auth_dependency)):
+        return await handler.run(request, batch)
+
+    return handler
@@ -0,0 +1,159 @@
+import os
+import time
+import zlib
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from apiMetrics import add_compression
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip is always available
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # brotli is optional
+    brotli = None
+
+# -----------------------------------------------------------------
+# Negotiated Response Compression
+# -----------------------------------------------------------------
+# Bodies of at least COMPRESSION_MIN_BYTES are compressed with the best
+# encoding both sides support: zstd, then br, then gzip. Compression is
+# streamed: each body message is fed through the compressor in
+# COMPRESSION_CHUNK_BYTES slices and every piece of output is sent as soon
+# as it is produced, so a large list response is never held both plain and
+# compressed. Slices of that size are compressed in the threadpool (zlib,
+# zstandard and brotli release the GIL) to keep the event loop free.
+#
+# Levels favour speed over ratio, since every response is compressed on the fly.
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_CHUNK_BYTES = int(os.getenv("COMPRESSION_CHUNK_BYTES", str(256 * 1024)))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "5"))
+ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+def _gzip():
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, compressor.flush
+
+def _zstd():
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    return compressor.compress, compressor.flush
+
+def _brotli():
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    return compressor.process, compressor.finish
+
+# Server preference order; each factory returns (compress(data), finish()).
+ENCODERS = {}
+if zstandard is not None:
+    ENCODERS["zstd"] = _zstd
+if brotli is not None:
+    ENCODERS["br"] = _brotli
+ENCODERS["gzip"] = _gzip
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Pick an encoding from an Accept-Encoding header, honouring q=0 exclusions."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    for encoding in ENCODERS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+def _timed(fn, *args):
+    start = time.thread_time()
+    out = fn(*args)
+    return out, time.thread_time() - start
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    def should_compress(self, start: dict, headers: Headers, first_body: dict) -> bool:
+        if start["status"] < 200 or start["status"] in (204, 304) or "content-encoding" in headers:
+            return False
+        if not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES):
+            return False
+        if "content-length" in headers:
+            return int(headers["content-length"]) >= self.minimum_size
+        # Streaming response: compress unless it is a single small message.
+        return first_body.get("more_body", False) or len(first_body.get("body", b"")) >= self.minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compress = finish = None
+
+        async def run(fn, *args):
+            data = args[0] if args else b""
+            if len(data) >= COMPRESSION_CHUNK_BYTES:
+                out, cpu = await run_in_threadpool(_timed, fn, *args)
+            else:
+                out, cpu = _timed(fn, *args)
+            add_compression(len(data), len(out), cpu)
+            return out
+
+        async def send_wrapper(message):
+            nonlocal start_message, compress, finish
+            if message["type"] == "http.response.start":
+                # Hold the headers until the first body message shows how big the response is.
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            if start_message is not None:
+                start, start_message = start_message, None
+                headers = MutableHeaders(raw=list(start.get("headers", [])))
+                if self.should_compress(start, headers, message):
+                    compress, finish = ENCODERS[encoding]()
+                    del headers["content-length"]
+                    headers["content-encoding"] = encoding
+                    headers.add_vary_header("Accept-Encoding")
+                await send({**start, "headers": headers.raw})
+
+            if compress is None:
+                await send(message)
+                return
+
+            body = memoryview(message.get("body", b""))
+            for offset in range(0, len(body), COMPRESSION_CHUNK_BYTES):
+                out = await run(compress, body[offset:offset + COMPRESSION_CHUNK_BYTES])
+                if out:
+                    await send({"type": "http.response.body", "body": out, "more_body": True})
+            if not message.get("more_body", False):
+                out = await run(finish)
+                await send({"type": "http.response.body", "body": out, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
+
+def install_compression(app, minimum_size: int = COMPRESSION_MIN_BYTES):
+    app.add_middleware(CompressionMiddleware, minimum_size=minimum_size)
@@ -0,0 +1,162 @@
+import os
+import time
+import asyncio
+import logging
+import contextvars
+from datetime import date, timedelta
+from typing import Callable, Dict, Optional
+
+from fastapi import Depends, FastAPI, HTTPException, Response
+from starlette.concurrency import run_in_threadpool
+
+import successFactorsAPI as sf
+import timeAttendanceAPI as ta
+import exitManagementAPI as em
+import learningPlatformAPI as lp
+from admissionControl import apply_execution_limit, current_max_execution_ms
+from apiMetrics import timed_execute
+from fastJson import dumps
+
+logger = logging.getLogger("employee360")
+
+# -----------------------------------------------------------------
+# Employee 360: One Profile from All Four Sources
+# -----------------------------------------------------------------
+# GET /employee360/{employee_id} reads SuccessFactors (employee, employment,
+# compensation, performance), Time & Attendance (attendance, leave and
+# overtime since ?since=, by default the last EMPLOYEE360_DAYS days),
+# Learning (enrollments and their certificates) and Exit Management
+# (resignations, interviews, surveys) concurrently, one thread per source.
+#
+# Each source has its own deadline (EMPLOYEE360_TIMEOUT_SECONDS, overridden
+# per source by EMPLOYEE360_SOURCE_TIMEOUTS, e.g. "learning=3,exitmanagement=1").
+# A source that fails or misses its deadline is reported in "sources" and
+# left out; the rest of the profile is still returned, so the response takes
+# about as long as the slowest source within its deadline. A source's
+# worker thread cannot be cancelled, so it bounds its own work: each MySQL
+# statement runs with what is left of the deadline as max_execution_time,
+# MongoDB queries get it as max_time_ms, and once it has passed the source
+# stops issuing queries and gives its connection back.
+EMPLOYEE360_TIMEOUT_SECONDS = float(os.getenv("EMPLOYEE360_TIMEOUT_SECONDS", "2"))
+EMPLOYEE360_SOURCE_TIMEOUTS = os.getenv("EMPLOYEE360_SOURCE_TIMEOUTS", "")
+EMPLOYEE360_DAYS = int(os.getenv("EMPLOYEE360_DAYS", "90"))
+
+def parse_timeouts(value: str) -> Dict[str, float]:
+    timeouts = {}
+    for item in value.split(","):
+        name, _, seconds = item.partition("=")
+        if name.strip() and seconds.strip():
+            timeouts[name.strip()] = float(seconds)
+    return timeouts
+
+SOURCE_TIMEOUTS = parse_timeouts(EMPLOYEE360_SOURCE_TIMEOUTS)
+
+_deadline: contextvars.ContextVar[float] = contextvars.ContextVar("employee360_deadline", default=float("inf"))
+
+def remaining_ms(cnx=None) -> int:
+    """Milliseconds left to the current source's deadline, applied to `cnx` as its statement limit.
+
+    Raises TimeoutError once the deadline has passed.
+    """
+    left = (_deadline.get() - time.monotonic()) * 1000
+    if left <= 0:
+        raise TimeoutError("employee360 source deadline passed")
+    left = min(int(left), 2 ** 31 - 1) or 1
+    if cnx is not None:
+        current_max_execution_ms.set(left)
+        apply_execution_limit(cnx)
+    return left
+
+def fetch_all(cnx, query: str, params) -> list:
+    remaining_ms(cnx)
+    cursor = cnx.cursor(dictionary=True)
+    try:
+        timed_execute(cursor, query, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+# -- sources ----------------------------------------------------------
+def successfactors_source(employee_id: int, since: date) -> dict:
+    with sf.shards.pools_for(employee_id).borrow(write=False) as cnx:
+        return {
+            "employee": sf.cached_lookup(employee_id, "employee", sf.EMPLOYEE_BY_ID, (employee_id,)),
+            "employment": sf.cached_lookup(employee_id, "employment", sf.EMPLOYMENT_DETAILS_BY_EMPLOYEE,
+                                           (employee_id,)),
+            "compensation": sf.cached_lookup(employee_id, "compensation", sf.COMPENSATION_BY_EMPLOYEE,
+                                             (employee_id,)),
+            "performance": fetch_all(cnx, "SELECT * FROM Performance WHERE EmployeeID = %s ORDER BY PerformanceYear;",
+                                     (employee_id,)),
+        }
+
+def timeattendance_source(employee_id: int, since: date) -> dict:
+    with ta.db.borrow(write=False) as cnx:
+        return {
+            "attendance": fetch_all(cnx, *ta.attendance_query([employee_id], attendance_date_from=since)),
+            "leave": fetch_all(cnx, *ta.leave_query([employee_id], start_date_from=since)),
+            "overtime": fetch_all(cnx, *ta.overtime_query([employee_id], overtime_date_from=since)),
+        }
+
+def learning_source(employee_id: int, since: date) -> dict:
+    enrollments = list(lp.enrollments_collection.find({"EmployeeID": employee_id}, {"_id": 0},
+                                                      max_time_ms=remaining_ms()))
+    enrollment_ids = [e["EnrollmentID"] for e in enrollments if "EnrollmentID" in e]
+    certificates = list(lp.certificates_collection.find({"EnrollmentID": {"$in": enrollment_ids}}, {"_id": 0},
+                                                        max_time_ms=remaining_ms()))
+    return {"enrollments": enrollments, "certificates": certificates}
+
+def exitmanagement_source(employee_id: int, since: date) -> dict:
+    with em.exit_db.borrow(write=False) as cnx:
+        return {
+            "resignations": fetch_all(cnx, *em.resignation_requests_query([employee_id])),
+            "interviews": fetch_all(cnx, *em.exit_interviews_query([employee_id])),
+            "surveys": fetch_all(cnx, *em.exit_surveys_query([employee_id])),
+        }
+
+SOURCES: Dict[str, Callable[[int, date], dict]] = {
+    "successfactors": successfactors_source,
+    "timeattendance": timeattendance_source,
+    "learning": learning_source,
+    "exitmanagement": exitmanagement_source,
+}
+
+def _run_source(fn: Callable, employee_id: int, since: date, deadline: float) -> dict:
+    # Runs in a worker thread with a copy of the request's context; the
+    # connections it borrows start with the time left when it got a thread.
+    _deadline.set(deadline)
+    current_max_execution_ms.set(remaining_ms())
+    return fn(employee_id, since)
+
+async def _gather_source(name: str, employee_id: int, since: date):
+    timeout = SOURCE_TIMEOUTS.get(name, EMPLOYEE360_TIMEOUT_SECONDS)
+    start = time.perf_counter()
+    deadline = time.monotonic() + timeout
+    try:
+        data = await asyncio.wait_for(run_in_threadpool(_run_source, SOURCES[name], employee_id, since, deadline),
+                                      timeout)
+        status = {"status": "ok"}
+    except asyncio.TimeoutError:
+        data, status = None, {"status": "timeout", "timeout_seconds": timeout}
+    except Exception as e:
+        logger.warning(f"employee360 {employee_id}: {name} failed: {e}")
+        data, status = None, {"status": "error", "detail": str(e)}
+    status["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return name, data, status
+
+async def employee_profile(employee_id: int, since: date) -> dict:
+    results = await asyncio.gather(*(_gather_source(name, employee_id, since) for name in SOURCES))
+    profile = {"EmployeeID": employee_id, "since": since, "sources": {}}
+    for name, data, status in results:
+        profile["sources"][name] = status
+        profile[name] = data
+    return profile
+
+def install_employee360(app: FastAPI):
+    @app.get("/employee360/{employee_id}", tags=["employee360"])
+    async def get_employee360(employee_id: int, since: Optional[date] = None,
+                              user: str = Depends(sf.get_current_user)):
+        since = since or date.today() - timedelta(days=EMPLOYEE360_DAYS)
+        profile = await employee_profile(employee_id, since)
+        if profile["sources"]["successfactors"]["status"] == "ok" and not profile["successfactors"]["employee"]:
+            raise HTTPException(status_code=404, detail="Employee not found")
+        return Response(dumps(profile), media_type="application/json")
@@ -0,0 +1,284 @@
+import os
+import time
+import logging
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import date
+from typing import Callable, Dict, List, Literal, Optional, Tuple
+
+from fastapi import Depends, FastAPI, HTTPException
+
+from apiMetrics import db_timer, timed_execute
+from preparedStatements import fetch_one
+
+logger = logging.getLogger("employmentHistory")
+
+# -----------------------------------------------------------------
+# Effective-Dated Employment History and As-Of Queries
+# -----------------------------------------------------------------
+# EmploymentDetails holds one current row per employee. EmploymentHistory
+# keeps every state an employee was in (job title, department, business
+# unit, manager, status) with the dates it was valid for: ValidFrom
+# inclusive, ValidTo exclusive, 9999-12-31 while still current. It lives
+# next to EmploymentDetails (on the employee's shard) and is written by the
+# same requests: record_employment() closes the open interval and opens the
+# new one. The table is created on every shard on first use; "Data
+# Source/employmentHistory.py" backfills it from existing employees.
+#
+#   GET /as_of?date=2021-06-30&group_by=Department
+#       -> {"date": ..., "headcount": 8123, "group_by": "Department",
+#           "groups": {"IT": 1410, "HR": 1302, ...}}
+#   GET /as_of/employees/{employee_id}?date=2021-06-30
+#       -> that employee's history row valid on the date
+#
+# Headcount counts the intervals valid on the date whose status is not
+# Terminated. It is answered from an in-memory interval index: for the
+# whole company and for each department, business unit and job title, the
+# sorted start and end dates of those intervals. The number valid on a date
+# is (starts <= date) - (ends <= date), two binary searches, so any date
+# costs the same few microseconds.
+#
+# The index is loaded from every shard on warm-up. A write in any worker
+# bumps the "employment_history" version in the shared cache; on its next
+# query each worker then reads, per shard, only the history of employees
+# with a row recorded since its last read (less AS_OF_REFRESH_OVERLAP_SECONDS,
+# for transactions that committed late), and swaps their intervals in the
+# index. A write always records a new row for the employee, so none is
+# missed. The full reload only happens every AS_OF_INDEX_TTL_SECONDS, as a
+# backstop for changes made outside the API.
+AS_OF_INDEX_TTL_SECONDS = float(os.getenv("AS_OF_INDEX_TTL_SECONDS", "300"))
+AS_OF_REFRESH_OVERLAP_SECONDS = int(os.getenv("AS_OF_REFRESH_OVERLAP_SECONDS", "10"))
+
+OPEN_END = date.max  # stored as 9999-12-31
+GROUP_FIELDS = ("Department", "BusinessUnit", "JobTitle")
+HISTORY_NAMESPACE = "employment_history"
+
+HISTORY_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS EmploymentHistory (
+    EmployeeID INT NOT NULL,
+    ValidFrom DATE NOT NULL,
+    ValidTo DATE NOT NULL DEFAULT '9999-12-31',
+    JobTitle VARCHAR(100),
+    Department VARCHAR(100),
+    BusinessUnit VARCHAR(100),
+    ManagerID INT,
+    EmploymentStatus VARCHAR(50),
+    RecordedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (EmployeeID, ValidFrom),
+    INDEX idx_history_interval (ValidFrom, ValidTo),
+    INDEX idx_history_recorded (RecordedAt)
+) ENGINE=InnoDB;
+"""
+
+HISTORY_AS_OF = (
+    "SELECT EmployeeID, ValidFrom, ValidTo, JobTitle, Department, BusinessUnit, ManagerID, EmploymentStatus "
+    "FROM EmploymentHistory WHERE EmployeeID = %s AND ValidFrom <= %s AND ValidTo > %s;"
+)
+INDEX_SELECT = (
+    f"SELECT EmployeeID, ValidFrom, ValidTo, {', '.join(GROUP_FIELDS)}, EmploymentStatus FROM EmploymentHistory"
+)
+CHANGED_SELECT = (
+    f"{INDEX_SELECT} WHERE EmployeeID IN (SELECT EmployeeID FROM EmploymentHistory WHERE RecordedAt >= %s)"
+)
+
+# -- write path ---------------------------------------------------------
+def record_employment(cursor, employee_id: int, effective: date, state: dict,
+                      until: Optional[date] = None, status_after: Optional[str] = None):
+    """From `effective` on, the employee is in `state` (JobTitle, Department, ..., EmploymentStatus).
+
+    Intervals from `effective` on are replaced and the one open on that day
+    ends there. With `until`, `state` lasts up to that day and the status is
+    `status_after` from then on.
+    """
+    timed_execute(cursor, "DELETE FROM EmploymentHistory WHERE EmployeeID = %s AND ValidFrom >= %s;",
+                  (employee_id, effective))
+    timed_execute(cursor, "UPDATE EmploymentHistory SET ValidTo = %s WHERE EmployeeID = %s AND ValidTo > %s;",
+                  (effective, employee_id, effective))
+    if until is None:
+        rows = [(effective, OPEN_END, state.get("EmploymentStatus"))]
+    elif until > effective:
+        rows = [(effective, until, state.get("EmploymentStatus")), (until, OPEN_END, status_after)]
+    else:
+        rows = [(effective, OPEN_END, status_after)]
+    for valid_from, valid_to, status in rows:
+        timed_execute(cursor, """
+            INSERT INTO EmploymentHistory
+            (EmployeeID, ValidFrom, ValidTo, JobTitle, Department, BusinessUnit, ManagerID, EmploymentStatus)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
+        """, (employee_id, valid_from, valid_to, state.get("JobTitle"), state.get("Department"),
+              state.get("BusinessUnit"), state.get("ManagerID"), status))
+
+# -- interval index ------------------------------------------------------
+class IntervalIndex:
+    """Counts of [start, end) intervals containing a date, overall and per group value."""
+
+    def __init__(self, rows: List[tuple]):
+        starts = {field: defaultdict(list) for field in GROUP_FIELDS}
+        ends = {field: defaultdict(list) for field in GROUP_FIELDS}
+        all_starts, all_ends = [], []
+        for valid_from, valid_to, *values in rows:
+            all_starts.append(valid_from)
+            all_ends.append(valid_to)
+            for field, value in zip(GROUP_FIELDS, values):
+                starts[field][value].append(valid_from)
+                ends[field][value].append(valid_to)
+        self.size = len(rows)
+        self.starts, self.ends = sorted(all_starts), sorted(all_ends)
+        self.groups = {
+            field: {value: (sorted(starts[field][value]), sorted(ends[field][value])) for value in starts[field]}
+            for field in GROUP_FIELDS
+        }
+
+    def add(self, rows: List[tuple]):
+        for valid_from, valid_to, *values in rows:
+            insort(self.starts, valid_from)
+            insort(self.ends, valid_to)
+            for field, value in zip(GROUP_FIELDS, values):
+                starts, ends = self.groups[field].setdefault(value, ([], []))
+                insort(starts, valid_from)
+                insort(ends, valid_to)
+        self.size += len(rows)
+
+    def remove(self, rows: List[tuple]):
+        """Take out intervals previously added (or loaded)."""
+        for valid_from, valid_to, *values in rows:
+            _discard(self.starts, valid_from)
+            _discard(self.ends, valid_to)
+            for field, value in zip(GROUP_FIELDS, values):
+                starts, ends = self.groups[field][value]
+                _discard(starts, valid_from)
+                _discard(ends, valid_to)
+                if not starts:
+                    del self.groups[field][value]
+        self.size -= len(rows)
+
+    @staticmethod
+    def _count(starts: list, ends: list, day: date) -> int:
+        return bisect_right(starts, day) - bisect_right(ends, day)
+
+    def headcount(self, day: date) -> int:
+        return self._count(self.starts, self.ends, day)
+
+    def composition(self, day: date, field: str) -> Dict[Optional[str], int]:
+        counts = {}
+        for value, (starts, ends) in self.groups[field].items():
+            n = self._count(starts, ends, day)
+            if n:
+                counts[value] = n
+        return counts
+
+def _discard(items: list, value):
+    del items[bisect_left(items, value)]
+
+def _by_employee(rows: List[tuple]) -> Dict[int, List[tuple]]:
+    """Each employee's index rows (dates and group values), leaving out Terminated intervals."""
+    employees = defaultdict(list)
+    for employee_id, *row, status in rows:
+        intervals = employees[employee_id]  # kept even when empty: the employee changed
+        if status != "Terminated":
+            intervals.append(tuple(row))
+    return employees
+
+class HistoryIndex:
+    def __init__(self, shards, cache):
+        self.shards = shards
+        self.cache = cache
+        self.index: Optional[IntervalIndex] = None
+        self.employees: Dict[int, List[tuple]] = {}
+        self.marks = {}  # per shard: the server time the next refresh reads from
+        self.version = None
+        self.loaded_at = 0.0
+        self.tables_ready = False
+        self.lock = threading.Lock()
+
+    def _read(self, pools, since=None) -> Tuple[object, List[tuple]]:
+        # The primary, so a refresh triggered by a write sees that write.
+        with pools.borrow(write=True) as cnx:
+            cursor = cnx.cursor()
+            timed_execute(cursor, "SELECT NOW() - INTERVAL %s SECOND;", (AS_OF_REFRESH_OVERLAP_SECONDS,))
+            mark = cursor.fetchone()[0]
+            if since is None:
+                timed_execute(cursor, INDEX_SELECT)
+            else:
+                timed_execute(cursor, CHANGED_SELECT, (since,))
+            with db_timer():
+                rows = cursor.fetchall()
+            cursor.close()
+        return mark, rows
+
+    def load(self):
+        self.ensure_tables()
+        version = self.cache.version(HISTORY_NAMESPACE)
+        start = time.perf_counter()
+        employees, marks = {}, {}
+        for pools, (mark, rows) in zip(self.shards.all(), self.shards.scatter(self._read)):
+            employees.update(_by_employee(rows))
+            marks[pools] = mark
+        self.index = IntervalIndex([row for intervals in employees.values() for row in intervals])
+        self.employees, self.marks = employees, marks
+        self.version, self.loaded_at = version, time.monotonic()
+        logger.info(f"As-of index: {self.index.size} intervals loaded in {time.perf_counter() - start:.2f}s")
+
+    def refresh(self):
+        """Swap in the intervals of employees whose history was recorded since the last read."""
+        version = self.cache.version(HISTORY_NAMESPACE)
+        results = self.shards.scatter(lambda pools: self._read(pools, self.marks[pools]))
+        changed = {}
+        for pools, (mark, rows) in zip(self.shards.all(), results):
+            changed.update(_by_employee(rows))
+            self.marks[pools] = mark
+        for employee_id, intervals in changed.items():
+            self.index.remove(self.employees.get(employee_id, []))
+            self.index.add(intervals)
+            self.employees[employee_id] = intervals
+        self.version = version
+
+    def counts(self, day: date, field: str) -> Tuple[int, Dict[Optional[str], int]]:
+        """Headcount and composition by `field` on `day`, bringing the index up to date first."""
+        with self.lock:
+            if self.index is None or time.monotonic() - self.loaded_at >= AS_OF_INDEX_TTL_SECONDS:
+                self.load()
+            elif self.cache.version(HISTORY_NAMESPACE) != self.version:
+                self.refresh()
+            return self.index.headcount(day), self.index.composition(day, field)
+
+    def invalidate(self):
+        """After a write: refresh on next use, here and in every other worker."""
+        self.cache.invalidate(HISTORY_NAMESPACE)
+        # Also here with the shared cache disabled; under the lock, so a
+        # refresh in progress cannot overwrite it with the version it read.
+        with self.lock:
+            self.version = None
+
+    def ensure_tables(self):
+        """Create EmploymentHistory on every shard, once per process; not inside a transaction (DDL commits it)."""
+        if self.tables_ready:
+            return
+        for pools in self.shards.all():
+            with pools.borrow(write=True) as cnx:
+                cursor = cnx.cursor()
+                cursor.execute(HISTORY_TABLE_SQL)
+                cursor.close()
+        self.tables_ready = True
+
+def install_as_of(app: FastAPI, shards, cache, auth_dependency: Callable) -> HistoryIndex:
+    history = HistoryIndex(shards, cache)
+
+    @app.get("/as_of", tags=["as_of"])
+    def get_as_of(date: date, group_by: Literal["Department", "BusinessUnit", "JobTitle"] = "Department",
+                  user: str = Depends(auth_dependency)):
+        headcount, groups = history.counts(date, group_by)
+        return {"date": date, "headcount": headcount, "group_by": group_by, "groups": groups}
+
+    @app.get("/as_of/employees/{employee_id}", tags=["as_of"])
+    def get_employee_as_of(employee_id: int, date: date, user: str = Depends(auth_dependency)):
+        history.ensure_tables()
+        row = fetch_one(shards.pools_for(employee_id).connection(), HISTORY_AS_OF, (employee_id, date, date))
+        if not row:
+            raise HTTPException(status_code=404, detail="No employment record on that date")
+        if row["ValidTo"] == OPEN_END:
+            row["ValidTo"] = None
+        return row
+
+    return history
@@ -0,0 +1,147 @@
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional
+
+# -----------------------------------------------------------------
+# Read-Through Entity Cache
+# -----------------------------------------------------------------
+# One entry per entity (e.g. per EmployeeID) holding the sections that have
+# been read for it: the employee row, employment details, compensation, a
+# performance year, and so on. A section missing from the entry is loaded by
+# the caller's loader and stored. "Not found" is not cached, so an employee
+# created by another worker is seen at once. Rows are kept as tuples with the
+# column names shared per section, which keeps entries small.
+#
+# Entries are evicted least-recently-used once their estimated size exceeds
+# the byte budget, and expire after a TTL as a backstop for writes made by
+# other processes. Writes through the API invalidate the whole entry. A load
+# that started before an invalidation is not stored, so a concurrent read
+# cannot put back what the write just replaced. Invalidations are counted
+# only for keys with a load in flight, and forgotten once none is.
+ENTITY_CACHE_MAX_BYTES = int(os.getenv("ENTITY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+ENTITY_CACHE_TTL_SECONDS = float(os.getenv("ENTITY_CACHE_TTL_SECONDS", "300"))
+
+_ABSENT = object()
+
+class _Entry:
+    __slots__ = ("expires_at", "size", "sections")
+
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+        self.size = 0
+        self.sections: Dict[str, tuple] = {}
+
+def _size(row: tuple) -> int:
+    return sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row)
+
+class EntityCache:
+    def __init__(self, max_bytes: int = ENTITY_CACHE_MAX_BYTES, ttl: float = ENTITY_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self.columns: Dict[str, List[str]] = {}
+        self.versions: Dict[Hashable, int] = {}  # invalidations seen by keys being loaded
+        self.loading: Dict[Hashable, int] = {}   # loads in flight per key
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def _lookup(self, key: Hashable, section: str):
+        entry = self.entries.get(key)
+        if entry is None:
+            return _ABSENT
+        if entry.expires_at <= time.monotonic():
+            self._drop(key)
+            return _ABSENT
+        row = entry.sections.get(section, _ABSENT)
+        if row is not _ABSENT:
+            self.entries.move_to_end(key)
+        return row
+
+    def _drop(self, key: Hashable):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def get(self, key: Hashable, section: str, loader: Callable[[], Optional[dict]]) -> Optional[dict]:
+        """The section's row for `key` as a dict (or None), calling loader() on a miss."""
+        with self.lock:
+            row = self._lookup(key, section)
+            if row is not _ABSENT:
+                self.hits += 1
+                return dict(zip(self.columns[section], row))
+            self.misses += 1
+            self.loading[key] = self.loading.get(key, 0) + 1
+            version = self.versions.get(key, 0)
+        try:
+            value = loader()
+            with self.lock:
+                if value is not None and self.versions.get(key, 0) == version:
+                    self._store(key, section, value)
+            return value
+        finally:
+            with self.lock:
+                if self.loading[key] > 1:
+                    self.loading[key] -= 1
+                else:
+                    del self.loading[key]
+                    self.versions.pop(key, None)
+
+    def _store(self, key: Hashable, section: str, value: dict):
+        columns = self.columns.setdefault(section, list(value))
+        if list(value) != columns:  # a schema change; keep the newest layout
+            self.columns[section] = list(value)
+            for entry in self.entries.values():
+                old = entry.sections.pop(section, _ABSENT)
+                if old is not _ABSENT:
+                    entry.size -= _size(old)
+                    self.bytes -= _size(old)
+        row = tuple(value.values())
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = _Entry(time.monotonic() + self.ttl)
+        else:
+            self.entries.move_to_end(key)
+        size = _size(row)
+        old = entry.sections.get(section, _ABSENT)
+        if old is not _ABSENT:
+            size -= _size(old)
+        entry.sections[section] = row
+        entry.size += size
+        self.bytes += size
+        while self.bytes > self.max_bytes and len(self.entries) > 1:
+            oldest = next(iter(self.entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        with self.lock:
+            if key in self.loading:
+                self.versions[key] = self.versions.get(key, 0) + 1
+            self._drop(key)
+
+    def clear(self):
+        with self.lock:
+            for key in self.loading:
+                self.versions[key] = self.versions.get(key, 0) + 1
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+            }
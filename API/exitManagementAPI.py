@@ -7,14 +7,27 @@ from uuid import UUID
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Query, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 import jwt
 from jwt import ExpiredSignatureError, InvalidTokenError
-import mysql.connector
 from mysql.connector import Error
 from pydantic import BaseModel, Field
+from tokenCache import AUTH_TOKEN_URL, get_token_cache, issuer_claims
+from queryFilters import build_where
+from apiMetrics import install_metrics, timed_execute
+from singleFlight import install_single_flight
+from compression import install_compression
+from admissionControl import install_admission_control
+from mysqlPools import DatabasePools
+from readiness import install_readiness
+from slowQueryLog import install_slow_query_log
+from exportJobs import install_exports
+from batchRequests import install_batch
+from liveUpdates import publish
+from fastJson import rows_response
+from fieldProjection import fields_param, select_list
 
 # -----------------------------------------------------------------
 # Logging Configuration
@@ -31,12 +44,13 @@ if not SECRET_KEY:
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl=AUTH_TOKEN_URL)
+token_cache = get_token_cache(SECRET_KEY, ALGORITHM)
 
 def create_access_token(data: dict, expires_delta: timedelta):
     to_encode = data.copy()
     expire = datetime.utcnow() + expires_delta
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, **issuer_claims()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     if isinstance(encoded_jwt, bytes):
         return encoded_jwt.decode("utf-8")
@@ -44,7 +58,7 @@ def create_access_token(data: dict, expires_delta: timedelta):
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = token_cache.verify(token)
         username: str = payload.get("sub")
         if username is None:
             raise HTTPException(status_code=401, detail="Invalid token")
@@ -63,23 +77,22 @@ MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
 MYSQL_EXIT_DB = os.getenv("MYSQL_EXITMANAGEMENT_DATABASE")
 MYSQL_AUTH_PLUGIN = os.getenv("MYSQL_AUTH_PLUGIN")
 
-exit_conn = None
+# Reads go to a replica pool when MYSQL_REPLICA_HOSTS is set (see mysqlPools)
+exit_db = DatabasePools(
+    "exitmanagement",
+    host=MYSQL_HOST,
+    user=MYSQL_USER,
+    password=MYSQL_PASSWORD,
+    database=MYSQL_EXIT_DB,
+    auth_plugin=MYSQL_AUTH_PLUGIN
+)
 
 def get_exit_connection():
-    global exit_conn
-    if exit_conn is None or not exit_conn.is_connected():
-        try:
-            exit_conn = mysql.connector.connect(
-                host=MYSQL_HOST,
-                user=MYSQL_USER,
-                password=MYSQL_PASSWORD,
-                database=MYSQL_EXIT_DB,
-                auth_plugin=MYSQL_AUTH_PLUGIN
-            )
-        except Error as err:
-            logger.error(f"Error connecting to ExitManagementDB: {err}")
-            raise HTTPException(status_code=500, detail=f"Error connecting to ExitManagementDB: {err}")
-    return exit_conn
+    try:
+        return exit_db.connection()
+    except Error as err:
+        logger.error(f"Error connecting to ExitManagementDB: {err}")
+        raise HTTPException(status_code=500, detail=f"Error connecting to ExitManagementDB: {err}")
 
 def get_exit_cursor():
     conn = get_exit_connection()
@@ -154,6 +167,17 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+exit_db.install(app)
+install_compression(app)
+install_admission_control(app)
+install_single_flight(app, token_cache)
+metrics = install_metrics(app, "exitmanagement")
+slow_queries = install_slow_query_log(app, get_exit_connection, get_current_user)
+readiness = install_readiness(app, "exitmanagement")
+readiness.check("mysql")(exit_db.ping)
+readiness.warmup("mysql pools")(exit_db.open)
+exports = install_exports(app, "exitmanagement", get_current_user)
+batch = install_batch(app, get_current_user)
 
 # -----------------------------------------------------------------
 # Startup & Shutdown Events
@@ -161,14 +185,11 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_event():
     logger.info("Application starting up")
-    get_exit_connection()
 
 @app.on_event("shutdown")
 def shutdown_event():
-    global exit_conn
     logger.info("Application shutting down")
-    if exit_conn and exit_conn.is_connected():
-        exit_conn.close()
+    exit_db.close()
 
 # -----------------------------------------------------------------
 # Database Helper Functions using MySQL
@@ -176,21 +197,28 @@ def shutdown_event():
 def fetch_all(query: str, params: tuple = ()):
     try:
         cursor = get_exit_cursor()
-        logger.info(f"Executing query: {query} with params: {params}")
-        cursor.execute(query, params)
+        timed_execute(cursor, query, params)
         result = cursor.fetchall()
-        logger.info(f"Query returned {len(result)} rows")
         cursor.close()
         return result
     except Exception as e:
         logger.error(f"Database query failed: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
 
+def fetch_all_response(query: str, params: tuple = (), converters: Optional[dict] = None):
+    """Like fetch_all, but encodes the rows straight to a JSON response (see fastJson)."""
+    try:
+        cursor = get_exit_connection().cursor()
+        timed_execute(cursor, query, params)
+        return rows_response(cursor, converters)
+    except Exception as e:
+        logger.error(f"Database query failed: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
+
 def execute_query(query: str, params: tuple):
     try:
         cursor = get_exit_cursor()
-        logger.info(f"Executing query: {query} with params: {params}")
-        cursor.execute(query, params)
+        timed_execute(cursor, query, params)
         get_exit_connection().commit()
         cursor.close()
     except Exception as e:
@@ -219,13 +247,42 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 # -----------------------------------------------------------------
 # ResignationRequests Endpoints
 # -----------------------------------------------------------------
+def resignation_requests_query(
+    employee_id: Optional[List[int]] = None,
+    reason: Optional[List[str]] = None,
+    status: Optional[str] = None,
+    effective_date_from: Optional[date] = None,
+    effective_date_to: Optional[date] = None,
+    fields: Optional[List[str]] = None,
+):
+    where, params = build_where([
+        ("EmployeeID", "=", employee_id),
+        ("Reason", "=", reason),
+        ("Status", "=", status),
+        ("EffectiveDate", ">=", effective_date_from),
+        ("EffectiveDate", "<=", effective_date_to),
+    ])
+    columns = select_list(ResignationRequest, fields) if fields else "*"
+    return f"SELECT {columns} FROM ResignationRequests{where}", params
+
+exports.sql("resignation_requests", exit_db, resignation_requests_query)
+
 @app.get("/resignation_requests", response_model=List[ResignationRequest])
-async def get_resignation_requests(current_user: str = Depends(get_current_user)):
-    rows = fetch_all("SELECT * FROM ResignationRequests", ())
-    return rows
+def get_resignation_requests(
+    employee_id: Optional[List[int]] = Query(None),
+    reason: Optional[List[str]] = Query(None),
+    status: Optional[str] = None,
+    effective_date_from: Optional[date] = None,
+    effective_date_to: Optional[date] = None,
+    fields: Optional[List[str]] = Depends(fields_param(ResignationRequest)),
+    current_user: str = Depends(get_current_user)
+):
+    query, params = resignation_requests_query(employee_id, reason, status, effective_date_from, effective_date_to,
+                                               fields)
+    return fetch_all_response(query, params)
 
 @app.post("/resignation_requests", response_model=ResignationRequest, status_code=status.HTTP_201_CREATED)
-async def create_resignation_request(request: ResignationRequest, current_user: str = Depends(get_current_user)):
+def create_resignation_request(request: ResignationRequest, current_user: str = Depends(get_current_user)):
     request_id = request.RequestID or uuid.uuid4()
     if not request.CreatedAt:
         request.CreatedAt = datetime.utcnow()
@@ -241,17 +298,42 @@ async def create_resignation_request(request: ResignationRequest, current_user:
         )
     )
     request.RequestID = request_id
+    publish("resignation.requested", {"RequestID": request_id, "EmployeeID": request.EmployeeID,
+                                      "EffectiveDate": request.EffectiveDate})
     return request
 
 # -----------------------------------------------------------------
 # ExitInterviews Endpoints
 # -----------------------------------------------------------------
+def exit_interviews_query(
+    employee_id: Optional[List[int]] = None,
+    interview_date_from: Optional[date] = None,
+    interview_date_to: Optional[date] = None,
+    fields: Optional[List[str]] = None,
+):
+    where, params = build_where([
+        ("EmployeeID", "=", employee_id),
+        ("InterviewDate", ">=", interview_date_from),
+        ("InterviewDate", "<=", interview_date_to),
+    ])
+    columns = select_list(ExitInterview, fields) if fields else "*"
+    return f"SELECT {columns} FROM ExitInterviews{where}", params
+
+exports.sql("exit_interviews", exit_db, exit_interviews_query)
+
 @app.get("/exit_interviews", response_model=List[ExitInterview])
-async def get_exit_interviews(current_user: str = Depends(get_current_user)):
-    return fetch_all("SELECT * FROM ExitInterviews", ())
+def get_exit_interviews(
+    employee_id: Optional[List[int]] = Query(None),
+    interview_date_from: Optional[date] = None,
+    interview_date_to: Optional[date] = None,
+    fields: Optional[List[str]] = Depends(fields_param(ExitInterview)),
+    current_user: str = Depends(get_current_user)
+):
+    query, params = exit_interviews_query(employee_id, interview_date_from, interview_date_to, fields)
+    return fetch_all_response(query, params)
 
 @app.post("/exit_interviews", response_model=ExitInterview, status_code=status.HTTP_201_CREATED)
-async def create_exit_interview(interview: ExitInterview, current_user: str = Depends(get_current_user)):
+def create_exit_interview(interview: ExitInterview, current_user: str = Depends(get_current_user)):
     interview_id = interview.InterviewID or uuid.uuid4()
     if not interview.CreatedAt:
         interview.CreatedAt = datetime.utcnow()
@@ -272,12 +354,32 @@ async def create_exit_interview(interview: ExitInterview, current_user: str = De
 # -----------------------------------------------------------------
 # ExitChecklists Endpoints
 # -----------------------------------------------------------------
+def exit_checklists_query(
+    employee_id: Optional[List[int]] = None,
+    task_completed: Optional[bool] = None,
+    fields: Optional[List[str]] = None,
+):
+    where, params = build_where([
+        ("EmployeeID", "=", employee_id),
+        ("TaskCompleted", "=", task_completed),
+    ])
+    columns = select_list(ExitChecklist, fields) if fields else "*"
+    return f"SELECT {columns} FROM ExitChecklists{where}", params
+
+exports.sql("exit_checklists", exit_db, exit_checklists_query, {"TaskCompleted": bool})
+
 @app.get("/exit_checklists", response_model=List[ExitChecklist])
-async def get_exit_checklists(current_user: str = Depends(get_current_user)):
-    return fetch_all("SELECT * FROM ExitChecklists", ())
+def get_exit_checklists(
+    employee_id: Optional[List[int]] = Query(None),
+    task_completed: Optional[bool] = None,
+    fields: Optional[List[str]] = Depends(fields_param(ExitChecklist)),
+    current_user: str = Depends(get_current_user)
+):
+    query, params = exit_checklists_query(employee_id, task_completed, fields)
+    return fetch_all_response(query, params, {"TaskCompleted": bool})
 
 @app.post("/exit_checklists", response_model=ExitChecklist, status_code=status.HTTP_201_CREATED)
-async def create_exit_checklist(checklist: ExitChecklist, current_user: str = Depends(get_current_user)):
+def create_exit_checklist(checklist: ExitChecklist, current_user: str = Depends(get_current_user)):
     checklist_id = checklist.ChecklistID or uuid.uuid4()
     if not checklist.CreatedAt:
         checklist.CreatedAt = datetime.utcnow()
@@ -298,12 +400,35 @@ async def create_exit_checklist(checklist: ExitChecklist, current_user: str = De
 # -----------------------------------------------------------------
 # ExitSurveys Endpoints
 # -----------------------------------------------------------------
+def exit_surveys_query(
+    employee_id: Optional[List[int]] = None,
+    survey_date_from: Optional[date] = None,
+    survey_date_to: Optional[date] = None,
+    fields: Optional[List[str]] = None,
+):
+    where, params = build_where([
+        ("EmployeeID", "=", employee_id),
+        ("SurveyDate", ">=", survey_date_from),
+        ("SurveyDate", "<=", survey_date_to),
+    ])
+    columns = select_list(ExitSurvey, fields) if fields else "*"
+    return f"SELECT {columns} FROM ExitSurveys{where}", params
+
+exports.sql("exit_surveys", exit_db, exit_surveys_query)
+
 @app.get("/exit_surveys", response_model=List[ExitSurvey])
-async def get_exit_surveys(current_user: str = Depends(get_current_user)):
-    return fetch_all("SELECT * FROM ExitSurveys", ())
+def get_exit_surveys(
+    employee_id: Optional[List[int]] = Query(None),
+    survey_date_from: Optional[date] = None,
+    survey_date_to: Optional[date] = None,
+    fields: Optional[List[str]] = Depends(fields_param(ExitSurvey)),
+    current_user: str = Depends(get_current_user)
+):
+    query, params = exit_surveys_query(employee_id, survey_date_from, survey_date_to, fields)
+    return fetch_all_response(query, params)
 
 @app.post("/exit_surveys", response_model=ExitSurvey, status_code=status.HTTP_201_CREATED)
-async def create_exit_survey(survey: ExitSurvey, current_user: str = Depends(get_current_user)):
+def create_exit_survey(survey: ExitSurvey, current_user: str = Depends(get_current_user)):
     survey_id = survey.SurveyID or uuid.uuid4()
     if not survey.CreatedAt:
         survey.CreatedAt = datetime.utcnow()
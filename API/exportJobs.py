@@ -0,0 +1,298 @@
+import os
+import csv
+import json
+import time
+import uuid
+import inspect
+import itertools
+import logging
+import tempfile
+import threading
+from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Literal, Optional, Tuple
+
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse
+from pydantic import BaseModel, Extra, ValidationError, create_model
+
+from apiMetrics import timed_execute
+from fastJson import convert_rows, dumps
+from fieldProjection import mongo_projection, validate_fields
+
+logger = logging.getLogger("exportJobs")
+
+# -----------------------------------------------------------------
+# Background Export Jobs
+# -----------------------------------------------------------------
+# Full extracts (all attendance, all enrollments, ...) take longer than an
+# HTTP request should. Instead a client submits a job, polls it, and
+# downloads the file when it is done:
+#
+#   POST /exports                    {"resource": "attendance", "format": "csv",
+#                                     "filters": {"attendance_date_from": "2024-01-01"}}
+#                                    -> 202 {"job_id": ..., "status": "queued", ...}
+#   GET  /exports/{job_id}           -> status, row count, download_url once done
+#   GET  /exports/{job_id}/download  -> the file
+#
+# Filters are the list route's query parameters, validated the same way;
+# "fields": [...] limits the export to those columns, as ?fields= does.
+# Jobs run on a pool of EXPORT_WORKERS threads per service process, with at
+# most EXPORT_MAX_PENDING jobs waiting (429 beyond that). Rows are read with
+# an unbuffered cursor and written EXPORT_CHUNK_ROWS at a time, so memory
+# stays flat however large the extract. A request identical to a job that
+# is still queued or running (same user, resource, format and filters) gets
+# that job back instead of starting another.
+#
+# Job state and files live under EXPORT_DIR, so any worker on the node can
+# answer a poll or a download; they are deleted after EXPORT_RETENTION_SECONDS.
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(tempfile.gettempdir(), "hr-api-exports"))
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+EXPORT_MAX_PENDING = int(os.getenv("EXPORT_MAX_PENDING", "16"))
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "5000"))
+EXPORT_RETENTION_SECONDS = float(os.getenv("EXPORT_RETENTION_SECONDS", "3600"))
+
+MEDIA_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+# A source yields (columns, rows) chunks; every chunk has the same columns.
+Chunks = Iterator[Tuple[List[str], List[tuple]]]
+
+class ExportRequest(BaseModel):
+    resource: str
+    format: Literal["csv", "jsonl"] = "csv"
+    filters: Dict[str, Any] = {}
+
+class _Forbid:
+    extra = Extra.forbid
+
+def filters_model(fn: Callable):
+    """A Pydantic model of fn's keyword parameters, used to validate submitted filters."""
+    fields = {name: (p.annotation, p.default if p.default is not p.empty else ...)
+              for name, p in inspect.signature(fn).parameters.items()}
+    return create_model(f"{fn.__name__}_filters", __config__=_Forbid, **fields)
+
+def sql_chunks(pools, query: str, params: list, converters: Optional[Dict[str, Callable]] = None) -> Chunks:
+    with pools.borrow(write=False) as cnx:
+        cursor = cnx.cursor()
+        try:
+            timed_execute(cursor, query, params)
+            columns = list(cursor.column_names)
+            while True:
+                rows = cursor.fetchmany(EXPORT_CHUNK_ROWS)
+                if not rows:
+                    break
+                yield columns, convert_rows(columns, rows, converters) if converters else rows
+        finally:
+            cursor.close()
+
+def document_chunks(documents, columns: List[str]) -> Chunks:
+    chunk = []
+    for document in documents:
+        chunk.append(tuple(document.get(c) for c in columns))
+        if len(chunk) >= EXPORT_CHUNK_ROWS:
+            yield columns, chunk
+            chunk = []
+    if chunk:
+        yield columns, chunk
+
+def _csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8")
+    return value
+
+def write_csv(path: str, chunks: Chunks) -> int:
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        header_written = False
+        for columns, rows in chunks:
+            if not header_written:
+                writer.writerow(columns)
+                header_written = True
+            writer.writerows([_csv_cell(v) for v in row] for row in rows)
+            count += len(rows)
+    return count
+
+def write_jsonl(path: str, chunks: Chunks) -> int:
+    count = 0
+    with open(path, "wb") as f:
+        for columns, rows in chunks:
+            f.write(b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows))
+            count += len(rows)
+    return count
+
+WRITERS = {"csv": write_csv, "jsonl": write_jsonl}
+
+class ExportJobs:
+    def __init__(self, service: str, directory: str = EXPORT_DIR, workers: int = EXPORT_WORKERS):
+        self.service = service
+        self.directory = os.path.join(directory, service)
+        self.sources: Dict[str, Tuple[Callable, Any]] = {}
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"export-{service}")
+        self.active: Dict[tuple, str] = {}
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    # -- sources ----------------------------------------------------
+    def source(self, resource: str, fn: Callable[..., Chunks]):
+        """Register fn(**filters) -> chunks as the export of `resource`."""
+        self.sources[resource] = (fn, filters_model(fn))
+        return fn
+
+    def sql(self, resource: str, pools, build_query: Callable[..., Tuple[str, list]],
+            converters: Optional[Dict[str, Callable]] = None):
+        """Export `resource` with the list route's own query builder: build_query(**filters) -> (query, params).
+
+        `pools` may be a list (the shards of a sharded database), exported one after the other.
+        """
+        def chunks(**filters) -> Chunks:
+            query, params = build_query(**filters)
+            if isinstance(pools, list):
+                return itertools.chain.from_iterable(sql_chunks(p, query, params, converters) for p in pools)
+            return sql_chunks(pools, query, params, converters)
+        chunks.__signature__ = inspect.signature(build_query)
+        chunks.__name__ = build_query.__name__
+        return self.source(resource, chunks)
+
+    def documents(self, resource: str, collection, model):
+        """Export a whole MongoDB collection, with the model's fields (or the requested ones) as columns."""
+        def chunks(fields: Optional[List[str]] = None) -> Chunks:
+            columns = validate_fields(model, fields) if fields else list(model.__fields__)
+            return document_chunks(collection.find({}, mongo_projection(model, fields)), columns)
+        chunks.__name__ = f"export_{resource}"
+        return self.source(resource, chunks)
+
+    # -- job state --------------------------------------------------
+    def _path(self, job_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{job_id}{suffix}")
+
+    def _save(self, job: dict):
+        temp = self._path(job["job_id"], f".json.{os.getpid()}.tmp")
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+        os.replace(temp, self._path(job["job_id"], ".json"))
+
+    def load(self, job_id: str, user: str) -> dict:
+        try:
+            if uuid.UUID(hex=job_id).hex != job_id:
+                raise ValueError(job_id)
+            with open(self._path(job_id, ".json"), encoding="utf-8") as f:
+                job = json.load(f)
+        except (ValueError, FileNotFoundError):
+            raise HTTPException(status_code=404, detail="Export job not found")
+        if job["requested_by"] != user:
+            raise HTTPException(status_code=404, detail="Export job not found")
+        return job
+
+    def _sweep(self):
+        cutoff = time.time() - EXPORT_RETENTION_SECONDS
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    # -- running ----------------------------------------------------
+    def submit(self, request: ExportRequest, user: str) -> dict:
+        if request.resource not in self.sources:
+            raise HTTPException(status_code=404,
+                                detail=f"Unknown export resource; expected one of {sorted(self.sources)}")
+        fn, model = self.sources[request.resource]
+        try:
+            filters = model(**request.filters).dict(exclude_none=True)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors())
+        key = (user, request.resource, request.format, json.dumps(filters, sort_keys=True, default=str))
+        chunks = fn(**filters)  # builds the query now, so bad filters are answered here rather than failing the job
+
+        os.makedirs(self.directory, exist_ok=True)
+        with self.lock:
+            job_id = self.active.get(key)
+            if job_id is not None:
+                return self.load(job_id, user)
+            if self.pending >= EXPORT_MAX_PENDING:
+                raise HTTPException(status_code=429, detail="Too many export jobs queued",
+                                    headers={"Retry-After": "30"})
+            job = {
+                "job_id": uuid.uuid4().hex,
+                "service": self.service,
+                "resource": request.resource,
+                "format": request.format,
+                "filters": json.loads(key[3]),
+                "requested_by": user,
+                "status": "queued",
+                "rows": None,
+                "bytes": None,
+                "error": None,
+                "submitted_at": datetime.utcnow().isoformat(),
+                "started_at": None,
+                "finished_at": None,
+            }
+            self._save(job)
+            self.active[key] = job["job_id"]
+            self.pending += 1
+        self._sweep()
+        self.executor.submit(self._run, job, key, chunks)
+        return job
+
+    def _run(self, job: dict, key: tuple, chunks: Chunks):
+        with self.lock:
+            self.pending -= 1
+        job.update(status="running", started_at=datetime.utcnow().isoformat())
+        self._save(job)
+        path = self._path(job["job_id"], f".{job['format']}")
+        try:
+            rows = WRITERS[job["format"]](f"{path}.part", chunks)
+            os.replace(f"{path}.part", path)
+            job.update(status="done", rows=rows, bytes=os.path.getsize(path))
+        except Exception as e:
+            logger.error(f"{self.service}: export {job['job_id']} ({job['resource']}) failed: {e}", exc_info=True)
+            job.update(status="failed", error=str(e))
+            try:
+                os.unlink(f"{path}.part")
+            except FileNotFoundError:
+                pass
+        finally:
+            job["finished_at"] = datetime.utcnow().isoformat()
+            self._save(job)
+            with self.lock:
+                self.active.pop(key, None)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+def install_exports(app: FastAPI, service: str, auth_dependency: Callable) -> ExportJobs:
+    exports = ExportJobs(service)
+
+    def with_links(request: Request, job: dict) -> dict:
+        if job["status"] == "done":
+            return {**job, "download_url": str(request.url_for("download_export", job_id=job["job_id"]))}
+        return job
+
+    @app.post("/exports", status_code=202, tags=["exports"])
+    def submit_export(body: ExportRequest, request: Request, user: str = Depends(auth_dependency)):
+        return with_links(request, exports.submit(body, user))
+
+    @app.get("/exports/{job_id}", tags=["exports"])
+    def get_export(job_id: str, request: Request, user: str = Depends(auth_dependency)):
+        return with_links(request, exports.load(job_id, user))
+
+    @app.get("/exports/{job_id}/download", tags=["exports"])
+    def download_export(job_id: str, user: str = Depends(auth_dependency)):
+        job = exports.load(job_id, user)
+        if job["status"] != "done":
+            return JSONResponse({"detail": f"Export is {job['status']}"}, status_code=409)
+        return FileResponse(exports._path(job_id, f".{job['format']}"), media_type=MEDIA_TYPES[job["format"]],
+                            filename=f"{job['resource']}-{job_id}.{job['format']}")
+
+    @app.on_event("shutdown")
+    def stop_exports():
+        exports.shutdown()
+
+    return exports
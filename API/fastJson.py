@@ -0,0 +1,77 @@
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional
+from uuid import UUID
+
+from fastapi import Response
+
+from apiMetrics import add_rows, db_timer, serialize_timer
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+# -----------------------------------------------------------------
+# Fast JSON Path for List Endpoints
+# -----------------------------------------------------------------
+# List routes keep their response_model so the OpenAPI schema is unchanged,
+# but return a ready-made Response built straight from the cursor's tuples
+# and column names. FastAPI skips response_model validation for Response
+# objects, which on large lists is where most of the request time goes.
+# Anything the Pydantic model used to coerce (MySQL TINYINT to bool, TIME
+# to a string, ...) is handled by per-column converters instead.
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode("utf-8")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode("utf-8")
+
+def convert_rows(columns: List[str], rows: Iterable[tuple], converters: Dict[str, Callable]) -> List[list]:
+    positions = [(i, converters[c]) for i, c in enumerate(columns) if c in converters]
+    converted = []
+    for row in rows:
+        row = list(row)
+        for i, convert in positions:
+            if row[i] is not None:
+                row[i] = convert(row[i])
+        converted.append(row)
+    return converted
+
+def encode_rows(columns: List[str], rows: Iterable[tuple],
+                converters: Optional[Dict[str, Callable]] = None) -> bytes:
+    if converters:
+        rows = convert_rows(columns, rows, converters)
+    return dumps([dict(zip(columns, row)) for row in rows])
+
+def rows_response(cursor, converters: Optional[Dict[str, Callable]] = None, status_code: int = 200) -> Response:
+    """Fetch every row from a tuple (non-dictionary) cursor and encode it as a JSON array."""
+    columns = [d[0] for d in cursor.description]
+    with db_timer():
+        rows = cursor.fetchall()
+    cursor.close()
+    add_rows(len(rows))
+    with serialize_timer():
+        body = encode_rows(columns, rows, converters)
+    return Response(body, status_code=status_code, media_type="application/json")
+
+def documents_response(documents: Iterable[dict], status_code: int = 200) -> Response:
+    """Encode already-projected documents (e.g. a Mongo cursor without _id) as a JSON array."""
+    with db_timer():
+        documents = list(documents)
+    add_rows(len(documents))
+    with serialize_timer():
+        body = dumps(documents)
+    return Response(body, status_code=status_code, media_type="application/json")
@@ -0,0 +1,73 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, get_type_hints
+
+from fastapi import HTTPException, Query, Response
+from pydantic import create_model
+
+from fastJson import dumps
+
+# -----------------------------------------------------------------
+# Field Projection (?fields=)
+# -----------------------------------------------------------------
+# List and detail routes accept ?fields=FirstName,LastName,Gender to return
+# only those fields of the route's model. List routes turn it into a narrow
+# SELECT column list or a MongoDB projection, so the database reads, the
+# encoder serializes and the response carries only what was asked for.
+# Detail routes project the single row or document, validated against the
+# model narrowed to those fields. Without ?fields=, responses are unchanged.
+
+def fields_param(model):
+    """A dependency for ?fields=: the requested field names of `model`, or None for all of them."""
+    allowed = list(model.__fields__)
+
+    def parse(fields: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(allowed)}")
+              ) -> Optional[List[str]]:
+        if fields is None:
+            return None
+        return validate_fields(model, fields.split(","))
+    return parse
+
+def validate_fields(model, fields: List[str]) -> List[str]:
+    requested = []
+    for name in fields:
+        name = name.strip()
+        if name and name not in requested:
+            requested.append(name)
+    unknown = [name for name in requested if name not in model.__fields__]
+    if unknown or not requested:
+        raise HTTPException(status_code=400,
+                            detail=f"Unknown fields {unknown}; expected a subset of {list(model.__fields__)}")
+    return requested
+
+def select_list(model, fields: Optional[List[str]], expressions: Optional[Dict[str, str]] = None,
+                prefix: str = "") -> str:
+    """SQL column list for the model's fields (all of them without `fields`); expressions override columns."""
+    expressions = expressions or {}
+    names = validate_fields(model, fields) if fields else model.__fields__
+    return ", ".join(expressions.get(name, f"{prefix}{name}") for name in names)
+
+def mongo_projection(model, fields: Optional[List[str]]) -> dict:
+    """MongoDB projection of the model's fields (all of them without `fields`), without _id.
+
+    Documents encoded straight to JSON skip response_model, so this is what
+    keeps fields outside the model out of the response.
+    """
+    projection = {name: 1 for name in (fields or model.__fields__)}
+    projection["_id"] = 0
+    return projection
+
+@lru_cache(maxsize=256)
+def narrow_model(model, fields: tuple):
+    hints = get_type_hints(model)
+    definitions = {}
+    for name in fields:
+        field = model.__fields__[name]
+        definitions[name] = (hints[name], ... if field.required else field.default)
+    return create_model(f"{model.__name__}Fields", **definitions)
+
+def project(model, row: dict, fields: Optional[List[str]]):
+    """The row for a response_model route: unchanged without `fields`, else a Response with just those fields."""
+    if fields is None:
+        return row
+    narrowed = narrow_model(model, tuple(fields))(**{name: row.get(name) for name in fields})
+    return Response(dumps(narrowed.dict()), media_type="application/json")
@@ -0,0 +1,96 @@
+import os
+from datetime import timedelta
+
+import uvicorn
+from dotenv import load_dotenv
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.security import OAuth2PasswordRequestForm
+
+import successFactorsAPI
+import timeAttendanceAPI
+import exitManagementAPI
+import learningPlatformAPI
+from apiMetrics import render_metrics
+from liveUpdates import install_live_updates
+from employee360 import install_employee360
+
+load_dotenv()
+
+# -----------------------------------------------------------------
+# Single-Process API Gateway
+# -----------------------------------------------------------------
+# Serves all four APIs from one ASGI process:
+#
+#   /successfactors/...  /timeattendance/...  /exitmanagement/...  /learning/...
+#
+# Every service module is imported once, so the process holds one MySQL pool
+# per database, one MongoClient and one token-verification cache, instead of
+# one set per service process. The services share SECRET_KEY, so a token
+# from the gateway's /token is accepted by all of them.
+# Point the ETL jobs at the prefixes, e.g. SUCCESSFACTORS_URL=http://host:8000/successfactors,
+# and AUTH_URL=http://host:8000 to log in once.
+#
+# Run with several pre-forked workers:
+#   python gateway.py                      (GATEWAY_WORKERS, default: CPU count)
+#   uvicorn gateway:app --workers 4
+# Databases are opened lazily, or by the warm-up steps in each worker's
+# startup event (WARMUP_ON_STARTUP), so pre-forked workers never share a
+# connection. GET /ready reports every service's readiness checks.
+# GET /events streams live dashboard updates (see liveUpdates), and
+# GET /employee360/{id} joins one employee's data from all four services.
+SERVICES = {
+    "/successfactors": successFactorsAPI,
+    "/timeattendance": timeAttendanceAPI,
+    "/exitmanagement": exitManagementAPI,
+    "/learning": learningPlatformAPI,
+}
+
+app = FastAPI(title="HR Analytics API Gateway")
+for prefix, service in SERVICES.items():
+    app.mount(prefix, service.app)
+
+# Mounted apps do not receive lifespan events; run their handlers from ours.
+@app.on_event("startup")
+async def startup_event():
+    for service in SERVICES.values():
+        await service.app.router.startup()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for service in SERVICES.values():
+        await service.app.router.shutdown()
+
+live_updates = install_live_updates(app, successFactorsAPI.token_cache)
+install_employee360(app)
+
+@app.post("/token", response_model=dict)
+def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
+    fake_users_db = {os.getenv("ADMIN_USERNAME"): os.getenv("ADMIN_PASSWORD")}
+    if form_data.username in fake_users_db and fake_users_db[form_data.username] == form_data.password:
+        access_token = successFactorsAPI.create_access_token(
+            {"sub": form_data.username},
+            timedelta(minutes=successFactorsAPI.ACCESS_TOKEN_EXPIRE_MINUTES)
+        )
+        return {"access_token": access_token, "token_type": "bearer"}
+    raise HTTPException(status_code=401, detail="Incorrect username or password")
+
+@app.get("/ready", include_in_schema=False)
+def get_ready():
+    statuses = [service.readiness.status() for service in SERVICES.values()]
+    ready = all(ok for ok, _ in statuses)
+    body = {"ready": ready, "services": [status for _, status in statuses]}
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    text = render_metrics([service.metrics for service in SERVICES.values()])
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+if __name__ == "__main__":
+    uvicorn.run(
+        "gateway:app",
+        host=os.getenv("GATEWAY_HOST", "0.0.0.0"),
+        port=int(os.getenv("GATEWAY_PORT", "8000")),
+        workers=int(os.getenv("GATEWAY_WORKERS", str(os.cpu_count() or 1))),
+    )
@@ -8,9 +8,21 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 import jwt
 from jwt import PyJWTError
 from pydantic import BaseModel
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING
+from pymongo.errors import DuplicateKeyError
 from bson.objectid import ObjectId
 from dotenv import load_dotenv
+from tokenCache import AUTH_TOKEN_URL, get_token_cache, issuer_claims
+from apiMetrics import db_timer, install_metrics
+from singleFlight import install_single_flight
+from compression import install_compression
+from admissionControl import install_admission_control
+from fastJson import documents_response
+from fieldProjection import fields_param, mongo_projection, project
+from sharedCache import SharedCache
+from exportJobs import install_exports
+from batchRequests import install_batch, mongo_lookup
+from readiness import install_readiness
 
 # Load environment variables from .env file
 load_dotenv()
@@ -22,17 +34,18 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl=AUTH_TOKEN_URL)
+token_cache = get_token_cache(SECRET_KEY, ALGORITHM)
 
 def create_access_token(data: dict, expires_delta: timedelta):
     to_encode = data.copy()
     expire = datetime.utcnow() + expires_delta
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, **issuer_claims()})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def get_current_user(token: str = Depends(oauth2_scheme)):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = token_cache.verify(token)
         user: str = payload.get("sub")
         if user is None:
             raise HTTPException(status_code=401, detail="Invalid token")
@@ -44,7 +57,7 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
 # MongoDB Connection Setup
 # -----------------------------------------------------------------
 MONGO_URI = os.getenv("MONGO_URI")
-client = MongoClient(MONGO_URI)
+client = MongoClient(MONGO_URI, connect=False)  # connects on first use, not at import
 DB_NAME = os.getenv("MONGO_DB")
 db = client[DB_NAME]
 
@@ -55,6 +68,36 @@ enrollments_collection = db["enrollments"]
 assessments_collection = db["assessments"]
 certificates_collection = db["certificates"]
 
+# Indexes provisioned at startup: a unique index on each collection's natural
+# ID (serving detail lookups and duplicate detection) plus the foreign keys
+# used to join enrollments, assessments and certificates.
+COLLECTION_INDEXES = [
+    (courses_collection, [("CourseID", True)]),
+    (modules_collection, [("ModuleID", True), ("CourseID", False)]),
+    (enrollments_collection, [("EnrollmentID", True), ("EmployeeID", False), ("CourseID", False)]),
+    (assessments_collection, [("AssessmentID", True), ("EnrollmentID", False)]),
+    (certificates_collection, [("CertificateID", True), ("EnrollmentID", False)]),
+]
+
+indexes_ready = False
+
+def ensure_indexes():
+    # Runs once per process, from the readiness check or warm-up, or at the
+    # latest before the first insert, whose duplicate detection relies on the
+    # unique indexes. create_index is a no-op when an identical index exists.
+    global indexes_ready
+    if indexes_ready:
+        return
+    for collection, indexes in COLLECTION_INDEXES:
+        for field, unique in indexes:
+            collection.create_index([(field, ASCENDING)], unique=unique)
+    indexes_ready = True
+
+def ping_mongo():
+    client.admin.command("ping")
+    ensure_indexes()
+    return "ok"
+
 # -----------------------------------------------------------------
 # Pydantic Models
 # -----------------------------------------------------------------
@@ -115,6 +158,35 @@ def serialize_doc(doc):
 # FastAPI Application Initialization
 # -----------------------------------------------------------------
 app = FastAPI(title="Learning Platform API")
+install_compression(app)
+install_admission_control(app)
+install_single_flight(app, token_cache)
+metrics = install_metrics(app, "learningplatform")
+readiness = install_readiness(app, "learningplatform")
+readiness.check("mongodb")(ping_mongo)
+readiness.warmup("mongodb")(ping_mongo)
+
+# The course catalog (courses and modules) is served from the node-wide
+# response cache and invalidated by the matching POST.
+response_cache = SharedCache("learningplatform")
+
+exports = install_exports(app, "learningplatform", get_current_user)
+exports.documents("courses", courses_collection, Course)
+exports.documents("modules", modules_collection, Module)
+exports.documents("enrollments", enrollments_collection, Enrollment)
+exports.documents("assessments", assessments_collection, Assessment)
+exports.documents("certificates", certificates_collection, Certificate)
+
+# /batch merges point lookups on these routes into one $in query each.
+batch = install_batch(app, get_current_user)
+batch.lookup("/courses/{course_id}", mongo_lookup(courses_collection, "CourseID", Course), "Course not found")
+batch.lookup("/modules/{module_id}", mongo_lookup(modules_collection, "ModuleID", Module), "Module not found")
+batch.lookup("/enrollments/{enrollment_id}", mongo_lookup(enrollments_collection, "EnrollmentID", Enrollment),
+             "Enrollment not found")
+batch.lookup("/assessments/{assessment_id}", mongo_lookup(assessments_collection, "AssessmentID", Assessment),
+             "Assessment not found")
+batch.lookup("/certificates/{certificate_id}", mongo_lookup(certificates_collection, "CertificateID", Certificate),
+             "Certificate not found")
 
 # -----------------------------------------------------------------
 # Authentication Endpoint
@@ -134,110 +206,139 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
 # Courses Endpoints
 # -----------------------------------------------------------------
 @app.get("/courses", response_model=List[Course])
-def get_courses(user: str = Depends(get_current_user)):
-    courses = list(courses_collection.find())
-    return [serialize_doc(course) for course in courses]
+def get_courses(fields: Optional[List[str]] = Depends(fields_param(Course)),
+                user: str = Depends(get_current_user)):
+    return response_cache.response("courses", ",".join(fields or []),
+                                   lambda: documents_response(courses_collection.find({}, mongo_projection(Course, fields))))
 
 @app.get("/courses/{course_id}", response_model=Course)
-def get_course(course_id: int, user: str = Depends(get_current_user)):
-    course = courses_collection.find_one({"CourseID": course_id})
+def get_course(course_id: int, fields: Optional[List[str]] = Depends(fields_param(Course)),
+               user: str = Depends(get_current_user)):
+    with db_timer():
+        course = courses_collection.find_one({"CourseID": course_id}, mongo_projection(Course, fields))
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
-    return serialize_doc(course)
+    return project(Course, serialize_doc(course), fields)
 
 @app.post("/courses", response_model=Course)
 def create_course(course: Course, user: str = Depends(get_current_user)):
-    if courses_collection.find_one({"CourseID": course.CourseID}):
+    ensure_indexes()
+    try:
+        with db_timer():
+            courses_collection.insert_one(course.dict())
+    except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="Course with this CourseID already exists")
-    courses_collection.insert_one(course.dict())
+    response_cache.invalidate("courses")
     return course
 
 # -----------------------------------------------------------------
 # Modules Endpoints
 # -----------------------------------------------------------------
 @app.get("/modules", response_model=List[Module])
-def get_modules(user: str = Depends(get_current_user)):
-    modules = list(modules_collection.find())
-    return [serialize_doc(module) for module in modules]
+def get_modules(fields: Optional[List[str]] = Depends(fields_param(Module)),
+                user: str = Depends(get_current_user)):
+    return response_cache.response("modules", ",".join(fields or []),
+                                   lambda: documents_response(modules_collection.find({}, mongo_projection(Module, fields))))
 
 @app.get("/modules/{module_id}", response_model=Module)
-def get_module(module_id: int, user: str = Depends(get_current_user)):
-    module = modules_collection.find_one({"ModuleID": module_id})
+def get_module(module_id: int, fields: Optional[List[str]] = Depends(fields_param(Module)),
+               user: str = Depends(get_current_user)):
+    with db_timer():
+        module = modules_collection.find_one({"ModuleID": module_id}, mongo_projection(Module, fields))
     if not module:
         raise HTTPException(status_code=404, detail="Module not found")
-    return serialize_doc(module)
+    return project(Module, serialize_doc(module), fields)
 
 @app.post("/modules", response_model=Module)
 def create_module(module: Module, user: str = Depends(get_current_user)):
-    if modules_collection.find_one({"ModuleID": module.ModuleID}):
+    ensure_indexes()
+    try:
+        with db_timer():
+            modules_collection.insert_one(module.dict())
+    except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="Module with this ModuleID already exists")
-    modules_collection.insert_one(module.dict())
+    response_cache.invalidate("modules")
     return module
 
 # -----------------------------------------------------------------
 # Enrollments Endpoints
 # -----------------------------------------------------------------
 @app.get("/enrollments", response_model=List[Enrollment])
-def get_enrollments(user: str = Depends(get_current_user)):
-    enrollments = list(enrollments_collection.find())
-    return [serialize_doc(enrollment) for enrollment in enrollments]
+def get_enrollments(fields: Optional[List[str]] = Depends(fields_param(Enrollment)),
+                    user: str = Depends(get_current_user)):
+    return documents_response(enrollments_collection.find({}, mongo_projection(Enrollment, fields)))
 
 @app.get("/enrollments/{enrollment_id}", response_model=Enrollment)
-def get_enrollment(enrollment_id: int, user: str = Depends(get_current_user)):
-    enrollment = enrollments_collection.find_one({"EnrollmentID": enrollment_id})
+def get_enrollment(enrollment_id: int, fields: Optional[List[str]] = Depends(fields_param(Enrollment)),
+                   user: str = Depends(get_current_user)):
+    with db_timer():
+        enrollment = enrollments_collection.find_one({"EnrollmentID": enrollment_id}, mongo_projection(Enrollment, fields))
     if not enrollment:
         raise HTTPException(status_code=404, detail="Enrollment not found")
-    return serialize_doc(enrollment)
+    return project(Enrollment, serialize_doc(enrollment), fields)
 
 @app.post("/enrollments", response_model=Enrollment)
 def create_enrollment(enrollment: Enrollment, user: str = Depends(get_current_user)):
-    if enrollments_collection.find_one({"EnrollmentID": enrollment.EnrollmentID}):
+    ensure_indexes()
+    try:
+        with db_timer():
+            enrollments_collection.insert_one(enrollment.dict())
+    except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="Enrollment with this EnrollmentID already exists")
-    enrollments_collection.insert_one(enrollment.dict())
     return enrollment
 
 # -----------------------------------------------------------------
 # Assessments Endpoints
 # -----------------------------------------------------------------
 @app.get("/assessments", response_model=List[Assessment])
-def get_assessments(user: str = Depends(get_current_user)):
-    assessments = list(assessments_collection.find())
-    return [serialize_doc(assessment) for assessment in assessments]
+def get_assessments(fields: Optional[List[str]] = Depends(fields_param(Assessment)),
+                    user: str = Depends(get_current_user)):
+    return documents_response(assessments_collection.find({}, mongo_projection(Assessment, fields)))
 
 @app.get("/assessments/{assessment_id}", response_model=Assessment)
-def get_assessment(assessment_id: int, user: str = Depends(get_current_user)):
-    assessment = assessments_collection.find_one({"AssessmentID": assessment_id})
+def get_assessment(assessment_id: int, fields: Optional[List[str]] = Depends(fields_param(Assessment)),
+                   user: str = Depends(get_current_user)):
+    with db_timer():
+        assessment = assessments_collection.find_one({"AssessmentID": assessment_id}, mongo_projection(Assessment, fields))
     if not assessment:
         raise HTTPException(status_code=404, detail="Assessment not found")
-    return serialize_doc(assessment)
+    return project(Assessment, serialize_doc(assessment), fields)
 
 @app.post("/assessments", response_model=Assessment)
 def create_assessment(assessment: Assessment, user: str = Depends(get_current_user)):
-    if assessments_collection.find_one({"AssessmentID": assessment.AssessmentID}):
+    ensure_indexes()
+    try:
+        with db_timer():
+            assessments_collection.insert_one(assessment.dict())
+    except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="Assessment with this AssessmentID already exists")
-    assessments_collection.insert_one(assessment.dict())
     return assessment
 
 # -----------------------------------------------------------------
 # Certificates Endpoints
 # -----------------------------------------------------------------
 @app.get("/certificates", response_model=List[Certificate])
-def get_certificates(user: str = Depends(get_current_user)):
-    certificates = list(certificates_collection.find())
-    return [serialize_doc(certificate) for certificate in certificates]
+def get_certificates(fields: Optional[List[str]] = Depends(fields_param(Certificate)),
+                     user: str = Depends(get_current_user)):
+    return documents_response(certificates_collection.find({}, mongo_projection(Certificate, fields)))
 
 @app.get("/certificates/{certificate_id}", response_model=Certificate)
-def get_certificate(certificate_id: int, user: str = Depends(get_current_user)):
-    certificate = certificates_collection.find_one({"CertificateID": certificate_id})
+def get_certificate(certificate_id: int, fields: Optional[List[str]] = Depends(fields_param(Certificate)),
+                    user: str = Depends(get_current_user)):
+    with db_timer():
+        certificate = certificates_collection.find_one({"CertificateID": certificate_id}, mongo_projection(Certificate, fields))
     if not certificate:
         raise HTTPException(status_code=404, detail="Certificate not found")
-    return serialize_doc(certificate)
+    return project(Certificate, serialize_doc(certificate), fields)
 
 @app.post("/certificates", response_model=Certificate)
 def create_certificate(certificate: Certificate, user: str = Depends(get_current_user)):
-    if certificates_collection.find_one({"CertificateID": certificate.CertificateID}):
+    ensure_indexes()
+    try:
+        with db_timer():
+            certificates_collection.insert_one(certificate.dict())
+    except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="Certificate with this CertificateID already exists")
-    certificates_collection.insert_one(certificate.dict())
     return certificate
 
 # -----------------------------------------------------------------
@@ -0,0 +1,259 @@
+import os
+import json
+import uuid
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Optional, Set
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from jwt import PyJWTError
+from pymongo import MongoClient, ASCENDING
+from pymongo.errors import OperationFailure, PyMongoError
+
+from tokenCache import TokenCache
+
+logger = logging.getLogger("liveUpdates")
+
+# -----------------------------------------------------------------
+# Live Dashboard Updates over Server-Sent Events
+# -----------------------------------------------------------------
+# GET /events is an SSE stream of change events, for the dashboard to refresh
+# the affected cards instead of reloading everything on a timer:
+#
+#   analysis.dashboard / analysis.diversity / analysis.attrition
+#       an analysis job rewrote that collection
+#   employee.hired, employee.departed, resignation.requested
+#       written through the SuccessFactors and Exit Management APIs
+#
+# ?topics=analysis,employee.hired limits the stream to topic prefixes.
+# Browsers' EventSource cannot send headers, so the bearer token may also be
+# passed as ?access_token=. A reconnecting client sends Last-Event-ID and is
+# replayed what it missed from the last LIVE_EVENTS_HISTORY events; if that
+# is too far back, it gets a "reset" event and should reload once.
+#
+# The bus is MongoDB (the Atlas database the analysis jobs write to). The
+# APIs insert their events into a small LiveEvents collection, and every
+# process serving /events follows one change stream over that collection
+# and the analysis outputs. Analysis jobs rewrite a collection wholesale
+# (delete_many + insert_many), so changes to one collection are coalesced
+# for ANALYSIS_DEBOUNCE_SECONDS into a single event. Each event is encoded
+# once and fanned out to every subscriber's queue; a subscriber whose queue
+# (LIVE_EVENTS_QUEUE_SIZE) overflows is sent "reset" and disconnected
+# rather than slowing the others down.
+#
+# Without MONGO_ATLAS_URI, events are delivered within the process only,
+# which is enough for a single gateway worker.
+MONGO_ATLAS_URI = os.getenv("MONGO_ATLAS_URI")
+MONGO_ATLAS_DB = os.getenv("MONGO_ATLAS_DB")
+LIVE_EVENTS_COLLECTION = os.getenv("LIVE_EVENTS_COLLECTION", "LiveEvents")
+LIVE_EVENTS_RETENTION_SECONDS = int(os.getenv("LIVE_EVENTS_RETENTION_SECONDS", "86400"))
+LIVE_EVENTS_QUEUE_SIZE = int(os.getenv("LIVE_EVENTS_QUEUE_SIZE", "256"))
+LIVE_EVENTS_HISTORY = int(os.getenv("LIVE_EVENTS_HISTORY", "512"))
+LIVE_EVENTS_HEARTBEAT_SECONDS = float(os.getenv("LIVE_EVENTS_HEARTBEAT_SECONDS", "15"))
+ANALYSIS_DEBOUNCE_SECONDS = float(os.getenv("ANALYSIS_DEBOUNCE_SECONDS", "2"))
+
+ANALYSIS_COLLECTIONS = ("Dashboard", "Diversity", "Attrition")
+
+class EventHub:
+    """In-process fan-out of encoded SSE frames to subscriber queues; used from the event loop only."""
+
+    def __init__(self):
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.history = deque(maxlen=LIVE_EVENTS_HISTORY)
+        self.next_id = 1
+        # Event ids are "<epoch>-<n>"; an id from another process or an
+        # earlier run of this one cannot be resumed from.
+        self.epoch = uuid.uuid4().hex[:8]
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def broadcast(self, topic: str, data: dict):
+        event_id = self.next_id
+        self.next_id += 1
+        payload = json.dumps(data, default=str, separators=(",", ":"))
+        frame = f"id: {self.epoch}-{event_id}\nevent: {topic}\ndata: {payload}\n\n".encode("utf-8")
+        self.history.append((event_id, topic, frame))
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait((topic, frame))
+            except asyncio.QueueFull:
+                self.subscribers.discard(queue)
+                queue.overflowed = True
+
+    def broadcast_threadsafe(self, topic: str, data: dict):
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.broadcast, topic, data)
+
+    def missed(self, last_event_id: str) -> Optional[list]:
+        """Events after last_event_id, or None if they cannot all be replayed."""
+        epoch, _, n = last_event_id.partition("-")
+        if epoch != self.epoch or not n.isdigit() or int(n) >= self.next_id:
+            return None
+        last_event_id = int(n)
+        if self.history and self.history[0][0] > last_event_id + 1:
+            return None
+        return [(topic, frame) for event_id, topic, frame in self.history if event_id > last_event_id]
+
+hub = EventHub()
+
+def _frame(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+async def event_stream(request: Request, topics: Optional[tuple], last_event_id: Optional[str]):
+    wanted = (lambda topic: True) if not topics else (lambda topic: topic.startswith(topics))
+    queue = asyncio.Queue(maxsize=LIVE_EVENTS_QUEUE_SIZE)
+    queue.overflowed = False
+    hub.subscribers.add(queue)
+    try:
+        yield b"retry: 3000\n\n"
+        if last_event_id is not None:
+            missed = hub.missed(last_event_id)
+            if missed is None:
+                yield _frame("reset", {"reason": "missed events"})
+            else:
+                for topic, frame in missed:
+                    if wanted(topic):
+                        yield frame
+        while True:
+            try:
+                topic, frame = await asyncio.wait_for(queue.get(), LIVE_EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if queue.overflowed:
+                    yield _frame("reset", {"reason": "too slow"})
+                    return
+                if await request.is_disconnected():
+                    return
+                yield b": keep-alive\n\n"
+                continue
+            if wanted(topic):
+                yield frame
+            if queue.overflowed and queue.empty():
+                yield _frame("reset", {"reason": "too slow"})
+                return
+    finally:
+        hub.subscribers.discard(queue)
+
+# -----------------------------------------------------------------
+# MongoDB Bus
+# -----------------------------------------------------------------
+_client = MongoClient(MONGO_ATLAS_URI, connect=False) if MONGO_ATLAS_URI and MONGO_ATLAS_DB else None
+_ttl_index_ready = False
+_bus_available = True
+
+def publish(topic: str, data: dict):
+    """Publish a change event to every /events subscriber, in every process.
+
+    Blocks on the MongoDB insert; called on an event loop, the insert is
+    handed to the default executor instead.
+    """
+    data = json.loads(json.dumps(data, default=str))  # dates, UUIDs, ... as strings, for BSON and JSON alike
+    if _client is None or not _bus_available:
+        hub.broadcast_threadsafe(topic, data)
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _insert_event(topic, data)
+    else:
+        loop.run_in_executor(None, _insert_event, topic, data)
+
+def _insert_event(topic: str, data: dict):
+    global _ttl_index_ready
+    events = _client[MONGO_ATLAS_DB][LIVE_EVENTS_COLLECTION]
+    try:
+        if not _ttl_index_ready:
+            events.create_index([("createdAt", ASCENDING)], expireAfterSeconds=LIVE_EVENTS_RETENTION_SECONDS)
+            _ttl_index_ready = True
+        events.insert_one({"topic": topic, "data": data, "createdAt": datetime.now(timezone.utc)})
+    except PyMongoError as e:
+        # Live updates are best effort; the write they describe has already succeeded.
+        logger.warning(f"Could not publish {topic}: {e}")
+
+class ChangeFeed:
+    """Follows one change stream over the analysis outputs and LiveEvents, feeding the hub."""
+
+    def __init__(self):
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.resume_token = None
+        self.pending = {}  # analysis collection -> time of its last change
+
+    def start(self):
+        if _client is None or self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.run, name="live-updates", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def run(self):
+        global _bus_available
+        pipeline = [{"$match": {"ns.coll": {"$in": list(ANALYSIS_COLLECTIONS) + [LIVE_EVENTS_COLLECTION]}}}]
+        while not self.stopped.is_set():
+            try:
+                with _client[MONGO_ATLAS_DB].watch(pipeline, resume_after=self.resume_token,
+                                                   max_await_time_ms=500) as stream:
+                    while not self.stopped.is_set():
+                        change = stream.try_next()
+                        if change is not None:
+                            self.resume_token = stream.resume_token
+                            self.handle(change)
+                        self.flush_analysis()
+            except OperationFailure as e:
+                logger.error(f"Change streams unavailable, live updates limited to this process: {e}")
+                _bus_available = False
+                return
+            except PyMongoError as e:
+                logger.warning(f"Change stream interrupted, resuming: {e}")
+                self.stopped.wait(1)
+
+    def handle(self, change: dict):
+        collection = change["ns"]["coll"]
+        if collection == LIVE_EVENTS_COLLECTION:
+            if change["operationType"] == "insert":
+                event = change["fullDocument"]
+                hub.broadcast_threadsafe(event["topic"], event["data"])
+        else:
+            self.pending[collection] = time.monotonic()
+
+    def flush_analysis(self):
+        now = time.monotonic()
+        for collection, changed_at in list(self.pending.items()):
+            if now - changed_at >= ANALYSIS_DEBOUNCE_SECONDS:
+                del self.pending[collection]
+                hub.broadcast_threadsafe(f"analysis.{collection.lower()}", {"collection": collection})
+
+def install_live_updates(app: FastAPI, token_cache: TokenCache):
+    feed = ChangeFeed()
+
+    @app.on_event("startup")
+    async def start_feed():
+        hub.loop = asyncio.get_running_loop()
+        feed.start()
+
+    @app.on_event("shutdown")
+    def stop_feed():
+        feed.stop()
+
+    @app.get("/events", include_in_schema=False)
+    def get_events(request: Request, topics: Optional[str] = None, access_token: Optional[str] = None):
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        token = token if scheme.lower() == "bearer" and token else access_token
+        try:
+            if not token or token_cache.verify(token).get("sub") is None:
+                raise HTTPException(status_code=401, detail="Invalid token")
+        except PyJWTError:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        prefixes = tuple(t.strip() for t in topics.split(",") if t.strip()) if topics else None
+        return StreamingResponse(
+            event_stream(request, prefixes, request.headers.get("last-event-id")),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    return feed
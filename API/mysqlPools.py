@@ -0,0 +1,302 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException
+from mysql.connector import Error
+from mysql.connector.errors import PoolError
+from mysql.connector.pooling import MySQLConnectionPool
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+
+from admissionControl import apply_execution_limit
+
+logger = logging.getLogger("mysqlPools")
+
+# -----------------------------------------------------------------
+# Connection Pools with Read-Replica Routing
+# -----------------------------------------------------------------
+# Each service keeps one pool on the primary (MYSQL_HOST) and, when
+# MYSQL_REPLICA_HOSTS is set ("host" or "host:port", comma separated), one
+# pool per replica. A request leases at most one connection, on first use,
+# and hands it back when the response has been sent:
+#
+# - GET requests read from a replica, round-robin over those whose
+#   replication lag is within REPLICA_MAX_LAG_SECONDS. Lag is re-checked at
+#   most every REPLICA_CHECK_SECONDS per replica. A replica that cannot be
+#   reached or is not replicating is skipped until its next check. With no
+#   usable replica, reads go to the primary.
+# - Any other method uses the primary, and makes the same client's GETs
+#   (same bearer token) stick to the primary for READ_YOUR_WRITES_SECONDS,
+#   so a client always sees its own writes.
+#
+# Pools do not reset sessions when connections come back (a round trip that
+# would also discard the prepared statements cached per connection, see
+# preparedStatements); any transaction left open is rolled back instead.
+MYSQL_POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "5"))
+MYSQL_POOL_TIMEOUT = float(os.getenv("MYSQL_POOL_TIMEOUT", "5"))
+MYSQL_REPLICA_HOSTS = os.getenv("MYSQL_REPLICA_HOSTS", "")
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_CHECK_SECONDS = float(os.getenv("REPLICA_CHECK_SECONDS", "5"))
+
+READ_METHODS = ("GET", "HEAD")
+
+# The DatabasePools that most recently handed out a connection in this
+# context, so statement observers (slowQueryLog) know which server ran a
+# statement when a service has several (shards, directory).
+current_pools: contextvars.ContextVar = contextvars.ContextVar("current_pools", default=None)
+
+def parse_hosts(value: str) -> List[tuple]:
+    hosts = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(":")
+        hosts.append((host, int(port) if port else 3306))
+    return hosts
+
+def replica_lag(cnx) -> Optional[float]:
+    """Seconds behind the source, or None when the server is not replicating."""
+    cursor = cnx.cursor(dictionary=True, buffered=True)
+    try:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+        except Error:
+            cursor.execute("SHOW SLAVE STATUS")  # MySQL before 8.0.22
+        status = cursor.fetchone()
+    finally:
+        cursor.close()
+    if not status:
+        return None
+    lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+    return None if lag is None else float(lag)
+
+class _Lease:
+    __slots__ = ("write", "session", "conn", "replica")
+
+    def __init__(self, write: bool, session: Optional[str]):
+        self.write = write
+        self.session = session
+        self.conn = None
+        self.replica = None
+
+class Replica:
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.pool = None
+        self.healthy = False
+        self.lag = None
+        self.checked_at = 0.0
+
+class DatabasePools:
+    def __init__(self, name: str, pool_size: int = MYSQL_POOL_SIZE, replica_hosts: str = MYSQL_REPLICA_HOSTS,
+                 **connect_args):
+        self.name = name
+        self.pool_size = pool_size
+        self.connect_args = connect_args
+        self.primary = None
+        self.replicas = [Replica(host, port) for host, port in parse_hosts(replica_hosts)]
+        self.sticky_until = {}
+        self.next_replica = 0
+        self.lock = threading.Lock()
+        self.open_lock = threading.Lock()
+        self._lease = contextvars.ContextVar(f"mysql_lease_{name}", default=None)
+
+    # -- pools ------------------------------------------------------
+    def _create_pool(self, suffix: str, **overrides) -> MySQLConnectionPool:
+        return MySQLConnectionPool(pool_name=f"{self.name}_{suffix}", pool_size=self.pool_size,
+                                   pool_reset_session=False, **{**self.connect_args, **overrides})
+
+    def open(self):
+        """Create the primary pool (raises if the primary is unreachable) and any replica pools.
+
+        Called on the first lease, or up front by a warm-up step; creating a
+        pool opens all of its connections.
+        """
+        with self.open_lock:
+            if self.primary is None:
+                self.primary = self._create_pool("primary")
+                for replica in self.replicas:
+                    self._check_replica(replica)
+
+    def ping(self) -> dict:
+        """Readiness check: a round trip on a primary connection, plus each replica's last known state."""
+        with self.borrow(write=True) as cnx:
+            cnx.ping()
+        replicas = {}
+        for r in self.replicas:
+            if not r.checked_at:
+                replicas[f"{r.host}:{r.port}"] = "unchecked"
+            else:
+                replicas[f"{r.host}:{r.port}"] = {"healthy": r.healthy, "lag_seconds": r.lag}
+        return {"primary": "ok", "replicas": replicas}
+
+    def close(self):
+        # Pooled connections are closed when the pools are garbage collected;
+        # drop idle ones now so shutdown does not leave sessions open.
+        for pool in [self.primary] + [r.pool for r in self.replicas]:
+            if pool is not None:
+                pool._remove_connections()
+
+    @staticmethod
+    def release(cnx):
+        """Return a leased connection to its pool."""
+        try:
+            if cnx.in_transaction:
+                cnx.rollback()
+        finally:
+            cnx.close()
+
+    def each_connection(self, fn):
+        """Call fn(cnx) on every connection of the primary pool, e.g. to prepare statements at warm-up."""
+        self.open()
+        leased = []
+        try:
+            for _ in range(self.pool_size):
+                leased.append(self._get(self.primary))
+            for cnx in leased:
+                fn(cnx)
+        finally:
+            for cnx in leased:
+                self.release(cnx)
+
+    @staticmethod
+    def _get(pool: MySQLConnectionPool):
+        # mysql-connector raises at once when a pool is exhausted; wait for a
+        # connection to come back instead, up to MYSQL_POOL_TIMEOUT.
+        deadline = time.monotonic() + MYSQL_POOL_TIMEOUT
+        delay = 0.005
+        while True:
+            try:
+                return pool.get_connection()
+            except PoolError:
+                if time.monotonic() >= deadline:
+                    raise HTTPException(status_code=503, detail="No database connection available",
+                                        headers={"Retry-After": "1"})
+                time.sleep(delay)
+                delay = min(delay * 2, 0.1)
+
+    # -- replica health ---------------------------------------------
+    def _check_replica(self, replica: Replica):
+        replica.checked_at = time.monotonic()
+        try:
+            if replica.pool is None:
+                replica.pool = self._create_pool(f"replica_{replica.host}_{replica.port}",
+                                                 host=replica.host, port=replica.port,
+                                                 user=os.getenv("MYSQL_REPLICA_USER", self.connect_args.get("user")),
+                                                 password=os.getenv("MYSQL_REPLICA_PASSWORD",
+                                                                    self.connect_args.get("password")))
+            cnx = self._get(replica.pool)
+            try:
+                replica.lag = replica_lag(cnx)
+            finally:
+                cnx.close()
+        except (Error, HTTPException) as e:
+            logger.warning(f"Replica {replica.host}:{replica.port} unavailable: {e}")
+            replica.lag = None
+        replica.healthy = replica.lag is not None and replica.lag <= REPLICA_MAX_LAG_SECONDS
+
+    def _pick_replica(self) -> Optional[Replica]:
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            with self.lock:
+                replica = self.replicas[self.next_replica % len(self.replicas)]
+                self.next_replica += 1
+            if now - replica.checked_at >= REPLICA_CHECK_SECONDS:
+                self._check_replica(replica)
+            if replica.healthy:
+                return replica
+        return None
+
+    # -- read-your-writes -------------------------------------------
+    def _mark_write(self, session: Optional[str]):
+        if session is None or READ_YOUR_WRITES_SECONDS <= 0:
+            return
+        now = time.monotonic()
+        with self.lock:
+            if len(self.sticky_until) > 10000:
+                self.sticky_until = {k: v for k, v in self.sticky_until.items() if v > now}
+            self.sticky_until[session] = now + READ_YOUR_WRITES_SECONDS
+
+    def _is_sticky(self, session: Optional[str]) -> bool:
+        return session is not None and self.sticky_until.get(session, 0) > time.monotonic()
+
+    # -- leasing ----------------------------------------------------
+    def _acquire(self, lease: _Lease):
+        if lease.write:
+            self._mark_write(lease.session)
+        elif self.replicas and not self._is_sticky(lease.session):
+            replica = self._pick_replica()
+            if replica is not None:
+                try:
+                    lease.conn = self._get(replica.pool)
+                    lease.replica = replica
+                    return lease.conn
+                except (Error, HTTPException) as e:
+                    logger.warning(f"Falling back to primary, replica {replica.host}:{replica.port} failed: {e}")
+                    replica.healthy = False
+        if self.primary is None:
+            self.open()
+        lease.conn = self._get(self.primary)
+        return lease.conn
+
+    def connection(self):
+        """The current request's connection: a replica for reads, the primary for writes."""
+        lease = self._lease.get()
+        if lease is None:
+            raise RuntimeError(f"No request in progress for {self.name}; use borrow() outside requests")
+        if lease.conn is None:
+            apply_execution_limit(self._acquire(lease))
+        current_pools.set(self)
+        return lease.conn
+
+    @contextmanager
+    def borrow(self, write: bool = True):
+        """Lease a connection outside of a request (startup, scripts); returned to its pool on exit."""
+        lease = _Lease(write, None)
+        token = self._lease.set(lease)
+        pools_token = current_pools.set(self)
+        try:
+            yield self.connection()
+        finally:
+            current_pools.reset(pools_token)
+            self._lease.reset(token)
+            if lease.conn is not None:
+                self.release(lease.conn)
+
+    def install(self, app: FastAPI):
+        """Give every HTTP request to `app` a lazily leased connection, released after the response."""
+        app.add_middleware(ConnectionLeaseMiddleware, pools=self)
+
+def session_key(scope) -> Optional[str]:
+    authorization = Headers(scope=scope).get("authorization")
+    if authorization:
+        return hashlib.sha256(authorization.encode("utf-8")).hexdigest()
+    client = scope.get("client")
+    return client[0] if client else None
+
+class ConnectionLeaseMiddleware:
+    def __init__(self, app, pools: DatabasePools):
+        self.app = app
+        self.pools = pools
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        lease = _Lease(scope["method"] not in READ_METHODS, session_key(scope))
+        token = self.pools._lease.set(lease)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.pools._lease.reset(token)
+            if lease.conn is not None:
+                await run_in_threadpool(self.pools.release, lease.conn)
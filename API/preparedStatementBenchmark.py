@@ -0,0 +1,91 @@
+import os
+import time
+import random
+import argparse
+import statistics
+
+import mysql.connector
+from dotenv import load_dotenv
+
+from preparedStatements import fetch_one
+
+load_dotenv()
+
+# -----------------------------------------------------------------
+# Benchmark: point lookups, text protocol vs cached prepared statements
+# -----------------------------------------------------------------
+# Runs against the SuccessFactors database configured in .env:
+#
+#   python preparedStatementBenchmark.py --lookups 5000
+#   python preparedStatementBenchmark.py --lookups 5000 --pure
+#
+# "text" is what the by-ID routes did before: a fresh dictionary=True
+# cursor per call, the SQL text sent and parsed every time. "prepared" is
+# preparedStatements.fetch_one on the same connection. Both look up the same
+# random sequence of existing EmployeeIDs, and the results are compared first.
+LOOKUPS = {
+    "employee": ("SELECT * FROM Employee WHERE EmployeeID = %s;", "SELECT EmployeeID FROM Employee"),
+    "employment_details": ("SELECT * FROM EmploymentDetails WHERE EmployeeID = %s;",
+                           "SELECT EmployeeID FROM EmploymentDetails"),
+    "compensation": ("SELECT * FROM Compensation WHERE EmployeeID = %s;", "SELECT EmployeeID FROM Compensation"),
+}
+
+def text_lookup(cnx, sql, params):
+    cursor = cnx.cursor(dictionary=True)
+    cursor.execute(sql, params)
+    row = cursor.fetchone()
+    cursor.close()
+    return row
+
+def run(fn, cnx, sql, ids):
+    timings = []
+    for employee_id in ids:
+        start = time.perf_counter()
+        fn(cnx, sql, (employee_id,))
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark point lookups: text protocol vs prepared statements.")
+    parser.add_argument("--table", choices=list(LOOKUPS), default="employee")
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--pure", action="store_true", help="use the pure-Python connector instead of the C extension")
+    args = parser.parse_args()
+
+    cnx = mysql.connector.connect(
+        host=os.getenv("MYSQL_HOST"),
+        user=os.getenv("MYSQL_USER"),
+        password=os.getenv("MYSQL_PASSWORD"),
+        database=os.getenv("MYSQL_SUCCESSFACTORS_DATABASE"),
+        auth_plugin=os.getenv("MYSQL_AUTH_PLUGIN"),
+        use_pure=args.pure,
+        autocommit=True,
+    )
+    sql, id_query = LOOKUPS[args.table]
+    cursor = cnx.cursor()
+    cursor.execute(id_query)
+    ids = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    if not ids:
+        raise SystemExit(f"No rows to look up for {args.table}")
+    ids = [random.choice(ids) for _ in range(args.lookups)]
+
+    sample = ids[:50]
+    for employee_id in sample:
+        expected = text_lookup(cnx, sql, (employee_id,))
+        assert fetch_one(cnx, sql, (employee_id,)) == expected, f"results differ for {employee_id}"
+
+    print(f"{args.table}: {args.lookups} lookups, {'pure Python' if args.pure else 'C extension'} connector")
+    baseline = None
+    for label, fn in [("text protocol, new cursor per call", text_lookup), ("cached prepared statement", fetch_one)]:
+        timings = run(fn, cnx, sql, ids)
+        mean = statistics.mean(timings)
+        baseline = baseline or mean
+        p50 = statistics.median(timings)
+        p99 = sorted(timings)[int(len(timings) * 0.99) - 1]
+        print(f"  {label:<36} mean {mean * 1e6:8.1f} us  p50 {p50 * 1e6:8.1f} us  p99 {p99 * 1e6:8.1f} us  "
+              f"{baseline / mean:5.2f}x")
+    cnx.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import os
+from collections import OrderedDict
+from typing import Optional
+
+from mysql.connector import Error
+
+from apiMetrics import timed_execute
+
+# -----------------------------------------------------------------
+# Prepared-Statement Cache for Point Lookups
+# -----------------------------------------------------------------
+# By-ID routes run the same few statements over and over. Each physical
+# connection keeps a small LRU of prepared cursors keyed by SQL text, so a
+# lookup is a COM_STMT_EXECUTE with binary-encoded parameters and rows:
+# no SQL text is sent or parsed after the first call on that connection.
+#
+# Prepared statements live in the server session, so the cache is tied to
+# the connection's thread id. After a reconnect (new id), or if the server
+# reports the statement unknown, the statements are prepared again. Pools
+# therefore must not reset sessions when connections are returned (see
+# mysqlPools).
+#
+# mysql-connector re-prepares whenever it is handed a different SQL string
+# object, even an equal one, so the cache executes the string it stored.
+PREPARED_CACHE_SIZE = int(os.getenv("PREPARED_CACHE_SIZE", "32"))
+
+ER_UNKNOWN_STMT_HANDLER = 1243
+
+class StatementCache:
+    def __init__(self, connection_id: int):
+        self.connection_id = connection_id
+        self.cursors = OrderedDict()
+
+def _physical(cnx):
+    # PooledMySQLConnection wraps the connection that owns the session
+    return getattr(cnx, "_cnx", cnx)
+
+def statement_cache(cnx) -> StatementCache:
+    raw = _physical(cnx)
+    cache = getattr(raw, "_statement_cache", None)
+    if cache is None or cache.connection_id != raw.connection_id:
+        # First use, or the connection was re-established: the old statements are gone.
+        cache = raw._statement_cache = StatementCache(raw.connection_id)
+    return cache
+
+def prepared_cursor(cnx, sql: str):
+    cache = statement_cache(cnx)
+    entry = cache.cursors.get(sql)
+    if entry is not None:
+        cache.cursors.move_to_end(sql)
+        return entry
+    entry = cache.cursors[sql] = (_physical(cnx).cursor(prepared=True), sql)
+    if len(cache.cursors) > PREPARED_CACHE_SIZE:
+        evicted, _ = cache.cursors.popitem(last=False)[1]
+        evicted.close()
+    return entry
+
+def fetch_one(cnx, sql: str, params: tuple) -> Optional[dict]:
+    """Run a point lookup as a cached prepared statement; the first row as a dict, or None."""
+    cursor, sql = prepared_cursor(cnx, sql)
+    try:
+        timed_execute(cursor, sql, params)
+    except Error as e:
+        if e.errno != ER_UNKNOWN_STMT_HANDLER:
+            raise
+        # The server dropped it (e.g. the session was reset); prepare it again once.
+        del statement_cache(cnx).cursors[sql]
+        cursor, sql = prepared_cursor(cnx, sql)
+        timed_execute(cursor, sql, params)
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+    return dict(zip(cursor.column_names, rows[0]))
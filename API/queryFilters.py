@@ -0,0 +1,33 @@
+from typing import Any, List, Tuple
+
+# -----------------------------------------------------------------
+# WHERE Clause Builder for List Endpoints
+# -----------------------------------------------------------------
+# Each filter is a (column, operator, value) triple. Column names and
+# operators always come from the route code, never from the client; only the
+# values are sent to MySQL, as parameters. Filters whose value is None (the
+# query parameter was not supplied) are skipped, and list values become
+# IN (...) clauses regardless of the operator given.
+OPERATORS = {"=", ">=", "<=", ">", "<"}
+
+def build_where(filters: List[Tuple[str, str, Any]]) -> Tuple[str, tuple]:
+    clauses = []
+    params = []
+    for column, op, value in filters:
+        if value is None:
+            continue
+        if op not in OPERATORS:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        if isinstance(value, (list, tuple, set)):
+            values = list(value)
+            if not values:
+                continue
+            placeholders = ", ".join(["%s"] * len(values))
+            clauses.append(f"{column} IN ({placeholders})")
+            params.extend(values)
+        else:
+            clauses.append(f"{column} {op} %s")
+            params.append(value)
+    if not clauses:
+        return "", ()
+    return " WHERE " + " AND ".join(clauses), tuple(params)
@@ -0,0 +1,86 @@
+import os
+import time
+import logging
+from typing import Callable, Dict, List, Tuple
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger("readiness")
+
+# -----------------------------------------------------------------
+# Readiness Probe and Warm-Up
+# -----------------------------------------------------------------
+# Services open their databases lazily, so importing a module or starting a
+# worker never blocks on MySQL or MongoDB. GET /ready runs each registered
+# check and answers 200 when all of them pass, 503 (with the failing
+# checks) otherwise. It is what a load balancer or Kubernetes readiness
+# probe should poll.
+#
+# With WARMUP_ON_STARTUP=true, the registered warm-up steps (opening pool
+# connections, preparing hot statements, preloading caches) run in the
+# startup event. The server only accepts connections once startup has
+# finished, so a warmed worker never serves a cold request. A failed step
+# is logged and leaves the worker not ready, rather than aborting it.
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+
+class Readiness:
+    def __init__(self, service: str):
+        self.service = service
+        self.checks: List[Tuple[str, Callable]] = []
+        self.warmups: List[Tuple[str, Callable]] = []
+        self.warmup_errors: Dict[str, str] = {}
+
+    def check(self, name: str):
+        """Register fn() as a readiness check; it passes unless it raises. Its return value is reported."""
+        def register(fn):
+            self.checks.append((name, fn))
+            return fn
+        return register
+
+    def warmup(self, name: str):
+        """Register fn() as a warm-up step, run at startup when WARMUP_ON_STARTUP is set."""
+        def register(fn):
+            self.warmups.append((name, fn))
+            return fn
+        return register
+
+    def run_warmups(self):
+        for name, fn in self.warmups:
+            start = time.perf_counter()
+            try:
+                fn()
+                self.warmup_errors.pop(name, None)
+                logger.info(f"{self.service}: warm-up '{name}' took {time.perf_counter() - start:.3f}s")
+            except Exception as e:
+                self.warmup_errors[name] = str(e)
+                logger.error(f"{self.service}: warm-up '{name}' failed: {e}")
+
+    def status(self) -> Tuple[bool, dict]:
+        ready = not self.warmup_errors
+        results = {}
+        for name, fn in self.checks:
+            try:
+                results[name] = {"ok": True, "detail": fn()}
+            except Exception as e:
+                ready = False
+                results[name] = {"ok": False, "detail": str(e)}
+        for name, error in self.warmup_errors.items():
+            results[f"warmup:{name}"] = {"ok": False, "detail": error}
+        return ready, {"service": self.service, "ready": ready, "checks": results}
+
+def install_readiness(app: FastAPI, service: str) -> Readiness:
+    readiness = Readiness(service)
+
+    @app.on_event("startup")
+    async def warm_up():
+        if WARMUP_ON_STARTUP:
+            await run_in_threadpool(readiness.run_warmups)
+
+    @app.get("/ready", include_in_schema=False)
+    def get_ready():
+        ready, body = readiness.status()
+        return JSONResponse(body, status_code=200 if ready else 503)
+
+    return readiness
@@ -0,0 +1,170 @@
+import json
+import time
+import random
+import argparse
+from datetime import date, datetime, timedelta
+from datetime import time as dtime
+from typing import List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, parse_obj_as
+
+from fastJson import encode_rows, orjson
+
+# -----------------------------------------------------------------
+# Benchmark: list-endpoint serialization paths
+# -----------------------------------------------------------------
+# Uses synthetic rows shaped like the real tables, so no database is needed:
+#
+#   python serializationBenchmark.py --table employees --rows 10000 --repeat 5
+#   python serializationBenchmark.py --table attendance --rows 10000 --repeat 5
+#
+# employees: what FastAPI does for `response_model=List[Employee]` (validate
+#   every row into the model, jsonable_encoder, stdlib json.dumps) against
+#   fastJson.encode_rows on the cursor's tuples.
+# attendance: additionally compares decoding the five TIME columns from
+#   timedeltas in Python against receiving them already cast to text by
+#   MySQL (timeAttendanceAPI.ATTENDANCE_SELECT).
+
+class Employee(BaseModel):
+    # Mirrors successFactorsAPI.Employee
+    EmployeeID: int
+    EmployeeNumber: str
+    FirstName: str
+    LastName: str
+    MiddleName: Optional[str] = None
+    PreferredName: str
+    Gender: str
+    DateOfBirth: date
+    Nationality: str
+    MaritalStatus: str
+    Email: str
+    ContactNumber: str
+    Address: str
+    PhotoURL: str
+    CreatedAt: datetime
+    UpdatedAt: datetime
+
+class AttendanceRecord(BaseModel):
+    # Mirrors timeAttendanceAPI.AttendanceRecord
+    RecordID: Optional[int] = None
+    EmployeeID: int
+    AttendanceDate: date
+    ClockIn: Optional[dtime] = None
+    ClockOut: Optional[dtime] = None
+    BreakDuration: Optional[str] = None
+    LateBy: Optional[str] = None
+    EarlyBy: Optional[str] = None
+    Notes: Optional[str] = None
+    CreatedAt: Optional[datetime] = None
+    UpdatedAt: Optional[datetime] = None
+
+EMPLOYEE_COLUMNS = list(Employee.__fields__)
+ATTENDANCE_COLUMNS = list(AttendanceRecord.__fields__)
+TIME_COLUMNS = ["ClockIn", "ClockOut", "BreakDuration", "LateBy", "EarlyBy"]
+
+def make_employee_rows(n: int) -> List[tuple]:
+    now = datetime.now().replace(microsecond=0)
+    rows = []
+    for i in range(n):
+        rows.append((
+            i + 1, f"E{10000 + i}", f"First{i}", f"Last{i}", None if i % 2 else f"Middle{i}", f"First{i}",
+            random.choice(["Male", "Female", "Other"]), date(1980, 1, 1) + timedelta(days=i % 9000),
+            "Indian", "Single", f"user{i}@example.in", "+91 98765 43210",
+            f"{i} MG Road, Bengaluru 560001", "http://example.in/photo.jpg", now, now,
+        ))
+    return rows
+
+def make_attendance_rows(n: int) -> List[tuple]:
+    """Rows as the connector returns them for SELECT *: TIME columns are timedeltas."""
+    now = datetime.now().replace(microsecond=0)
+    rows = []
+    for i in range(n):
+        clock_in = timedelta(hours=random.randint(8, 10), minutes=random.randint(0, 59))
+        clock_out = timedelta(hours=random.randint(16, 19), minutes=random.randint(0, 59))
+        late_by = max(clock_in - timedelta(hours=9), timedelta(0))
+        early_by = max(timedelta(hours=17) - clock_out, timedelta(0))
+        rows.append((
+            i + 1, random.randint(1, 10000), date.today() - timedelta(days=i % 180),
+            clock_in, clock_out, timedelta(minutes=random.randint(30, 90)), late_by, early_by,
+            "Worked on the quarterly report with the team", now, now,
+        ))
+    return rows
+
+def timedelta_to_str(td: timedelta) -> str:
+    # The per-row conversion timeAttendanceAPI used before TIME columns were cast in SQL
+    total_seconds = int(td.total_seconds())
+    return dtime(hour=(total_seconds // 3600) % 24, minute=(total_seconds % 3600) // 60,
+                 second=total_seconds % 60).strftime("%H:%M:%S")
+
+def cast_in_sql(rows: List[tuple]) -> List[tuple]:
+    """The same rows as MySQL returns them when TIME columns are CAST(... AS CHAR)."""
+    positions = [ATTENDANCE_COLUMNS.index(c) for c in TIME_COLUMNS]
+    cast = []
+    for row in rows:
+        row = list(row)
+        for i in positions:
+            row[i] = timedelta_to_str(row[i])
+        cast.append(tuple(row))
+    return cast
+
+def pydantic_path(model, columns, converters=None):
+    def run(rows: List[tuple]) -> bytes:
+        dict_rows = [dict(zip(columns, row)) for row in rows]  # what a dictionary=True cursor returns
+        if converters:
+            for row in dict_rows:
+                for column, convert in converters.items():
+                    row[column] = convert(row[column])
+        validated = parse_obj_as(List[model], dict_rows)
+        return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+    return run
+
+def fast_path(columns, converters=None):
+    def run(rows: List[tuple]) -> bytes:
+        return encode_rows(columns, rows, converters)
+    return run
+
+def timeit(fn, rows, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark list-endpoint serialization paths.")
+    parser.add_argument("--table", choices=["employees", "attendance"], default="employees")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    encoder = "orjson" if orjson is not None else "stdlib json"
+    if args.table == "employees":
+        rows = make_employee_rows(args.rows)
+        cases = [
+            ("response_model + json.dumps", pydantic_path(Employee, EMPLOYEE_COLUMNS), rows),
+            (f"fastJson ({encoder})", fast_path(EMPLOYEE_COLUMNS), rows),
+        ]
+    else:
+        rows = make_attendance_rows(args.rows)
+        converters = {c: timedelta_to_str for c in TIME_COLUMNS}
+        cast_rows = cast_in_sql(rows)
+        cases = [
+            ("response_model + Python TIME decoding", pydantic_path(AttendanceRecord, ATTENDANCE_COLUMNS, converters), rows),
+            (f"fastJson ({encoder}) + Python TIME decoding", fast_path(ATTENDANCE_COLUMNS, converters), rows),
+            (f"fastJson ({encoder}) + TIME cast in SQL", fast_path(ATTENDANCE_COLUMNS), cast_rows),
+        ]
+
+    outputs = [json.loads(fn(case_rows[:100])) for _, fn, case_rows in cases]
+    assert all(out == outputs[0] for out in outputs), "paths disagree"
+
+    print(f"{args.table}: {args.rows} rows, best of {args.repeat}")
+    baseline = None
+    for label, fn, case_rows in cases:
+        elapsed = timeit(fn, case_rows, args.repeat)
+        baseline = baseline or elapsed
+        print(f"  {label:<45} {elapsed * 1000:8.1f} ms  {args.rows / elapsed:>12,.0f} rows/s  {baseline / elapsed:6.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import os
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI
+
+from apiMetrics import timed_execute
+from mysqlPools import DatabasePools, parse_hosts
+
+logger = logging.getLogger("shardRouting")
+
+# -----------------------------------------------------------------
+# Employee Sharding by Business Unit
+# -----------------------------------------------------------------
+# With SUCCESSFACTORS_SHARDS set ("north=10.0.0.11,south=10.0.0.12:3307,..."),
+# SuccessFactors data is split over several MySQL servers, each holding the
+# same schema (same database name and credentials) for a subset of the
+# employees. SUCCESSFACTORS_SHARD_UNITS ("North India=north,...") places a
+# new hire on the shard of their BusinessUnit; units not listed, and hires
+# without a unit, go to SUCCESSFACTORS_DEFAULT_SHARD (the first shard by
+# default).
+#
+# Where an employee lives is recorded in a directory table, EmployeeShard,
+# kept in the SuccessFactors database on MYSQL_HOST. The directory also
+# hands out EmployeeIDs, so they stay unique across shards; an entry whose
+# employee could not be inserted on its shard is deleted again. Entries never
+# change once written: an employee whose BusinessUnit changes later stays
+# on their original shard, all their rows together, and is still found
+# there through the directory. Lookups of the directory are cached per
+# process.
+#
+# Reads and writes of one employee go to the owning shard. List endpoints
+# run the same query on every shard in parallel and concatenate the rows
+# (they cannot be pruned to one shard by a BusinessUnit filter, since the
+# unit is only where an employee started).
+#
+# Without SUCCESSFACTORS_SHARDS, the service has a single shard, the usual
+# MYSQL_HOST pools, and no directory.
+SUCCESSFACTORS_SHARDS = os.getenv("SUCCESSFACTORS_SHARDS", "")
+SUCCESSFACTORS_SHARD_UNITS = os.getenv("SUCCESSFACTORS_SHARD_UNITS", "")
+SUCCESSFACTORS_DEFAULT_SHARD = os.getenv("SUCCESSFACTORS_DEFAULT_SHARD", "")
+SHARD_DIRECTORY_CACHE_SIZE = int(os.getenv("SHARD_DIRECTORY_CACHE_SIZE", "100000"))
+
+DIRECTORY_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS EmployeeShard (
+    EmployeeID INT AUTO_INCREMENT PRIMARY KEY,
+    Shard VARCHAR(32) NOT NULL,
+    BusinessUnit VARCHAR(100),
+    CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_employee_shard_shard (Shard)
+) ENGINE=InnoDB;
+"""
+
+def parse_mapping(value: str) -> Dict[str, str]:
+    mapping = {}
+    for item in value.split(","):
+        name, _, target = item.partition("=")
+        if name.strip() and target.strip():
+            mapping[name.strip()] = target.strip()
+    return mapping
+
+class ShardRouter:
+    def __init__(self, shards: Dict[str, DatabasePools], directory: Optional[DatabasePools] = None,
+                 units: Optional[Dict[str, str]] = None, default: Optional[str] = None):
+        self.shards = shards
+        self.directory = directory
+        self.units = units or {}
+        self.default = default or next(iter(shards))
+        unknown = {s for s in [self.default, *self.units.values()] if s not in shards}
+        if unknown:
+            raise ValueError(f"Unknown shards {sorted(unknown)}; configured: {sorted(shards)}")
+        self.owners: Dict[int, str] = {}
+        self.lock = threading.Lock()
+        self.directory_ready = False
+        self.executor = ThreadPoolExecutor(max_workers=4 * len(shards), thread_name_prefix="shard-scatter")
+
+    @property
+    def sharded(self) -> bool:
+        return self.directory is not None
+
+    def all(self) -> List[DatabasePools]:
+        return list(self.shards.values())
+
+    # -- directory --------------------------------------------------
+    def _ensure_directory(self, cnx):
+        if not self.directory_ready:
+            cursor = cnx.cursor()
+            cursor.execute(DIRECTORY_TABLE_SQL)
+            cursor.close()
+            self.directory_ready = True
+
+    def _remember(self, owners: Dict[int, str]):
+        with self.lock:
+            if len(self.owners) + len(owners) > SHARD_DIRECTORY_CACHE_SIZE:
+                self.owners.clear()
+            self.owners.update(owners)
+
+    def owners_of(self, employee_ids: List[int]) -> Dict[int, str]:
+        """Shard name of each known employee; unknown ids are left out."""
+        if not self.sharded:
+            return {employee_id: self.default for employee_id in employee_ids}
+        owners = {i: self.owners[i] for i in employee_ids if i in self.owners}
+        missing = [i for i in employee_ids if i not in owners]
+        if missing:
+            # The primary, so that an employee created a moment ago is found.
+            with self.directory.borrow(write=True) as cnx:
+                self._ensure_directory(cnx)
+                cursor = cnx.cursor()
+                placeholders = ", ".join(["%s"] * len(missing))
+                timed_execute(cursor, f"SELECT EmployeeID, Shard FROM EmployeeShard "
+                                      f"WHERE EmployeeID IN ({placeholders});", missing)
+                found = dict(cursor.fetchall())
+                cursor.close()
+            self._remember(found)
+            owners.update(found)
+        return owners
+
+    def pools_for(self, employee_id: int) -> DatabasePools:
+        """The owning shard; the default shard for an unknown employee, where lookups then find nothing."""
+        return self.shards[self.owners_of([employee_id]).get(employee_id, self.default)]
+
+    def shard_for_unit(self, business_unit: Optional[str]) -> str:
+        return self.units.get(business_unit, self.default)
+
+    def allocate(self, business_unit: Optional[str]) -> Tuple[DatabasePools, Optional[int]]:
+        """The shard for a new employee and their EmployeeID (None unsharded: the table assigns it)."""
+        shard = self.shard_for_unit(business_unit)
+        if not self.sharded:
+            return self.shards[shard], None
+        with self.directory.borrow(write=True) as cnx:
+            self._ensure_directory(cnx)
+            cursor = cnx.cursor()
+            timed_execute(cursor, "INSERT INTO EmployeeShard (Shard, BusinessUnit) VALUES (%s, %s);",
+                          (shard, business_unit))
+            employee_id = cursor.lastrowid
+            cnx.commit()
+            cursor.close()
+        self._remember({employee_id: shard})
+        return self.shards[shard], employee_id
+
+    def release(self, employee_id: int):
+        """Undo allocate() after the employee's insert on the shard failed; the id is not reused."""
+        with self.lock:
+            self.owners.pop(employee_id, None)
+        with self.directory.borrow(write=True) as cnx:
+            cursor = cnx.cursor()
+            timed_execute(cursor, "DELETE FROM EmployeeShard WHERE EmployeeID = %s;", (employee_id,))
+            cnx.commit()
+            cursor.close()
+
+    # -- scatter-gather ---------------------------------------------
+    def scatter(self, fn: Callable[[DatabasePools], object]) -> List[object]:
+        """fn(pools) on every shard in parallel, within the current request; results in shard order."""
+        if len(self.shards) == 1:
+            return [fn(self.default_pools)]
+        # Each task gets its own copy of the context, carrying the request's
+        # connection leases and metrics.
+        futures = [self.executor.submit(contextvars.copy_context().run, fn, pools) for pools in self.shards.values()]
+        return [future.result() for future in futures]
+
+    def lookup(self, loader_for: Callable[[DatabasePools], Callable[[list], Dict]]) -> Callable[[list], Dict]:
+        """A /batch loader over all shards, from loader_for(pools) -> load(employee_ids)."""
+        loaders = {name: loader_for(pools) for name, pools in self.shards.items()}
+
+        def load(employee_ids: list) -> Dict:
+            by_shard: Dict[str, list] = {}
+            for employee_id, shard in self.owners_of(employee_ids).items():
+                by_shard.setdefault(shard, []).append(employee_id)
+            found = {}
+            for shard, ids in by_shard.items():
+                found.update(loaders[shard](ids))
+            return found
+        return load
+
+    # -- lifecycle --------------------------------------------------
+    @property
+    def default_pools(self) -> DatabasePools:
+        return self.shards[self.default]
+
+    def install(self, app: FastAPI):
+        for pools in self.shards.values():
+            pools.install(app)
+
+    def open(self):
+        for pools in self.shards.values():
+            pools.open()
+        if self.directory is not None:
+            with self.directory.borrow(write=True) as cnx:
+                self._ensure_directory(cnx)
+
+    def ping(self) -> dict:
+        status = {name: pools.ping() for name, pools in self.shards.items()}
+        if self.directory is not None:
+            status["directory"] = self.directory.ping()
+        return status if self.sharded else status[self.default]
+
+    def each_connection(self, fn):
+        for pools in self.shards.values():
+            pools.each_connection(fn)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        for pools in self.shards.values():
+            pools.close()
+        if self.directory is not None:
+            self.directory.close()
+
+def router_from_env(name: str, **connect_args) -> ShardRouter:
+    """The service's MYSQL_HOST pools alone, or SUCCESSFACTORS_SHARDS plus the directory on MYSQL_HOST."""
+    primary = DatabasePools(name, **connect_args)
+    if not SUCCESSFACTORS_SHARDS:
+        return ShardRouter({"default": primary})
+    shards = {}
+    for shard, address in parse_mapping(SUCCESSFACTORS_SHARDS).items():
+        (host, port), = parse_hosts(address)
+        shards[shard] = DatabasePools(f"{name}_{shard}", replica_hosts="",
+                                      **{**connect_args, "host": host, "port": port})
+    logger.info(f"{name}: {len(shards)} shards ({', '.join(shards)}), directory on {connect_args.get('host')}")
+    return ShardRouter(shards, directory=primary, units=parse_mapping(SUCCESSFACTORS_SHARD_UNITS),
+                       default=SUCCESSFACTORS_DEFAULT_SHARD or None)
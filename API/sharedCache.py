@@ -0,0 +1,188 @@
+import os
+import mmap
+import time
+import struct
+import hashlib
+import logging
+import tempfile
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from fastapi import Response
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single worker, nothing to coordinate
+    fcntl = None
+
+logger = logging.getLogger("sharedCache")
+
+# -----------------------------------------------------------------
+# Cross-Worker Response Cache in Shared Memory
+# -----------------------------------------------------------------
+# Encoded response bodies for hot, shared results (the employee list, the
+# course catalog) are kept as files under SHARED_CACHE_DIR, by default on
+# /dev/shm, i.e. in memory. Every uvicorn worker on the node reads the same
+# files, so a result is built and stored once per node rather than once per
+# worker, and a freshly started worker begins warm. A hit copies the body
+# out of the file for the response being sent; nothing is kept per worker.
+#
+# Entries are versioned per namespace (usually a table or collection). The
+# versions live in one small mmap'd file; a write in any worker bumps its
+# namespace's version, and every entry stored under an older version is a
+# miss from then on, in all workers. An entry built while a bump happened is
+# stored under the version read before building, so it is never served.
+# Namespaces share version slots by hash: a collision only causes extra
+# misses.
+#
+# Builders read from the primary: a result built from a lagging replica
+# right after a bump would be stored under the new version. Entries also
+# expire after SHARED_CACHE_TTL_SECONDS; that bounds staleness from writes
+# the APIs do not see (ETL loads, other services). Expired and, beyond
+# SHARED_CACHE_MAX_BYTES, least recently written entries are swept every
+# SHARED_CACHE_SWEEP_SECONDS.
+_DEFAULT_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+SHARED_CACHE_DIR = os.getenv("SHARED_CACHE_DIR", os.path.join(_DEFAULT_DIR, "hr-api-cache"))
+SHARED_CACHE_TTL_SECONDS = float(os.getenv("SHARED_CACHE_TTL_SECONDS", "30"))
+SHARED_CACHE_MAX_BYTES = int(os.getenv("SHARED_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+SHARED_CACHE_SWEEP_SECONDS = float(os.getenv("SHARED_CACHE_SWEEP_SECONDS", "30"))
+SHARED_CACHE_ENABLED = os.getenv("SHARED_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+VERSION_SLOTS = 4096
+_VERSION = struct.Struct("<Q")
+# version, expires at (epoch seconds), status code, media type length
+_HEADER = struct.Struct("<QdHH")
+
+class SharedCache:
+    def __init__(self, name: str, directory: str = SHARED_CACHE_DIR, ttl: float = SHARED_CACHE_TTL_SECONDS,
+                 max_bytes: int = SHARED_CACHE_MAX_BYTES):
+        self.directory = os.path.join(directory, name)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.versions = None
+        self.versions_fd = None
+        self.swept_at = 0.0
+        self.lock = threading.Lock()
+
+    # -- versions ---------------------------------------------------
+    def _open_versions(self):
+        with self.lock:
+            if self.versions is not None:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            fd = os.open(os.path.join(self.directory, "versions"), os.O_RDWR | os.O_CREAT, 0o600)
+            size = VERSION_SLOTS * _VERSION.size
+            with self._locked(fd):
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+            self.versions = mmap.mmap(fd, size)
+            self.versions_fd = fd
+
+    @staticmethod
+    @contextmanager
+    def _locked(fd: int):
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _slot(namespace: str) -> int:
+        return (zlib.crc32(namespace.encode("utf-8")) % VERSION_SLOTS) * _VERSION.size
+
+    def version(self, namespace: str) -> int:
+        self._open_versions()
+        return _VERSION.unpack_from(self.versions, self._slot(namespace))[0]
+
+    def invalidate(self, namespace: str):
+        """Bump the namespace's version; every worker's entries for it become misses."""
+        if not SHARED_CACHE_ENABLED:
+            return
+        self._open_versions()
+        slot = self._slot(namespace)
+        with self._locked(self.versions_fd):
+            _VERSION.pack_into(self.versions, slot, _VERSION.unpack_from(self.versions, slot)[0] + 1)
+
+    # -- entries ----------------------------------------------------
+    def _path(self, namespace: str, key: str) -> str:
+        digest = hashlib.sha1(f"{namespace}\0{key}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{namespace}-{digest}")
+
+    def _read(self, path: str, version: int) -> Optional[Response]:
+        try:
+            with open(path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    stored_version, expires_at, status_code, media_length = _HEADER.unpack_from(mm, 0)
+                    if stored_version != version or expires_at <= time.time():
+                        return None
+                    start = _HEADER.size + media_length
+                    media_type = mm[_HEADER.size:start].decode("latin-1")
+                    body = mm[start:]
+        except (FileNotFoundError, ValueError, struct.error):
+            return None  # not cached yet, or replaced/truncated while we read it
+        return Response(body, status_code=status_code, media_type=media_type,
+                        headers={"x-shared-cache": "hit"})
+
+    def _write(self, path: str, version: int, response: Response):
+        media_type = (response.media_type or "").encode("latin-1")
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp, "wb") as f:
+                f.write(_HEADER.pack(version, time.time() + self.ttl, response.status_code, len(media_type)))
+                f.write(media_type)
+                f.write(response.body)
+            os.replace(temp, path)  # readers see the old file or the new one, never a partial write
+        except OSError as e:
+            logger.warning(f"Could not store {path}: {e}")
+            try:
+                os.unlink(temp)
+            except OSError:
+                pass
+
+    def response(self, namespace: str, key: str, build: Callable[[], Response]) -> Response:
+        """The cached response for (namespace, key), or build() it and store it for every worker."""
+        if not SHARED_CACHE_ENABLED:
+            return build()
+        version = self.version(namespace)
+        path = self._path(namespace, key)
+        cached = self._read(path, version)
+        if cached is not None:
+            return cached
+        response = build()
+        if response.status_code == 200:
+            self._write(path, version, response)
+            self._maybe_sweep()
+        return response
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        if now - self.swept_at < SHARED_CACHE_SWEEP_SECONDS:
+            return
+        self.swept_at = now
+        entries, total = [], 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name == "versions" or not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                total += stat.st_size
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        expired_before = time.time() - self.ttl
+        for mtime, size, path in entries:
+            if mtime > expired_before and total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,105 @@
+import os
+import asyncio
+from fnmatch import fnmatchcase
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode
+
+from jwt import PyJWTError
+
+from tokenCache import TokenCache
+
+# -----------------------------------------------------------------
+# Request Coalescing (Single-Flight) for GETs
+# -----------------------------------------------------------------
+# Concurrent GETs for the same route, query parameters and authenticated
+# user share one execution: the first request (the leader) runs normally
+# and streams to its client while its response messages are recorded;
+# requests arriving while it is in flight wait for it and are sent the same
+# status, headers and body. A dashboard load or ETL burst therefore costs one
+# query and one encoding instead of N.
+#
+# Requests whose bearer token does not verify are never coalesced, so they
+# still reach the route and get its normal 401. Paths matching an excluded
+# pattern (metrics, export downloads) are never coalesced either, and a
+# leader stops recording once its body passes SINGLE_FLIGHT_MAX_BYTES: its
+# followers then run on their own rather than have a large body held in
+# memory for them.
+SINGLE_FLIGHT_MAX_BYTES = int(os.getenv("SINGLE_FLIGHT_MAX_BYTES", str(8 * 1024 * 1024)))
+EXCLUDE_PATHS = ("/metrics", "/exports/*/download")
+SHARED_HEADER = (b"x-single-flight", b"shared")
+
+class SingleFlightMiddleware:
+    def __init__(self, app, token_cache: TokenCache, exclude_paths=EXCLUDE_PATHS,
+                 max_bytes: int = SINGLE_FLIGHT_MAX_BYTES):
+        self.app = app
+        self.token_cache = token_cache
+        self.exclude_paths = tuple(exclude_paths)
+        self.max_bytes = max_bytes
+        self.in_flight = {}
+
+    def excluded(self, scope) -> bool:
+        # Under the gateway's mounts the path may still carry the mount prefix
+        path, root_path = scope["path"], scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        return any(fnmatchcase(path, pattern) for pattern in self.exclude_paths)
+
+    def key_for(self, scope) -> Optional[tuple]:
+        if scope["type"] != "http" or scope["method"] != "GET" or self.excluded(scope):
+            return None
+        headers = dict(scope["headers"])
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        try:
+            subject = self.token_cache.verify(token).get("sub")
+        except PyJWTError:
+            return None
+        query = urlencode(sorted(parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True)))
+        # Responses can differ by negotiated encoding, so that is part of the key too.
+        return (scope.get("root_path", ""), scope["path"], query, subject, headers.get(b"accept-encoding", b""))
+
+    async def __call__(self, scope, receive, send):
+        key = self.key_for(scope)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+
+        leader = self.in_flight.get(key)
+        if leader is not None:
+            messages = await asyncio.shield(leader)
+            if messages is not None:
+                for message in messages:
+                    if message["type"] == "http.response.start":
+                        message = {**message, "headers": list(message.get("headers", [])) + [SHARED_HEADER]}
+                    await send(message)
+                return
+            # The leader failed, or its body was too large to record; run this one ourselves.
+            await self.app(scope, receive, send)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        messages = []
+        size = 0
+
+        async def record(message):
+            nonlocal messages, size
+            if messages is not None:
+                size += len(message.get("body", b""))
+                if size > self.max_bytes:
+                    messages = None  # too large to hold for followers
+                else:
+                    messages.append(message)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, record)
+        finally:
+            del self.in_flight[key]
+            complete = bool(messages) and not messages[-1].get("more_body", False)
+            future.set_result(messages if complete else None)
+
+def install_single_flight(app, token_cache: TokenCache):
+    app.add_middleware(SingleFlightMiddleware, token_cache=token_cache)
@@ -0,0 +1,121 @@
+import os
+import re
+import time
+import threading
+from collections import deque
+from typing import Callable, List, Optional
+
+from fastapi import Depends, FastAPI
+
+from apiMetrics import add_query_observer, current_stats
+from mysqlPools import current_pools
+
+# -----------------------------------------------------------------
+# Slow-Query Capture
+# -----------------------------------------------------------------
+# Every statement run through apiMetrics.timed_execute is timed. Those over
+# SLOW_QUERY_THRESHOLD_MS are kept in a bounded ring buffer together with
+# their normalized text, the shape of their parameters and the route that
+# issued them. EXPLAIN is run when the buffer is read, on its own buffered
+# cursor: at capture time the statement's own result set may still be
+# unread on the connection. It runs on the pools (shard) that ran the
+# statement, or on the service's own connection if that is not known.
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+SLOW_QUERY_BUFFER_SIZE = int(os.getenv("SLOW_QUERY_BUFFER_SIZE", "200"))
+
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+def normalize_sql(query: str) -> str:
+    """Collapse whitespace and fold IN (%s, %s, ...) lists so equivalent statements compare equal."""
+    text = " ".join(query.split()).rstrip(";")
+    return re.sub(r"IN \((?:%s, )*%s\)", "IN (...)", text)
+
+class SlowQueryLog:
+    def __init__(self, app: Optional[FastAPI] = None, threshold_ms: float = SLOW_QUERY_THRESHOLD_MS,
+                 size: int = SLOW_QUERY_BUFFER_SIZE):
+        self.app = app
+        self.threshold_ms = threshold_ms
+        self.entries = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def observe(self, cursor, query: str, params: tuple, elapsed: float):
+        duration_ms = elapsed * 1000
+        if duration_ms < self.threshold_ms:
+            return
+        stats = current_stats.get()
+        # Observers are process-wide; only keep statements issued while this
+        # log's own app was serving the request.
+        if stats is not None and self.app is not None and stats.scope.get("app") not in (None, self.app):
+            return
+        pools = current_pools.get()
+        entry = {
+            "captured_at": time.time(),
+            "route": stats.route if stats is not None else None,
+            "pool": pools.name if pools is not None else None,
+            "duration_ms": round(duration_ms, 3),
+            "statement": normalize_sql(query),
+            "params_shape": [type(p).__name__ for p in (params or ())],
+            "explain": None,
+            # Kept for EXPLAIN only; never returned by the admin endpoint.
+            "_query": query,
+            "_params": params,
+            "_pools": pools,
+        }
+        with self.lock:
+            self.entries.append(entry)
+
+    def snapshot(self, get_connection: Optional[Callable] = None, route: Optional[str] = None,
+                 limit: int = 50) -> List[dict]:
+        with self.lock:
+            entries = [e for e in reversed(self.entries) if route is None or e["route"] == route][:limit]
+        if get_connection is not None:
+            for entry in entries:
+                if entry["explain"] is None:
+                    entry["explain"] = self.explain(get_connection, entry["_query"], entry["_params"],
+                                                    entry["_pools"])
+        return [{k: v for k, v in e.items() if not k.startswith("_")} for e in entries]
+
+    @staticmethod
+    def explain(get_connection: Callable, query: str, params: tuple, pools=None):
+        statement = query.strip()
+        if not statement.upper().startswith(EXPLAINABLE):
+            return []
+        try:
+            if pools is not None:
+                with pools.borrow(write=False) as cnx:
+                    return SlowQueryLog._plan(cnx, statement, params)
+            return SlowQueryLog._plan(get_connection(), statement, params)
+        except Exception as e:
+            return [{"error": str(e)}]
+
+    @staticmethod
+    def _plan(cnx, statement: str, params: tuple) -> List[dict]:
+        cursor = cnx.cursor(dictionary=True, buffered=True)
+        cursor.execute(f"EXPLAIN {statement}", params)
+        plan = cursor.fetchall()
+        cursor.close()
+        return plan
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+def install_slow_query_log(app: FastAPI, get_connection: Callable, auth_dependency: Callable) -> SlowQueryLog:
+    """Capture slow statements for this service and expose them on GET /admin/slow_queries."""
+    log = SlowQueryLog(app)
+    add_query_observer(log.observe)
+
+    @app.get("/admin/slow_queries", include_in_schema=False, dependencies=[Depends(auth_dependency)])
+    def get_slow_queries(route: Optional[str] = None, limit: int = 50):
+        return {
+            "threshold_ms": log.threshold_ms,
+            "captured": len(log.entries),
+            "queries": log.snapshot(get_connection, route=route, limit=limit),
+        }
+
+    @app.delete("/admin/slow_queries", include_in_schema=False, dependencies=[Depends(auth_dependency)])
+    def clear_slow_queries():
+        log.clear()
+        return {"cleared": True}
+
+    return log
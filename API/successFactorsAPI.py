@@ -1,6 +1,5 @@
 import os
-import mysql.connector
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Response
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel
 from typing import List, Optional
@@ -8,6 +7,24 @@ from datetime import date, datetime, timedelta
 import jwt
 from jwt import PyJWTError
 from dotenv import load_dotenv
+from tokenCache import AUTH_TOKEN_URL, get_token_cache, issuer_claims
+from queryFilters import build_where
+from apiMetrics import add_rows, db_timer, install_metrics, serialize_timer, timed_execute
+from singleFlight import install_single_flight
+from compression import install_compression
+from admissionControl import install_admission_control
+from shardRouting import router_from_env
+from readiness import install_readiness
+from preparedStatements import fetch_one
+from entityCache import EntityCache
+from sharedCache import SharedCache
+from slowQueryLog import install_slow_query_log
+from exportJobs import install_exports
+from liveUpdates import publish
+from batchRequests import install_batch, sql_lookup
+from employmentHistory import install_as_of, record_employment
+from fastJson import encode_rows
+from fieldProjection import fields_param, project, select_list
 
 # Load environment variables from .env file
 load_dotenv()
@@ -19,17 +36,18 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl=AUTH_TOKEN_URL)
+token_cache = get_token_cache(SECRET_KEY, ALGORITHM)
 
 def create_access_token(data: dict, expires_delta: timedelta):
     to_encode = data.copy()
     expire = datetime.utcnow() + expires_delta
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, **issuer_claims()})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def get_current_user(token: str = Depends(oauth2_scheme)):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = token_cache.verify(token)
         user: str = payload.get("sub")
         if user is None:
             raise HTTPException(status_code=401, detail="Invalid token")
@@ -46,23 +64,35 @@ DB_PASSWORD = os.getenv("MYSQL_PASSWORD")
 DB_HOST = os.getenv("MYSQL_HOST")
 DB_AUTH_PLUGIN = os.getenv("MYSQL_AUTH_PLUGIN")  # e.g., mysql_native_password
 
-try:
-    conn = mysql.connector.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        auth_plugin=DB_AUTH_PLUGIN  # Adjust if needed
-    )
-    # Ensure autocommit is enabled for immediate visibility
-    conn.autocommit = True
-except Exception as e:
-    raise Exception(f"Error connecting to database: {e}")
+# Reads go to a replica pool when MYSQL_REPLICA_HOSTS is set (see mysqlPools).
+# With SUCCESSFACTORS_SHARDS set, employees are spread over several servers
+# and MYSQL_HOST keeps the shard directory (see shardRouting); `db` is then
+# the default shard, used for anything not tied to one employee.
+shards = router_from_env(
+    "successfactors",
+    host=DB_HOST,
+    user=DB_USER,
+    password=DB_PASSWORD,
+    database=DB_NAME,
+    auth_plugin=DB_AUTH_PLUGIN,  # Adjust if needed
+    autocommit=True  # Ensure autocommit is enabled for immediate visibility
+)
+db = shards.default_pools
 
 # -----------------------------------------------------------------
 # FastAPI Application Initialization
 # -----------------------------------------------------------------
 app = FastAPI(title="SuccessFactors API")
+shards.install(app)
+install_compression(app)
+install_admission_control(app)
+install_single_flight(app, token_cache)
+metrics = install_metrics(app, "successfactors")
+slow_queries = install_slow_query_log(app, db.connection, get_current_user)
+readiness = install_readiness(app, "successfactors")
+readiness.check("mysql")(shards.ping)
+readiness.warmup("mysql pools")(shards.open)
+exports = install_exports(app, "successfactors", get_current_user)
 
 # -----------------------------------------------------------------
 # Pydantic Models
@@ -118,6 +148,99 @@ class Performance(BaseModel):
     SkillsDeveloped: Optional[str] = None
     PromotionIndicator: bool
 
+# -----------------------------------------------------------------
+# Point Lookups (cached prepared statements, see preparedStatements)
+# -----------------------------------------------------------------
+EMPLOYEE_BY_ID = "SELECT * FROM Employee WHERE EmployeeID = %s;"
+EMPLOYMENT_DETAILS_BY_EMPLOYEE = "SELECT * FROM EmploymentDetails WHERE EmployeeID = %s;"
+COMPENSATION_BY_EMPLOYEE = "SELECT * FROM Compensation WHERE EmployeeID = %s;"
+PERFORMANCE_BY_EMPLOYEE_YEAR = "SELECT * FROM Performance WHERE EmployeeID = %s AND PerformanceYear = %s;"
+
+@readiness.warmup("prepared statements")
+def prepare_point_lookups():
+    def prepare(cnx):
+        for sql, params in [(EMPLOYEE_BY_ID, (0,)), (EMPLOYMENT_DETAILS_BY_EMPLOYEE, (0,)),
+                            (COMPENSATION_BY_EMPLOYEE, (0,)), (PERFORMANCE_BY_EMPLOYEE_YEAR, (0, 0))]:
+            fetch_one(cnx, sql, params)
+    shards.each_connection(prepare)
+
+# /batch merges point lookups on these routes into one IN query per shard.
+batch = install_batch(app, get_current_user)
+batch.lookup("/employees/{employee_id}",
+             shards.lookup(lambda pools: sql_lookup(pools, "SELECT * FROM Employee", "EmployeeID", Employee)),
+             "Employee not found")
+batch.lookup("/employment_details/{employee_id}",
+             shards.lookup(lambda pools: sql_lookup(pools, "SELECT * FROM EmploymentDetails", "EmployeeID",
+                                                    EmploymentDetails)),
+             "Employment details not found")
+batch.lookup("/compensation/{employee_id}",
+             shards.lookup(lambda pools: sql_lookup(pools, "SELECT * FROM Compensation", "EmployeeID", Compensation)),
+             "Compensation details not found")
+
+# -----------------------------------------------------------------
+# Employee Entity Cache
+# -----------------------------------------------------------------
+# The by-ID routes read through one cache entry per EmployeeID (see
+# entityCache); the POST handlers invalidate the employee they wrote. Misses
+# are loaded from the primary: a row read from a lagging replica right after
+# an invalidation would be cached and served to everyone, the writer included.
+# EMPLOYEE_CACHE_PRELOAD lists EmployeeIDs (managers, HR admins, ...) to
+# load during warm-up.
+employee_cache = EntityCache()
+EMPLOYEE_CACHE_PRELOAD = [int(i) for i in os.getenv("EMPLOYEE_CACHE_PRELOAD", "").split(",") if i.strip()]
+
+def cached_lookup(employee_id: int, section: str, sql: str, params: tuple) -> Optional[dict]:
+    def load():
+        with shards.pools_for(employee_id).borrow(write=True) as cnx:
+            return fetch_one(cnx, sql, params)
+    return employee_cache.get(employee_id, section, load)
+
+@readiness.warmup("employee cache")
+def preload_employee_cache():
+    for employee_id in EMPLOYEE_CACHE_PRELOAD:
+        cached_lookup(employee_id, "employee", EMPLOYEE_BY_ID, (employee_id,))
+        cached_lookup(employee_id, "employment", EMPLOYMENT_DETAILS_BY_EMPLOYEE, (employee_id,))
+        cached_lookup(employee_id, "compensation", COMPENSATION_BY_EMPLOYEE, (employee_id,))
+
+# List results are shared by all workers on the node (see sharedCache). The
+# filtered employee list joins EmploymentDetails, so writes to either table
+# invalidate "employees". Lists are gathered from every shard, on the
+# primaries: a list built from a lagging replica just after a write would be
+# stored under the new version and served to every client, the writer too.
+response_cache = SharedCache("successfactors")
+
+def shard_rows(pools, query: str, params: list):
+    with pools.borrow(write=True) as cnx:
+        cur = cnx.cursor()
+        timed_execute(cur, query, params)
+        with db_timer():
+            rows = cur.fetchall()
+        columns = [d[0] for d in cur.description]
+        cur.close()
+    return columns, rows
+
+def cached_rows(namespace: str, query: str, params: list) -> Response:
+    def build():
+        results = shards.scatter(lambda pools: shard_rows(pools, query, params))
+        columns = results[0][0]
+        rows = [row for _, shard in results for row in shard]
+        add_rows(len(rows))
+        with serialize_timer():
+            body = encode_rows(columns, rows)
+        return Response(body, media_type="application/json")
+    return response_cache.response(namespace, f"{query} {params!r}", build)
+
+# Point-in-time headcount and employment (see employmentHistory)
+history = install_as_of(app, shards, response_cache, get_current_user)
+
+@readiness.warmup("as-of index")
+def load_history_index():
+    history.load()
+
+@app.get("/admin/employee_cache", include_in_schema=False)
+def get_employee_cache_stats(user: str = Depends(get_current_user)):
+    return employee_cache.stats()
+
 # -----------------------------------------------------------------
 # Authentication Endpoint
 # -----------------------------------------------------------------
@@ -133,47 +256,101 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
 # -----------------------------------------------------------------
 # Employee Endpoints
 # -----------------------------------------------------------------
+def employment_filters(department, status, business_unit, hire_date_from, hire_date_to,
+                       termination_date_from, termination_date_to, prefix=""):
+    return [
+        (f"{prefix}Department", "=", department),
+        (f"{prefix}EmploymentStatus", "=", status),
+        (f"{prefix}BusinessUnit", "=", business_unit),
+        (f"{prefix}HireDate", ">=", hire_date_from),
+        (f"{prefix}HireDate", "<=", hire_date_to),
+        (f"{prefix}TerminationDate", ">=", termination_date_from),
+        (f"{prefix}TerminationDate", "<=", termination_date_to),
+    ]
+
+def employees_query(
+    department: Optional[str] = None,
+    status: Optional[str] = None,
+    business_unit: Optional[str] = None,
+    hire_date_from: Optional[date] = None,
+    hire_date_to: Optional[date] = None,
+    termination_date_from: Optional[date] = None,
+    termination_date_to: Optional[date] = None,
+    fields: Optional[List[str]] = None,
+):
+    where, params = build_where(employment_filters(
+        department, status, business_unit, hire_date_from, hire_date_to,
+        termination_date_from, termination_date_to, prefix="ED."
+    ))
+    columns = select_list(Employee, fields, prefix="E.") if fields else "E.*"
+    if where:
+        return f"SELECT {columns} FROM Employee E JOIN EmploymentDetails ED ON ED.EmployeeID = E.EmployeeID{where};", params
+    return f"SELECT {columns} FROM Employee E;", params
+
+exports.sql("employees", shards.all(), employees_query)
+
 @app.get("/employees", response_model=List[Employee])
-def get_employees(user: str = Depends(get_current_user)):
+def get_employees(
+    department: Optional[str] = None,
+    status: Optional[str] = None,
+    business_unit: Optional[str] = None,
+    hire_date_from: Optional[date] = None,
+    hire_date_to: Optional[date] = None,
+    termination_date_from: Optional[date] = None,
+    termination_date_to: Optional[date] = None,
+    fields: Optional[List[str]] = Depends(fields_param(Employee)),
+    user: str = Depends(get_current_user)
+):
+    query, params = employees_query(department, status, business_unit, hire_date_from, hire_date_to,
+                                    termination_date_from, termination_date_to, fields)
     try:
-        cur = conn.cursor(dictionary=True)
-        cur.execute("SELECT * FROM Employee;")
-        employees = cur.fetchall()
-        cur.close()
-        return employees
+        return cached_rows("employees", query, params)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/employees/{employee_id}", response_model=Employee)
-def get_employee(employee_id: int, user: str = Depends(get_current_user)):
+def get_employee(employee_id: int,
+                 fields: Optional[List[str]] = Depends(fields_param(Employee)),
+                 user: str = Depends(get_current_user)):
     try:
-        cur = conn.cursor(dictionary=True)
-        cur.execute("SELECT * FROM Employee WHERE EmployeeID = %s;", (employee_id,))
-        employee = cur.fetchone()
-        cur.close()
+        employee = cached_lookup(employee_id, "employee", EMPLOYEE_BY_ID, (employee_id,))
         if not employee:
             raise HTTPException(status_code=404, detail="Employee not found")
-        return employee
+        return project(Employee, employee, fields)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/employees", response_model=Employee)
-def create_employee(emp: EmployeeBase, user: str = Depends(get_current_user)):
+def create_employee(emp: EmployeeBase, business_unit: Optional[str] = None,
+                    user: str = Depends(get_current_user)):
     try:
-        cur = conn.cursor(dictionary=True)
+        # business_unit picks the shard of a new hire; the EmployeeID comes
+        # from the shard directory, or from AUTO_INCREMENT when unsharded.
+        pools, employee_id = shards.allocate(business_unit)
+        cnx = pools.connection()
+        cur = cnx.cursor(dictionary=True)
         insert_sql = """
             INSERT INTO Employee 
-            (EmployeeNumber, FirstName, LastName, MiddleName, PreferredName, Gender, DateOfBirth, Nationality, MaritalStatus, Email, ContactNumber, Address, PhotoURL)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
+            (EmployeeID, EmployeeNumber, FirstName, LastName, MiddleName, PreferredName, Gender, DateOfBirth, Nationality, MaritalStatus, Email, ContactNumber, Address, PhotoURL)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
         """
-        cur.execute(insert_sql, (
-            emp.EmployeeNumber, emp.FirstName, emp.LastName, emp.MiddleName, emp.PreferredName,
-            emp.Gender, emp.DateOfBirth, emp.Nationality, emp.MaritalStatus, emp.Email,
-            emp.ContactNumber, emp.Address, emp.PhotoURL
-        ))
-        new_employee_id = cur.lastrowid
-        conn.commit()
-        cur.execute("SELECT * FROM Employee WHERE EmployeeID = %s;", (new_employee_id,))
+        try:
+            timed_execute(cur, insert_sql, (
+                employee_id, emp.EmployeeNumber, emp.FirstName, emp.LastName, emp.MiddleName, emp.PreferredName,
+                emp.Gender, emp.DateOfBirth, emp.Nationality, emp.MaritalStatus, emp.Email,
+                emp.ContactNumber, emp.Address, emp.PhotoURL
+            ))
+            cnx.commit()
+        except Exception:
+            # e.g. a duplicate EmployeeNumber: drop the directory entry again
+            if employee_id is not None:
+                shards.release(employee_id)
+            raise
+        new_employee_id = employee_id or cur.lastrowid
+        employee_cache.invalidate(new_employee_id)
+        response_cache.invalidate("employees")
+        publish("employee.hired", {"EmployeeID": new_employee_id})
+        timed_execute(cur, "SELECT * FROM Employee WHERE EmployeeID = %s;", (new_employee_id,))
         new_employee = cur.fetchone()
         cur.close()
         return new_employee
@@ -183,34 +360,89 @@ def create_employee(emp: EmployeeBase, user: str = Depends(get_current_user)):
 # -----------------------------------------------------------------
 # EmploymentDetails Endpoints
 # -----------------------------------------------------------------
+def employment_details_query(
+    employee_id: Optional[List[int]] = None,
+    department: Optional[str] = None,
+    status: Optional[str] = None,
+    business_unit: Optional[str] = None,
+    hire_date_from: Optional[date] = None,
+    hire_date_to: Optional[date] = None,
+    termination_date_from: Optional[date] = None,
+    termination_date_to: Optional[date] = None,
+    fields: Optional[List[str]] = None,
+):
+    where, params = build_where([("EmployeeID", "=", employee_id)] + employment_filters(
+        department, status, business_unit, hire_date_from, hire_date_to,
+        termination_date_from, termination_date_to
+    ))
+    return f"SELECT {select_list(EmploymentDetails, fields)} FROM EmploymentDetails{where};", params
+
+exports.sql("employment_details", shards.all(), employment_details_query)
+
+@app.get("/employment_details", response_model=List[EmploymentDetails])
+def get_all_employment_details(
+    employee_id: Optional[List[int]] = Query(None),
+    department: Optional[str] = None,
+    status: Optional[str] = None,
+    business_unit: Optional[str] = None,
+    hire_date_from: Optional[date] = None,
+    hire_date_to: Optional[date] = None,
+    termination_date_from: Optional[date] = None,
+    termination_date_to: Optional[date] = None,
+    fields: Optional[List[str]] = Depends(fields_param(EmploymentDetails)),
+    user: str = Depends(get_current_user)
+):
+    query, params = employment_details_query(employee_id, department, status, business_unit, hire_date_from,
+                                             hire_date_to, termination_date_from, termination_date_to, fields)
+    try:
+        return cached_rows("employment_details", query, params)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/employment_details/{employee_id}", response_model=EmploymentDetails)
-def get_employment_details(employee_id: int, user: str = Depends(get_current_user)):
+def get_employment_details(employee_id: int,
+                           fields: Optional[List[str]] = Depends(fields_param(EmploymentDetails)),
+                           user: str = Depends(get_current_user)):
     try:
-        cur = conn.cursor(dictionary=True)
-        cur.execute("SELECT * FROM EmploymentDetails WHERE EmployeeID = %s;", (employee_id,))
-        details = cur.fetchone()
-        cur.close()
+        details = cached_lookup(employee_id, "employment", EMPLOYMENT_DETAILS_BY_EMPLOYEE, (employee_id,))
         if not details:
             raise HTTPException(status_code=404, detail="Employment details not found")
-        return details
+        return project(EmploymentDetails, details, fields)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/employment_details", response_model=EmploymentDetails)
 def create_employment_details(details: EmploymentDetails, user: str = Depends(get_current_user)):
     try:
-        cur = conn.cursor(dictionary=True)
+        history.ensure_tables()
+        cnx = shards.pools_for(details.EmployeeID).connection()
+        cnx.start_transaction()  # the details and their history together
+        cur = cnx.cursor(dictionary=True)
         insert_sql = """
             INSERT INTO EmploymentDetails 
             (EmployeeID, JobTitle, Department, BusinessUnit, ManagerID, JobCode, EmploymentType, HireDate, TerminationDate, EmploymentStatus)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
         """
-        cur.execute(insert_sql, (
+        timed_execute(cur, insert_sql, (
             details.EmployeeID, details.JobTitle, details.Department, details.BusinessUnit, details.ManagerID,
             details.JobCode, details.EmploymentType, details.HireDate, details.TerminationDate, details.EmploymentStatus
         ))
-        conn.commit()
-        cur.execute("SELECT * FROM EmploymentDetails WHERE EmployeeID = %s;", (details.EmployeeID,))
+        # Employed from HireDate; with a TerminationDate, active until then
+        # and in the given status afterwards.
+        state = details.dict()
+        if details.TerminationDate is not None:
+            state["EmploymentStatus"] = "Active"
+        record_employment(cur, details.EmployeeID, details.HireDate, state,
+                          until=details.TerminationDate, status_after=details.EmploymentStatus)
+        cnx.commit()
+        history.invalidate()
+        employee_cache.invalidate(details.EmployeeID)
+        response_cache.invalidate("employees")
+        response_cache.invalidate("employment_details")
+        if details.TerminationDate is not None:
+            publish("employee.departed", {"EmployeeID": details.EmployeeID, "TerminationDate": details.TerminationDate,
+                                          "Department": details.Department})
+        timed_execute(cur, "SELECT * FROM EmploymentDetails WHERE EmployeeID = %s;", (details.EmployeeID,))
         new_details = cur.fetchone()
         cur.close()
         return new_details
@@ -221,33 +453,34 @@ def create_employment_details(details: EmploymentDetails, user: str = Depends(ge
 # Compensation Endpoints
 # -----------------------------------------------------------------
 @app.get("/compensation/{employee_id}", response_model=Compensation)
-def get_compensation(employee_id: int, user: str = Depends(get_current_user)):
+def get_compensation(employee_id: int,
+                     fields: Optional[List[str]] = Depends(fields_param(Compensation)),
+                     user: str = Depends(get_current_user)):
     try:
-        cur = conn.cursor(dictionary=True)
-        cur.execute("SELECT * FROM Compensation WHERE EmployeeID = %s;", (employee_id,))
-        comp = cur.fetchone()
-        cur.close()
+        comp = cached_lookup(employee_id, "compensation", COMPENSATION_BY_EMPLOYEE, (employee_id,))
         if not comp:
             raise HTTPException(status_code=404, detail="Compensation details not found")
-        return comp
+        return project(Compensation, comp, fields)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/compensation", response_model=Compensation)
 def create_compensation(comp: Compensation, user: str = Depends(get_current_user)):
     try:
-        cur = conn.cursor(dictionary=True)
+        cnx = shards.pools_for(comp.EmployeeID).connection()
+        cur = cnx.cursor(dictionary=True)
         insert_sql = """
             INSERT INTO Compensation 
             (EmployeeID, BaseSalary, Currency, SalaryFrequency, LastSalaryChange, BonusEligibility, VariablePay, StockOptions)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
         """
-        cur.execute(insert_sql, (
+        timed_execute(cur, insert_sql, (
             comp.EmployeeID, comp.BaseSalary, comp.Currency, comp.SalaryFrequency,
             comp.LastSalaryChange, comp.BonusEligibility, comp.VariablePay, comp.StockOptions
         ))
-        conn.commit()
-        cur.execute("SELECT * FROM Compensation WHERE EmployeeID = %s;", (comp.EmployeeID,))
+        cnx.commit()
+        employee_cache.invalidate(comp.EmployeeID)
+        timed_execute(cur, "SELECT * FROM Compensation WHERE EmployeeID = %s;", (comp.EmployeeID,))
         new_comp = cur.fetchone()
         cur.close()
         return new_comp
@@ -258,36 +491,34 @@ def create_compensation(comp: Compensation, user: str = Depends(get_current_user
 # Performance Endpoints
 # -----------------------------------------------------------------
 @app.get("/performance/{employee_id}/{year}", response_model=Performance)
-def get_performance(employee_id: int, year: int, user: str = Depends(get_current_user)):
+def get_performance(employee_id: int, year: int,
+                    fields: Optional[List[str]] = Depends(fields_param(Performance)),
+                    user: str = Depends(get_current_user)):
     try:
-        cur = conn.cursor(dictionary=True)
-        cur.execute(
-            "SELECT * FROM Performance WHERE EmployeeID = %s AND PerformanceYear = %s;",
-            (employee_id, year)
-        )
-        perf = cur.fetchone()
-        cur.close()
+        perf = cached_lookup(employee_id, f"performance:{year}", PERFORMANCE_BY_EMPLOYEE_YEAR, (employee_id, year))
         if not perf:
             raise HTTPException(status_code=404, detail="Performance record not found")
-        return perf
+        return project(Performance, perf, fields)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/performance", response_model=Performance)
 def create_performance(perf: Performance, user: str = Depends(get_current_user)):
     try:
-        cur = conn.cursor(dictionary=True)
+        cnx = shards.pools_for(perf.EmployeeID).connection()
+        cur = cnx.cursor(dictionary=True)
         insert_sql = """
             INSERT INTO Performance 
             (EmployeeID, PerformanceYear, PerformanceRating, ManagerFeedback, TrainingCompleted, SkillsDeveloped, PromotionIndicator)
             VALUES (%s, %s, %s, %s, %s, %s, %s);
         """
-        cur.execute(insert_sql, (
+        timed_execute(cur, insert_sql, (
             perf.EmployeeID, perf.PerformanceYear, perf.PerformanceRating, perf.ManagerFeedback,
             perf.TrainingCompleted, perf.SkillsDeveloped, perf.PromotionIndicator
         ))
-        conn.commit()
-        cur.execute("SELECT * FROM Performance WHERE EmployeeID = %s AND PerformanceYear = %s;", (perf.EmployeeID, perf.PerformanceYear))
+        cnx.commit()
+        employee_cache.invalidate(perf.EmployeeID)
+        timed_execute(cur, "SELECT * FROM Performance WHERE EmployeeID = %s AND PerformanceYear = %s;", (perf.EmployeeID, perf.PerformanceYear))
         new_perf = cur.fetchone()
         cur.close()
         return new_perf
@@ -299,8 +530,7 @@ def create_performance(perf: Performance, user: str = Depends(get_current_user))
 # -----------------------------------------------------------------
 @app.on_event("shutdown")
 def shutdown_event():
-    if conn:
-        conn.close()
+    shards.close()
 
 # -----------------------------------------------------------------
 # Running the Application
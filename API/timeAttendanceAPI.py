@@ -1,14 +1,28 @@
 import os
-import mysql.connector
 from mysql.connector import Error
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import date, time, datetime, timedelta
 import jwt
 from jwt import PyJWTError
 from dotenv import load_dotenv
+from tokenCache import AUTH_TOKEN_URL, get_token_cache, issuer_claims
+from queryFilters import build_where
+from apiMetrics import install_metrics, timed_execute
+from singleFlight import install_single_flight
+from compression import install_compression
+from admissionControl import install_admission_control
+from mysqlPools import DatabasePools
+from shardRouting import SUCCESSFACTORS_SHARDS
+from readiness import install_readiness
+from preparedStatements import fetch_one
+from slowQueryLog import install_slow_query_log
+from exportJobs import install_exports
+from batchRequests import install_batch, sql_lookup
+from fastJson import rows_response
+from fieldProjection import fields_param, project, select_list
 
 # Load environment variables from .env file
 load_dotenv()
@@ -20,17 +34,18 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl=AUTH_TOKEN_URL)
+token_cache = get_token_cache(SECRET_KEY, ALGORITHM)
 
 def create_access_token(data: dict, expires_delta: timedelta):
     to_encode = data.copy()
     expire = datetime.utcnow() + expires_delta
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, **issuer_claims()})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def get_current_user(token: str = Depends(oauth2_scheme)):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = token_cache.verify(token)
         user: str = payload.get("sub")
         if user is None:
             raise HTTPException(status_code=401, detail="Invalid token")
@@ -41,20 +56,28 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
 # -----------------------------------------------------------------
 # Global MySQL Connection Setup
 # -----------------------------------------------------------------
-try:
-    mysql_conn = mysql.connector.connect(
-        host=os.getenv("MYSQL_HOST"),
-        user=os.getenv("MYSQL_USER"),
-        password=os.getenv("MYSQL_PASSWORD"),
-        database=os.getenv("MYSQL_TIMEATTENDANCE_DATABASE"),
-        auth_plugin=os.getenv("MYSQL_AUTH_PLUGIN")
-    )
-    if not mysql_conn.is_connected():
-        raise Exception("Failed to connect to MySQL")
-except Error as e:
-    raise Exception(f"MySQL connection error: {e}")
+# Reads go to a replica pool when MYSQL_REPLICA_HOSTS is set (see mysqlPools)
+db = DatabasePools(
+    "timeattendance",
+    host=os.getenv("MYSQL_HOST"),
+    user=os.getenv("MYSQL_USER"),
+    password=os.getenv("MYSQL_PASSWORD"),
+    database=os.getenv("MYSQL_TIMEATTENDANCE_DATABASE"),
+    auth_plugin=os.getenv("MYSQL_AUTH_PLUGIN"),
+    use_pure=False  # use the C extension for row decoding when it is installed
+)
 
 app = FastAPI(title="Time and Attendance API")
+db.install(app)
+install_compression(app)
+install_admission_control(app)
+install_single_flight(app, token_cache)
+metrics = install_metrics(app, "timeattendance")
+slow_queries = install_slow_query_log(app, db.connection, get_current_user)
+readiness = install_readiness(app, "timeattendance")
+readiness.check("mysql")(db.ping)
+readiness.warmup("mysql pools")(db.open)
+exports = install_exports(app, "timeattendance", get_current_user)
 
 # -----------------------------------------------------------------
 # Pydantic Models
@@ -101,6 +124,35 @@ class OvertimeRecord(BaseModel):
     ApprovedBy: Optional[int] = None
     CreatedAt: Optional[datetime] = None
 
+# KPI rows: the grouping columns are present only when grouped by them.
+class AttendanceKPI(BaseModel):
+    EmployeeID: Optional[int] = None
+    Department: Optional[str] = None
+    PeriodStart: Optional[date] = None
+    DaysRecorded: int
+    LateArrivals: int
+    EarlyDepartures: int
+    AvgLateMinutes: Optional[float] = None
+    AvgWorkedHours: Optional[float] = None
+
+class LeaveKPI(BaseModel):
+    EmployeeID: Optional[int] = None
+    Department: Optional[str] = None
+    PeriodStart: Optional[date] = None
+    LeaveType: Optional[str] = None
+    Status: Optional[str] = None
+    Requests: int
+    TotalDays: Optional[float] = None
+
+class OvertimeKPI(BaseModel):
+    EmployeeID: Optional[int] = None
+    Department: Optional[str] = None
+    PeriodStart: Optional[date] = None
+    ApprovedBy: Optional[int] = None
+    Records: int
+    Employees: int
+    TotalHours: Optional[float] = None
+
 # -----------------------------------------------------------------
 # Authentication Endpoint
 # -----------------------------------------------------------------
@@ -115,61 +167,106 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
 # -----------------------------------------------------------------
 # Helper Function to Get a New Cursor
 # -----------------------------------------------------------------
-def get_cursor():
+def get_cursor(dictionary: bool = True):
     try:
-        return mysql_conn.cursor(dictionary=True)
+        return db.connection().cursor(dictionary=dictionary)
     except Error as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # -----------------------------------------------------------------
-# Helper Functions to Convert Timedelta to Time or String
+# TIME Column Decoding
+# -----------------------------------------------------------------
+# The connector decodes MySQL TIME values into timedeltas, which then had to
+# be turned into "HH:MM:SS" strings in Python for every row. Instead, TIME
+# columns are cast to text in the SELECT itself, so rows arrive already in
+# the form the models and the JSON output use and no per-row Python
+# conversion is needed.
+def time_as_text(column: str) -> str:
+    return f"CAST({column} AS CHAR) AS {column}"
+
+TIME_COLUMNS = {c: time_as_text(c) for c in ["ClockIn", "ClockOut", "BreakDuration", "LateBy", "EarlyBy",
+                                             "ScheduledIn", "ScheduledOut"]}
+
+def attendance_select(fields: Optional[List[str]] = None) -> str:
+    return f"SELECT {select_list(AttendanceRecord, fields, TIME_COLUMNS)} FROM AttendanceRecords"
+
+def shift_select(fields: Optional[List[str]] = None) -> str:
+    return f"SELECT {select_list(ShiftSchedule, fields, TIME_COLUMNS)} FROM ShiftSchedules"
+
+ATTENDANCE_SELECT = attendance_select()
+SHIFT_SELECT = shift_select()
+
+# -----------------------------------------------------------------
+# Point Lookups (cached prepared statements, see preparedStatements)
 # -----------------------------------------------------------------
-def timedelta_to_time(td: timedelta) -> time:
-    total_seconds = int(td.total_seconds())
-    hours = (total_seconds // 3600) % 24
-    minutes = (total_seconds % 3600) // 60
-    seconds = total_seconds % 60
-    return time(hour=hours, minute=minutes, second=seconds)
-
-def timedelta_to_str(td: timedelta) -> str:
-    t = timedelta_to_time(td)
-    return t.strftime("%H:%M:%S")
-
-def transform_attendance_record(record: dict) -> dict:
-    # Convert timedeltas to the expected types
-    if isinstance(record.get("ClockIn"), timedelta):
-        record["ClockIn"] = timedelta_to_time(record["ClockIn"])
-    if isinstance(record.get("ClockOut"), timedelta):
-        record["ClockOut"] = timedelta_to_time(record["ClockOut"])
-    for field in ["BreakDuration", "LateBy", "EarlyBy"]:
-        if isinstance(record.get(field), timedelta):
-            record[field] = timedelta_to_str(record[field])
-    return record
+ATTENDANCE_BY_ID = f"{ATTENDANCE_SELECT} WHERE RecordID = %s;"
+LEAVE_BY_ID = "SELECT * FROM LeaveRecords WHERE LeaveID = %s;"
+SHIFT_BY_ID = f"{SHIFT_SELECT} WHERE ScheduleID = %s;"
+OVERTIME_BY_ID = "SELECT * FROM OvertimeRecords WHERE OvertimeID = %s;"
+
+@readiness.warmup("prepared statements")
+def prepare_point_lookups():
+    def prepare(cnx):
+        for sql in (ATTENDANCE_BY_ID, LEAVE_BY_ID, SHIFT_BY_ID, OVERTIME_BY_ID):
+            fetch_one(cnx, sql, (0,))
+    db.each_connection(prepare)
+
+# /batch merges point lookups on these routes into one IN query each.
+batch = install_batch(app, get_current_user)
+batch.lookup("/attendance/{record_id}", sql_lookup(db, ATTENDANCE_SELECT, "RecordID", AttendanceRecord),
+             "Attendance record not found")
+batch.lookup("/leave/{leave_id}", sql_lookup(db, "SELECT * FROM LeaveRecords", "LeaveID", LeaveRecord),
+             "Leave record not found")
+batch.lookup("/shift/{schedule_id}", sql_lookup(db, SHIFT_SELECT, "ScheduleID", ShiftSchedule),
+             "Shift schedule not found")
+batch.lookup("/overtime/{overtime_id}", sql_lookup(db, "SELECT * FROM OvertimeRecords", "OvertimeID", OvertimeRecord),
+             "Overtime record not found")
+
+def fetch_by_id(sql: str, record_id: int):
+    try:
+        return fetch_one(db.connection(), sql, (record_id,))
+    except Error as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 # -----------------------------------------------------------------
 # AttendanceRecords Endpoints
 # -----------------------------------------------------------------
+def attendance_query(
+    employee_id: Optional[List[int]] = None,
+    attendance_date_from: Optional[date] = None,
+    attendance_date_to: Optional[date] = None,
+    fields: Optional[List[str]] = None,
+):
+    where, params = build_where([
+        ("EmployeeID", "=", employee_id),
+        ("AttendanceDate", ">=", attendance_date_from),
+        ("AttendanceDate", "<=", attendance_date_to),
+    ])
+    return f"{attendance_select(fields)}{where};", params
+
+exports.sql("attendance", db, attendance_query)
+
 @app.get("/attendance", response_model=List[AttendanceRecord])
-def get_attendance_records(user: str = Depends(get_current_user)):
-    cursor = get_cursor()
-    query = "SELECT * FROM AttendanceRecords;"
-    cursor.execute(query)
-    records = cursor.fetchall()
-    cursor.close()
-    # Transform each record if needed
-    transformed = [transform_attendance_record(r) for r in records]
-    return transformed
+def get_attendance_records(
+    employee_id: Optional[List[int]] = Query(None),
+    attendance_date_from: Optional[date] = None,
+    attendance_date_to: Optional[date] = None,
+    fields: Optional[List[str]] = Depends(fields_param(AttendanceRecord)),
+    user: str = Depends(get_current_user)
+):
+    query, params = attendance_query(employee_id, attendance_date_from, attendance_date_to, fields)
+    cursor = get_cursor(dictionary=False)
+    timed_execute(cursor, query, params)
+    return rows_response(cursor)
 
 @app.get("/attendance/{record_id}", response_model=AttendanceRecord)
-def get_attendance_record(record_id: int, user: str = Depends(get_current_user)):
-    cursor = get_cursor()
-    query = "SELECT * FROM AttendanceRecords WHERE RecordID = %s;"
-    cursor.execute(query, (record_id,))
-    record = cursor.fetchone()
-    cursor.close()
+def get_attendance_record(record_id: int,
+                          fields: Optional[List[str]] = Depends(fields_param(AttendanceRecord)),
+                          user: str = Depends(get_current_user)):
+    record = fetch_by_id(ATTENDANCE_BY_ID, record_id)
     if not record:
         raise HTTPException(status_code=404, detail="Attendance record not found")
-    return transform_attendance_record(record)
+    return project(AttendanceRecord, record, fields)
 
 @app.post("/attendance", response_model=AttendanceRecord)
 def create_attendance_record(record: AttendanceRecord, user: str = Depends(get_current_user)):
@@ -190,38 +287,62 @@ def create_attendance_record(record: AttendanceRecord, user: str = Depends(get_c
         record.Notes
     )
     try:
-        cursor.execute(query, values)
-        mysql_conn.commit()
+        timed_execute(cursor, query, values)
+        db.connection().commit()
         record_id = cursor.lastrowid
         cursor.close()
-        return get_attendance_record(record_id, user)
+        return get_attendance_record(record_id, fields=None, user=user)
     except Error as e:
-        mysql_conn.rollback()
+        db.connection().rollback()
         cursor.close()
         raise HTTPException(status_code=500, detail=str(e))
 
 # -----------------------------------------------------------------
 # LeaveRecords Endpoints
 # -----------------------------------------------------------------
+def leave_query(
+    employee_id: Optional[List[int]] = None,
+    leave_type: Optional[str] = None,
+    status: Optional[str] = None,
+    start_date_from: Optional[date] = None,
+    start_date_to: Optional[date] = None,
+    fields: Optional[List[str]] = None,
+):
+    where, params = build_where([
+        ("EmployeeID", "=", employee_id),
+        ("LeaveType", "=", leave_type),
+        ("Status", "=", status),
+        ("StartDate", ">=", start_date_from),
+        ("StartDate", "<=", start_date_to),
+    ])
+    columns = select_list(LeaveRecord, fields) if fields else "*"
+    return f"SELECT {columns} FROM LeaveRecords{where};", params
+
+exports.sql("leave", db, leave_query)
+
 @app.get("/leave", response_model=List[LeaveRecord])
-def get_leave_records(user: str = Depends(get_current_user)):
-    cursor = get_cursor()
-    query = "SELECT * FROM LeaveRecords;"
-    cursor.execute(query)
-    records = cursor.fetchall()
-    cursor.close()
-    return records
+def get_leave_records(
+    employee_id: Optional[List[int]] = Query(None),
+    leave_type: Optional[str] = None,
+    status: Optional[str] = None,
+    start_date_from: Optional[date] = None,
+    start_date_to: Optional[date] = None,
+    fields: Optional[List[str]] = Depends(fields_param(LeaveRecord)),
+    user: str = Depends(get_current_user)
+):
+    query, params = leave_query(employee_id, leave_type, status, start_date_from, start_date_to, fields)
+    cursor = get_cursor(dictionary=False)
+    timed_execute(cursor, query, params)
+    return rows_response(cursor)
 
 @app.get("/leave/{leave_id}", response_model=LeaveRecord)
-def get_leave_record(leave_id: int, user: str = Depends(get_current_user)):
-    cursor = get_cursor()
-    query = "SELECT * FROM LeaveRecords WHERE LeaveID = %s;"
-    cursor.execute(query, (leave_id,))
-    record = cursor.fetchone()
-    cursor.close()
+def get_leave_record(leave_id: int,
+                     fields: Optional[List[str]] = Depends(fields_param(LeaveRecord)),
+                     user: str = Depends(get_current_user)):
+    record = fetch_by_id(LEAVE_BY_ID, leave_id)
     if not record:
         raise HTTPException(status_code=404, detail="Leave record not found")
-    return record
+    return project(LeaveRecord, record, fields)
 
 @app.post("/leave", response_model=LeaveRecord)
 def create_leave_record(record: LeaveRecord, user: str = Depends(get_current_user)):
@@ -242,38 +363,58 @@ def create_leave_record(record: LeaveRecord, user: str = Depends(get_current_use
         record.ApprovedBy
     )
     try:
-        cursor.execute(query, values)
-        mysql_conn.commit()
+        timed_execute(cursor, query, values)
+        db.connection().commit()
         leave_id = cursor.lastrowid
         cursor.close()
-        return get_leave_record(leave_id, user)
+        return get_leave_record(leave_id, fields=None, user=user)
     except Error as e:
-        mysql_conn.rollback()
+        db.connection().rollback()
         cursor.close()
         raise HTTPException(status_code=500, detail=str(e))
 
 # -----------------------------------------------------------------
 # ShiftSchedules Endpoints
 # -----------------------------------------------------------------
+def shift_query(
+    employee_id: Optional[List[int]] = None,
+    shift_type: Optional[str] = None,
+    shift_date_from: Optional[date] = None,
+    shift_date_to: Optional[date] = None,
+    fields: Optional[List[str]] = None,
+):
+    where, params = build_where([
+        ("EmployeeID", "=", employee_id),
+        ("ShiftType", "=", shift_type),
+        ("ShiftDate", ">=", shift_date_from),
+        ("ShiftDate", "<=", shift_date_to),
+    ])
+    return f"{shift_select(fields)}{where};", params
+
+exports.sql("shift", db, shift_query)
+
 @app.get("/shift", response_model=List[ShiftSchedule])
-def get_shift_schedules(user: str = Depends(get_current_user)):
-    cursor = get_cursor()
-    query = "SELECT * FROM ShiftSchedules;"
-    cursor.execute(query)
-    records = cursor.fetchall()
-    cursor.close()
-    return records
+def get_shift_schedules(
+    employee_id: Optional[List[int]] = Query(None),
+    shift_type: Optional[str] = None,
+    shift_date_from: Optional[date] = None,
+    shift_date_to: Optional[date] = None,
+    fields: Optional[List[str]] = Depends(fields_param(ShiftSchedule)),
+    user: str = Depends(get_current_user)
+):
+    query, params = shift_query(employee_id, shift_type, shift_date_from, shift_date_to, fields)
+    cursor = get_cursor(dictionary=False)
+    timed_execute(cursor, query, params)
+    return rows_response(cursor)
 
 @app.get("/shift/{schedule_id}", response_model=ShiftSchedule)
-def get_shift_schedule(schedule_id: int, user: str = Depends(get_current_user)):
-    cursor = get_cursor()
-    query = "SELECT * FROM ShiftSchedules WHERE ScheduleID = %s;"
-    cursor.execute(query, (schedule_id,))
-    record = cursor.fetchone()
-    cursor.close()
+def get_shift_schedule(schedule_id: int,
+                       fields: Optional[List[str]] = Depends(fields_param(ShiftSchedule)),
+                       user: str = Depends(get_current_user)):
+    record = fetch_by_id(SHIFT_BY_ID, schedule_id)
     if not record:
         raise HTTPException(status_code=404, detail="Shift schedule not found")
-    return record
+    return project(ShiftSchedule, record, fields)
 
 @app.post("/shift", response_model=ShiftSchedule)
 def create_shift_schedule(schedule: ShiftSchedule, user: str = Depends(get_current_user)):
@@ -291,38 +432,59 @@ def create_shift_schedule(schedule: ShiftSchedule, user: str = Depends(get_curre
         schedule.ShiftType
     )
     try:
-        cursor.execute(query, values)
-        mysql_conn.commit()
+        timed_execute(cursor, query, values)
+        db.connection().commit()
         schedule_id = cursor.lastrowid
         cursor.close()
-        return get_shift_schedule(schedule_id, user)
+        return get_shift_schedule(schedule_id, fields=None, user=user)
     except Error as e:
-        mysql_conn.rollback()
+        db.connection().rollback()
         cursor.close()
         raise HTTPException(status_code=500, detail=str(e))
 
 # -----------------------------------------------------------------
 # OvertimeRecords Endpoints
 # -----------------------------------------------------------------
+def overtime_query(
+    employee_id: Optional[List[int]] = None,
+    approved_by: Optional[int] = None,
+    overtime_date_from: Optional[date] = None,
+    overtime_date_to: Optional[date] = None,
+    fields: Optional[List[str]] = None,
+):
+    where, params = build_where([
+        ("EmployeeID", "=", employee_id),
+        ("ApprovedBy", "=", approved_by),
+        ("OvertimeDate", ">=", overtime_date_from),
+        ("OvertimeDate", "<=", overtime_date_to),
+    ])
+    columns = select_list(OvertimeRecord, fields) if fields else "*"
+    return f"SELECT {columns} FROM OvertimeRecords{where};", params
+
+exports.sql("overtime", db, overtime_query)
+
 @app.get("/overtime", response_model=List[OvertimeRecord])
-def get_overtime_records(user: str = Depends(get_current_user)):
-    cursor = get_cursor()
-    query = "SELECT * FROM OvertimeRecords;"
-    cursor.execute(query)
-    records = cursor.fetchall()
-    cursor.close()
-    return records
+def get_overtime_records(
+    employee_id: Optional[List[int]] = Query(None),
+    approved_by: Optional[int] = None,
+    overtime_date_from: Optional[date] = None,
+    overtime_date_to: Optional[date] = None,
+    fields: Optional[List[str]] = Depends(fields_param(OvertimeRecord)),
+    user: str = Depends(get_current_user)
+):
+    query, params = overtime_query(employee_id, approved_by, overtime_date_from, overtime_date_to, fields)
+    cursor = get_cursor(dictionary=False)
+    timed_execute(cursor, query, params)
+    return rows_response(cursor)
 
 @app.get("/overtime/{overtime_id}", response_model=OvertimeRecord)
-def get_overtime_record(overtime_id: int, user: str = Depends(get_current_user)):
-    cursor = get_cursor()
-    query = "SELECT * FROM OvertimeRecords WHERE OvertimeID = %s;"
-    cursor.execute(query, (overtime_id,))
-    record = cursor.fetchone()
-    cursor.close()
+def get_overtime_record(overtime_id: int,
+                        fields: Optional[List[str]] = Depends(fields_param(OvertimeRecord)),
+                        user: str = Depends(get_current_user)):
+    record = fetch_by_id(OVERTIME_BY_ID, overtime_id)
     if not record:
         raise HTTPException(status_code=404, detail="Overtime record not found")
-    return record
+    return project(OvertimeRecord, record, fields)
 
 @app.post("/overtime", response_model=OvertimeRecord)
 def create_overtime_record(record: OvertimeRecord, user: str = Depends(get_current_user)):
@@ -339,23 +501,156 @@ def create_overtime_record(record: OvertimeRecord, user: str = Depends(get_curre
         record.ApprovedBy
     )
     try:
-        cursor.execute(query, values)
-        mysql_conn.commit()
+        timed_execute(cursor, query, values)
+        db.connection().commit()
         overtime_id = cursor.lastrowid
         cursor.close()
-        return get_overtime_record(overtime_id, user)
+        return get_overtime_record(overtime_id, fields=None, user=user)
     except Error as e:
-        mysql_conn.rollback()
+        db.connection().rollback()
         cursor.close()
         raise HTTPException(status_code=500, detail=str(e))
 
+# -----------------------------------------------------------------
+# KPI Endpoints (aggregated in MySQL)
+# -----------------------------------------------------------------
+# Each KPI route runs a single GROUP BY and returns one row per group, so
+# clients get lateness, hours, leave and overtime figures without
+# downloading the underlying records. Periods are labelled by their first
+# day (weeks start on Monday). Department figures join the employee's
+# EmploymentDetails row in SuccessFactorsDB, which must live on the same
+# MySQL server as TimeAttendanceDB. These queries therefore always run on
+# the primary (replicas need not carry SuccessFactorsDB), and are refused
+# while SuccessFactors is sharded (SUCCESSFACTORS_SHARDS): the copy left on
+# MYSQL_HOST by the split is no longer maintained.
+SUCCESSFACTORS_DB = os.getenv("MYSQL_SUCCESSFACTORS_DATABASE")
+
+GroupBy = Literal["employee", "department", "none"]
+Period = Literal["day", "week", "month", "all"]
+
+def period_start(column: str, period: str) -> Optional[str]:
+    return {
+        "day": column,
+        "week": f"DATE_SUB({column}, INTERVAL WEEKDAY({column}) DAY)",
+        "month": f"DATE_SUB({column}, INTERVAL DAYOFMONTH({column}) - 1 DAY)",
+        "all": None,
+    }[period]
+
+def kpi_source(table: str, alias: str, group_by: str, department: Optional[List[str]]):
+    """FROM clause, grouping columns and whether SuccessFactorsDB is joined, for a KPI query."""
+    source = f"{table} {alias}"
+    keys = []
+    joined = group_by == "department" or bool(department)
+    if joined:
+        if not SUCCESSFACTORS_DB:
+            raise HTTPException(status_code=400, detail="Department KPIs require MYSQL_SUCCESSFACTORS_DATABASE")
+        if SUCCESSFACTORS_SHARDS:
+            raise HTTPException(status_code=400,
+                                detail="Department KPIs are not available while SuccessFactors is sharded")
+        source += f" JOIN `{SUCCESSFACTORS_DB}`.EmploymentDetails ED ON ED.EmployeeID = {alias}.EmployeeID"
+    if group_by == "employee":
+        keys.append((f"{alias}.EmployeeID", "EmployeeID"))
+    elif group_by == "department":
+        keys.append(("ED.Department", "Department"))
+    return source, keys, joined
+
+def kpi_response(source: str, keys: list, date_column: str, period: str, aggregates: str, filters: list,
+                 joined: bool = False):
+    start = period_start(date_column, period)
+    if start:
+        keys = keys + [(start, "PeriodStart")]
+    where, params = build_where(filters)
+    select = ", ".join([f"{expression} AS {name}" for expression, name in keys] + [aggregates])
+    query = f"SELECT {select} FROM {source}{where}"
+    if keys:
+        group = ", ".join(name for _, name in keys)
+        query += f" GROUP BY {group} ORDER BY {group}"
+    if joined:
+        with db.borrow(write=True) as cnx:
+            cursor = cnx.cursor()
+            timed_execute(cursor, query + ";", params)
+            return rows_response(cursor)
+    cursor = get_cursor(dictionary=False)
+    timed_execute(cursor, query + ";", params)
+    return rows_response(cursor)
+
+@app.get("/kpi/attendance", response_model=List[AttendanceKPI])
+def get_attendance_kpis(
+    group_by: GroupBy = "employee",
+    period: Period = "month",
+    employee_id: Optional[List[int]] = Query(None),
+    department: Optional[List[str]] = Query(None),
+    attendance_date_from: Optional[date] = None,
+    attendance_date_to: Optional[date] = None,
+    user: str = Depends(get_current_user)
+):
+    source, keys, joined = kpi_source("AttendanceRecords", "A", group_by, department)
+    aggregates = (
+        "COUNT(*) AS DaysRecorded, "
+        "CAST(SUM(A.LateBy > 0) AS SIGNED) AS LateArrivals, "
+        "CAST(SUM(A.EarlyBy > 0) AS SIGNED) AS EarlyDepartures, "
+        "ROUND(AVG(CASE WHEN A.LateBy > 0 THEN TIME_TO_SEC(A.LateBy) END) / 60, 2) AS AvgLateMinutes, "
+        "ROUND(AVG(TIME_TO_SEC(TIMEDIFF(A.ClockOut, A.ClockIn)) - COALESCE(TIME_TO_SEC(A.BreakDuration), 0)) / 3600, 2) "
+        "AS AvgWorkedHours"
+    )
+    return kpi_response(source, keys, "A.AttendanceDate", period, aggregates, [
+        ("A.EmployeeID", "=", employee_id),
+        ("ED.Department", "=", department),
+        ("A.AttendanceDate", ">=", attendance_date_from),
+        ("A.AttendanceDate", "<=", attendance_date_to),
+    ], joined)
+
+@app.get("/kpi/leave", response_model=List[LeaveKPI])
+def get_leave_kpis(
+    group_by: GroupBy = "none",
+    period: Period = "all",
+    employee_id: Optional[List[int]] = Query(None),
+    department: Optional[List[str]] = Query(None),
+    leave_type: Optional[List[str]] = Query(None),
+    status: Optional[List[str]] = Query(None),
+    start_date_from: Optional[date] = None,
+    start_date_to: Optional[date] = None,
+    user: str = Depends(get_current_user)
+):
+    source, keys, joined = kpi_source("LeaveRecords", "L", group_by, department)
+    keys += [("L.LeaveType", "LeaveType"), ("L.Status", "Status")]
+    return kpi_response(source, keys, "L.StartDate", period, "COUNT(*) AS Requests, SUM(L.TotalDays) AS TotalDays", [
+        ("L.EmployeeID", "=", employee_id),
+        ("ED.Department", "=", department),
+        ("L.LeaveType", "=", leave_type),
+        ("L.Status", "=", status),
+        ("L.StartDate", ">=", start_date_from),
+        ("L.StartDate", "<=", start_date_to),
+    ], joined)
+
+@app.get("/kpi/overtime", response_model=List[OvertimeKPI])
+def get_overtime_kpis(
+    group_by: GroupBy = "none",
+    period: Period = "month",
+    employee_id: Optional[List[int]] = Query(None),
+    department: Optional[List[str]] = Query(None),
+    approved_by: Optional[List[int]] = Query(None),
+    overtime_date_from: Optional[date] = None,
+    overtime_date_to: Optional[date] = None,
+    user: str = Depends(get_current_user)
+):
+    source, keys, joined = kpi_source("OvertimeRecords", "O", group_by, department)
+    keys.append(("O.ApprovedBy", "ApprovedBy"))
+    aggregates = "COUNT(*) AS Records, COUNT(DISTINCT O.EmployeeID) AS Employees, SUM(O.OvertimeHours) AS TotalHours"
+    return kpi_response(source, keys, "O.OvertimeDate", period, aggregates, [
+        ("O.EmployeeID", "=", employee_id),
+        ("ED.Department", "=", department),
+        ("O.ApprovedBy", "=", approved_by),
+        ("O.OvertimeDate", ">=", overtime_date_from),
+        ("O.OvertimeDate", "<=", overtime_date_to),
+    ], joined)
+
 # -----------------------------------------------------------------
 # Shutdown Handler
 # -----------------------------------------------------------------
 @app.on_event("shutdown")
 def shutdown_event():
-    if mysql_conn.is_connected():
-        mysql_conn.close()
+    db.close()
 
 # -----------------------------------------------------------------
 # Running the Application
@@ -0,0 +1,91 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import jwt
+
+# -----------------------------------------------------------------
+# Shared JWT Configuration
+# -----------------------------------------------------------------
+# When JWT_ISSUER is set, every service stamps it into the tokens it mints
+# and only accepts tokens carrying it. Services that share SECRET_KEY,
+# ALGORITHM and JWT_ISSUER therefore accept each other's tokens, so a client
+# can log in once against AUTH_TOKEN_URL and reuse that token everywhere.
+JWT_ISSUER = os.getenv("JWT_ISSUER")
+AUTH_TOKEN_URL = os.getenv("AUTH_TOKEN_URL", "/token")
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+# -----------------------------------------------------------------
+# Validated-Token Cache
+# -----------------------------------------------------------------
+class TokenCache:
+    """
+    In-process cache of already validated JWT payloads.
+
+    Entries are keyed by the SHA-256 digest of the raw token (the token itself
+    is never stored), evicted least-recently-used once `maxsize` is reached,
+    and dropped as soon as the token's `exp` claim has passed. Tokens without
+    an `exp` claim are verified on every call and never cached.
+    """
+
+    def __init__(self, secret_key: str, algorithm: str, issuer: Optional[str] = None,
+                 maxsize: int = TOKEN_CACHE_SIZE):
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+        self.issuer = issuer
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def verify(self, token: str) -> dict:
+        """Return the token's payload, raising PyJWTError if it is not valid."""
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                payload, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(digest)
+                    return payload
+                del self._entries[digest]
+
+        # A miss (or an expired entry) goes through full verification, which
+        # also raises ExpiredSignatureError for tokens past their `exp`.
+        payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm], issuer=self.issuer)
+        expires_at = payload.get("exp")
+        if expires_at is not None and self.maxsize > 0:
+            with self._lock:
+                self._entries[digest] = (payload, float(expires_at))
+                self._entries.move_to_end(digest)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return payload
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+# One cache per distinct key configuration, shared by every service imported
+# into the same process.
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_token_cache(secret_key: str, algorithm: str, issuer: Optional[str] = JWT_ISSUER) -> TokenCache:
+    key = (secret_key, algorithm, issuer)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = TokenCache(secret_key, algorithm, issuer=issuer)
+            _caches[key] = cache
+        return cache
+
+def issuer_claims() -> dict:
+    """Claims every service adds to the tokens it mints."""
+    return {"iss": JWT_ISSUER} if JWT_ISSUER else {}
@@ -0,0 +1,91 @@
+import os
+import sys
+import logging
+import mysql.connector
+from dotenv import load_dotenv
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("employmentHistory")
+
+# Load environment variables from .env file
+load_dotenv()
+
+# The table is defined once, by the SuccessFactors API, which also creates it
+# on first use.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "API"))
+from employmentHistory import HISTORY_TABLE_SQL
+
+# -----------------------------------------------------------------
+# 1. Configuration
+# -----------------------------------------------------------------
+# Rebuilds EmploymentHistory from the current EmploymentDetails rows, on
+# MYSQL_HOST or on every shard in SUCCESSFACTORS_SHARDS. Run it after
+# successFactorsDB.py (and successFactorsShards.py); from then on the
+# SuccessFactors API keeps the history up to date. Each employee gets
+# [HireDate, TerminationDate) as Active and their status from the
+# TerminationDate on, or one open interval when not terminated.
+MYSQL_HOST = os.getenv("MYSQL_HOST")
+MYSQL_USER = os.getenv("MYSQL_USER")
+MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
+MYSQL_DATABASE = os.getenv("MYSQL_SUCCESSFACTORS_DATABASE")
+MYSQL_AUTH_PLUGIN = os.getenv("MYSQL_AUTH_PLUGIN")
+SUCCESSFACTORS_SHARDS = os.getenv("SUCCESSFACTORS_SHARDS", "")
+
+BACKFILL_SQL = [
+    # Employed: up to the termination, or open
+    """
+    INSERT INTO EmploymentHistory
+    (EmployeeID, ValidFrom, ValidTo, JobTitle, Department, BusinessUnit, ManagerID, EmploymentStatus)
+    SELECT EmployeeID, HireDate, COALESCE(TerminationDate, '9999-12-31'), JobTitle, Department,
+           BusinessUnit, ManagerID,
+           CASE WHEN TerminationDate IS NULL THEN EmploymentStatus ELSE 'Active' END
+    FROM EmploymentDetails
+    WHERE HireDate IS NOT NULL AND (TerminationDate IS NULL OR TerminationDate > HireDate);
+    """,
+    # Terminated: from the termination on
+    """
+    INSERT INTO EmploymentHistory
+    (EmployeeID, ValidFrom, ValidTo, JobTitle, Department, BusinessUnit, ManagerID, EmploymentStatus)
+    SELECT EmployeeID, TerminationDate, '9999-12-31', JobTitle, Department, BusinessUnit, ManagerID,
+           EmploymentStatus
+    FROM EmploymentDetails
+    WHERE TerminationDate IS NOT NULL;
+    """,
+]
+
+def targets() -> list:
+    hosts = []
+    for item in SUCCESSFACTORS_SHARDS.split(","):
+        name, _, address = item.partition("=")
+        if address.strip():
+            host, _, port = address.strip().partition(":")
+            hosts.append((name.strip(), host, int(port) if port else 3306))
+    return hosts or [("default", MYSQL_HOST, 3306)]
+
+# -----------------------------------------------------------------
+# 2. Backfill
+# -----------------------------------------------------------------
+def backfill(host: str, port: int) -> int:
+    conn = mysql.connector.connect(host=host, port=port, user=MYSQL_USER, password=MYSQL_PASSWORD,
+                                   database=MYSQL_DATABASE, auth_plugin=MYSQL_AUTH_PLUGIN)
+    cur = conn.cursor()
+    cur.execute(HISTORY_TABLE_SQL)
+    cur.execute("DELETE FROM EmploymentHistory;")
+    for sql in BACKFILL_SQL:
+        cur.execute(sql)
+    conn.commit()
+    cur.execute("SELECT COUNT(*) FROM EmploymentHistory;")
+    count = cur.fetchone()[0]
+    cur.close()
+    conn.close()
+    return count
+
+# -----------------------------------------------------------------
+# 3. Main
+# -----------------------------------------------------------------
+if __name__ == "__main__":
+    for name, host, port in targets():
+        count = backfill(host, port)
+        logger.info(f"{name} ({host}:{port}): {count} history intervals")
+    logger.info("EmploymentHistory backfill complete.")
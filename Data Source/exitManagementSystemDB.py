@@ -99,7 +99,11 @@ exit_cursor.execute("""
         Status VARCHAR(50),
         ApprovedBy INT,
         Comments TEXT,
-        CreatedAt DATETIME
+        CreatedAt DATETIME,
+        INDEX idx_resignation_employee (EmployeeID),
+        INDEX idx_resignation_effective_date (EffectiveDate),
+        INDEX idx_resignation_reason (Reason(100)),
+        INDEX idx_resignation_reason_effective (Reason(100), EffectiveDate)
     );
 """)
 
@@ -112,7 +116,8 @@ exit_cursor.execute("""
         ReasonForExit TEXT,
         Feedback TEXT,
         InterviewDate DATE,
-        CreatedAt DATETIME
+        CreatedAt DATETIME,
+        INDEX idx_interview_employee (EmployeeID)
     );
 """)
 
@@ -125,7 +130,8 @@ exit_cursor.execute("""
         TaskDescription TEXT,
         CompletionDate DATE,
         Comments TEXT,
-        CreatedAt DATETIME
+        CreatedAt DATETIME,
+        INDEX idx_checklist_employee (EmployeeID)
     );
 """)
 
@@ -138,7 +144,8 @@ exit_cursor.execute("""
         QuestionsAnswers TEXT,
         OverallSatisfaction INT,
         Comments TEXT,
-        CreatedAt DATETIME
+        CreatedAt DATETIME,
+        INDEX idx_survey_employee (EmployeeID)
     );
 """)
 
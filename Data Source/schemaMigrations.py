@@ -0,0 +1,253 @@
+import os
+import argparse
+import logging
+from datetime import datetime
+import mysql.connector
+from dotenv import load_dotenv
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("schemaMigrations")
+
+# Load environment variables from .env file
+load_dotenv()
+
+# -----------------------------------------------------------------
+# 1. Database connection parameters from environment
+# -----------------------------------------------------------------
+MYSQL_HOST = os.getenv("MYSQL_HOST")
+MYSQL_USER = os.getenv("MYSQL_USER")
+MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
+MYSQL_AUTH_PLUGIN = os.getenv("MYSQL_AUTH_PLUGIN")
+
+# Environment variable holding each schema's database name
+DATABASES = {
+    "successfactors": "MYSQL_SUCCESSFACTORS_DATABASE",
+    "timeattendance": "MYSQL_TIMEATTENDANCE_DATABASE",
+    "exitmanagement": "MYSQL_EXITMANAGEMENT_DATABASE",
+}
+
+# -----------------------------------------------------------------
+# 2. Migrations
+# -----------------------------------------------------------------
+# Each migration has a version (applied in ascending order and recorded per
+# database in SchemaMigrations), the schema it targets and the secondary
+# indexes it adds. Every index carries an EXPLAIN probe: a query shaped like
+# the API or analysis access it serves, which must list the index among its
+# possible keys once the migration has been applied.
+MIGRATIONS = [
+    {
+        "version": 1,
+        "database": "successfactors",
+        "description": "EmploymentDetails filter indexes",
+        "indexes": [
+            ("EmploymentDetails", "idx_ed_department_status", "Department, EmploymentStatus",
+             "SELECT * FROM EmploymentDetails WHERE Department = 'IT' AND EmploymentStatus = 'Active'"),
+            ("EmploymentDetails", "idx_ed_status_hire_date", "EmploymentStatus, HireDate",
+             "SELECT * FROM EmploymentDetails WHERE EmploymentStatus = 'Active' AND HireDate >= '2020-01-01'"),
+            ("EmploymentDetails", "idx_ed_hire_date", "HireDate",
+             "SELECT * FROM EmploymentDetails WHERE HireDate BETWEEN '2021-04-01' AND '2021-04-30'"),
+            ("EmploymentDetails", "idx_ed_termination_date", "TerminationDate",
+             "SELECT * FROM EmploymentDetails WHERE TerminationDate BETWEEN '2021-04-01' AND '2021-04-30'"),
+            ("EmploymentDetails", "idx_ed_business_unit", "BusinessUnit",
+             "SELECT * FROM EmploymentDetails WHERE BusinessUnit = 'North India'"),
+        ],
+    },
+    {
+        "version": 1,
+        "database": "timeattendance",
+        "description": "Employee and date indexes on attendance tables",
+        "indexes": [
+            ("AttendanceRecords", "idx_attendance_employee_date", "EmployeeID, AttendanceDate",
+             "SELECT * FROM AttendanceRecords WHERE EmployeeID = 1 AND AttendanceDate >= '2024-01-01'"),
+            ("AttendanceRecords", "idx_attendance_date", "AttendanceDate",
+             "SELECT * FROM AttendanceRecords WHERE AttendanceDate BETWEEN '2024-01-01' AND '2024-01-31'"),
+            ("LeaveRecords", "idx_leave_employee_start", "EmployeeID, StartDate",
+             "SELECT * FROM LeaveRecords WHERE EmployeeID = 1 AND StartDate >= '2024-01-01'"),
+            ("LeaveRecords", "idx_leave_status_type", "Status, LeaveType",
+             "SELECT * FROM LeaveRecords WHERE Status = 'Approved' AND LeaveType = 'Sick'"),
+            ("LeaveRecords", "idx_leave_start_date", "StartDate",
+             "SELECT * FROM LeaveRecords WHERE StartDate BETWEEN '2024-01-01' AND '2024-01-31'"),
+            ("ShiftSchedules", "idx_shift_employee_date", "EmployeeID, ShiftDate",
+             "SELECT * FROM ShiftSchedules WHERE EmployeeID = 1 AND ShiftDate >= '2024-01-01'"),
+            ("ShiftSchedules", "idx_shift_date", "ShiftDate",
+             "SELECT * FROM ShiftSchedules WHERE ShiftDate BETWEEN '2024-01-01' AND '2024-01-31'"),
+            ("OvertimeRecords", "idx_overtime_employee_date", "EmployeeID, OvertimeDate",
+             "SELECT * FROM OvertimeRecords WHERE EmployeeID = 1 AND OvertimeDate >= '2024-01-01'"),
+            ("OvertimeRecords", "idx_overtime_date", "OvertimeDate",
+             "SELECT * FROM OvertimeRecords WHERE OvertimeDate BETWEEN '2024-01-01' AND '2024-01-31'"),
+            ("OvertimeRecords", "idx_overtime_approved_by", "ApprovedBy",
+             "SELECT * FROM OvertimeRecords WHERE ApprovedBy = 1"),
+        ],
+    },
+    {
+        "version": 1,
+        "database": "exitmanagement",
+        "description": "EmployeeID indexes on exit tables",
+        "indexes": [
+            ("ResignationRequests", "idx_resignation_employee", "EmployeeID",
+             "SELECT * FROM ResignationRequests WHERE EmployeeID = 1"),
+            ("ResignationRequests", "idx_resignation_effective_date", "EffectiveDate",
+             "SELECT * FROM ResignationRequests WHERE EffectiveDate BETWEEN '2021-04-01' AND '2021-04-30'"),
+            ("ResignationRequests", "idx_resignation_reason", "Reason(100)",
+             "SELECT * FROM ResignationRequests WHERE Reason IN ('Relocation', 'Health issues')"),
+            ("ExitInterviews", "idx_interview_employee", "EmployeeID",
+             "SELECT * FROM ExitInterviews WHERE EmployeeID = 1"),
+            ("ExitChecklists", "idx_checklist_employee", "EmployeeID",
+             "SELECT * FROM ExitChecklists WHERE EmployeeID = 1"),
+            ("ExitSurveys", "idx_survey_employee", "EmployeeID",
+             "SELECT * FROM ExitSurveys WHERE EmployeeID = 1"),
+        ],
+    },
+    {
+        "version": 2,
+        "database": "successfactors",
+        "description": "Composite index for terminated-employee lookups",
+        "indexes": [
+            ("EmploymentDetails", "idx_ed_status_termination", "EmploymentStatus, TerminationDate",
+             "SELECT EmployeeID, TerminationDate FROM EmploymentDetails "
+             "WHERE EmploymentStatus = 'Terminated' AND TerminationDate IS NOT NULL"),
+        ],
+    },
+    {
+        "version": 2,
+        "database": "exitmanagement",
+        "description": "Composite index for voluntary exits by reason and period",
+        "indexes": [
+            ("ResignationRequests", "idx_resignation_reason_effective", "Reason(100), EffectiveDate",
+             "SELECT * FROM ResignationRequests "
+             "WHERE Reason = 'Relocation' AND EffectiveDate >= '2021-01-01'"),
+        ],
+    },
+]
+
+MIGRATIONS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS SchemaMigrations (
+    Version INT PRIMARY KEY,
+    Description VARCHAR(255),
+    AppliedAt DATETIME
+) ENGINE=InnoDB;
+"""
+
+# -----------------------------------------------------------------
+# 3. Helper Functions
+# -----------------------------------------------------------------
+def connect(database_env: str):
+    return mysql.connector.connect(
+        host=MYSQL_HOST,
+        user=MYSQL_USER,
+        password=MYSQL_PASSWORD,
+        database=os.getenv(database_env),
+        auth_plugin=MYSQL_AUTH_PLUGIN
+    )
+
+def applied_versions(cur) -> set:
+    cur.execute(MIGRATIONS_TABLE_SQL)
+    cur.execute("SELECT Version FROM SchemaMigrations;")
+    return {row[0] for row in cur.fetchall()}
+
+def index_exists(cur, table: str, index_name: str) -> bool:
+    cur.execute(
+        """
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        LIMIT 1;
+        """,
+        (table, index_name)
+    )
+    return cur.fetchone() is not None
+
+def add_index_sql(table: str, index_name: str, columns: str) -> str:
+    # InnoDB builds secondary indexes in place without blocking reads or
+    # writes; asking for it explicitly makes MySQL refuse rather than silently
+    # fall back to a table copy.
+    return f"ALTER TABLE {table} ADD INDEX {index_name} ({columns}), ALGORITHM=INPLACE, LOCK=NONE;"
+
+def explain_uses_index(cur, query: str, index_name: str):
+    """Return (listed, chosen): whether the index is a possible key for the query and whether it was picked."""
+    cur.execute(f"EXPLAIN {query}")
+    columns = [c[0] for c in cur.description]
+    listed = chosen = False
+    for row in cur.fetchall():
+        plan = dict(zip(columns, row))
+        possible_keys = (plan.get("possible_keys") or "").split(",")
+        listed = listed or index_name in possible_keys
+        chosen = chosen or plan.get("key") == index_name
+    return listed, chosen
+
+# -----------------------------------------------------------------
+# 4. Apply and Verify
+# -----------------------------------------------------------------
+def migrate(database: str, dry_run: bool = False):
+    conn = connect(DATABASES[database])
+    conn.autocommit = True
+    cur = conn.cursor()
+    done = applied_versions(cur)
+    for migration in sorted(MIGRATIONS, key=lambda m: m["version"]):
+        if migration["database"] != database or migration["version"] in done:
+            continue
+        logger.info(f"[{database}] Applying v{migration['version']}: {migration['description']}")
+        for table, index_name, columns, _ in migration["indexes"]:
+            if index_exists(cur, table, index_name):
+                logger.info(f"[{database}] {table}.{index_name} already exists, skipping.")
+                continue
+            sql = add_index_sql(table, index_name, columns)
+            logger.info(f"[{database}] {sql}")
+            if not dry_run:
+                cur.execute(sql)
+        if not dry_run:
+            cur.execute(
+                "INSERT INTO SchemaMigrations (Version, Description, AppliedAt) VALUES (%s, %s, %s);",
+                (migration["version"], migration["description"], datetime.utcnow())
+            )
+    cur.close()
+    conn.close()
+
+def verify(database: str) -> bool:
+    conn = connect(DATABASES[database])
+    cur = conn.cursor()
+    ok = True
+    for migration in MIGRATIONS:
+        if migration["database"] != database:
+            continue
+        for table, index_name, _, probe in migration["indexes"]:
+            if not index_exists(cur, table, index_name):
+                logger.error(f"[{database}] {table}.{index_name} is missing.")
+                ok = False
+                continue
+            listed, chosen = explain_uses_index(cur, probe, index_name)
+            if not listed:
+                logger.error(f"[{database}] EXPLAIN does not consider {index_name} for: {probe}")
+                ok = False
+            elif not chosen:
+                # On small tables the optimizer may still prefer a full scan.
+                logger.warning(f"[{database}] {index_name} is usable but was not chosen for: {probe}")
+            else:
+                logger.info(f"[{database}] {index_name} OK")
+    cur.close()
+    conn.close()
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply and verify secondary index migrations.")
+    parser.add_argument("databases", nargs="*",
+                        help=f"Schemas to migrate: {', '.join(DATABASES)} (default: all)")
+    parser.add_argument("--dry-run", action="store_true", help="Print the DDL without executing it")
+    parser.add_argument("--verify-only", action="store_true", help="Only check the indexes with EXPLAIN")
+    args = parser.parse_args()
+    unknown = set(args.databases) - set(DATABASES)
+    if unknown:
+        parser.error(f"Unknown schema(s): {', '.join(sorted(unknown))}")
+
+    all_ok = True
+    for database in args.databases or list(DATABASES):
+        if not args.verify_only:
+            migrate(database, dry_run=args.dry_run)
+        if not args.dry_run:
+            all_ok = verify(database) and all_ok
+    if not all_ok:
+        exit(1)
+    logger.info("All index migrations applied and verified.")
+
+if __name__ == "__main__":
+    main()
@@ -75,6 +75,12 @@ CREATE TABLE IF NOT EXISTS EmploymentDetails (
     TerminationDate DATE,
     EmploymentStatus VARCHAR(50),
     TerminationType VARCHAR(50),
+    INDEX idx_ed_department_status (Department, EmploymentStatus),
+    INDEX idx_ed_status_hire_date (EmploymentStatus, HireDate),
+    INDEX idx_ed_hire_date (HireDate),
+    INDEX idx_ed_termination_date (TerminationDate),
+    INDEX idx_ed_business_unit (BusinessUnit),
+    INDEX idx_ed_status_termination (EmploymentStatus, TerminationDate),
     CONSTRAINT fk_emp FOREIGN KEY (EmployeeID) REFERENCES Employee(EmployeeID) ON DELETE CASCADE,
     CONSTRAINT fk_mgr FOREIGN KEY (ManagerID) REFERENCES Employee(EmployeeID) ON DELETE SET NULL
 ) ENGINE=InnoDB;
@@ -0,0 +1,176 @@
+import os
+import argparse
+import logging
+from collections import defaultdict
+import mysql.connector
+from dotenv import load_dotenv
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("successFactorsShards")
+
+# Load environment variables from .env file
+load_dotenv()
+
+# -----------------------------------------------------------------
+# 1. Configuration (the same variables the SuccessFactors API reads)
+# -----------------------------------------------------------------
+# Splits the SuccessFactorsDB generated by successFactorsDB.py across the
+# shards in SUCCESSFACTORS_SHARDS by BusinessUnit and writes the EmployeeShard
+# directory into the source database, which the API then uses as directory.
+# For local testing, several MySQL instances can run side by side, e.g.
+#
+#   for port in 3307 3308 3309; do
+#     docker run -d -p $port:3306 -e MYSQL_ROOT_PASSWORD=$MYSQL_PASSWORD mysql:8.0
+#   done
+#   export SUCCESSFACTORS_SHARDS="north=127.0.0.1:3307,south=127.0.0.1:3308,central=127.0.0.1:3309"
+#   export SUCCESSFACTORS_SHARD_UNITS="North India=north,South India=south,East India=north,West India=south,Central India=central"
+#   python successFactorsShards.py
+#
+# The shard tables are created from the source's own definitions, without
+# the ManagerID foreign key (a manager may live on another shard). Existing
+# shard data and directory entries are replaced. The employee tables on
+# MYSQL_HOST are left in place but no longer maintained; the Time &
+# Attendance department KPIs, which join them, are refused while sharded.
+MYSQL_HOST = os.getenv("MYSQL_HOST")
+MYSQL_USER = os.getenv("MYSQL_USER")
+MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
+MYSQL_DATABASE = os.getenv("MYSQL_SUCCESSFACTORS_DATABASE")
+MYSQL_AUTH_PLUGIN = os.getenv("MYSQL_AUTH_PLUGIN")
+SUCCESSFACTORS_SHARDS = os.getenv("SUCCESSFACTORS_SHARDS", "")
+SUCCESSFACTORS_SHARD_UNITS = os.getenv("SUCCESSFACTORS_SHARD_UNITS", "")
+SUCCESSFACTORS_DEFAULT_SHARD = os.getenv("SUCCESSFACTORS_DEFAULT_SHARD", "")
+
+# Parents first, so foreign keys are satisfied on insert
+TABLES = ["Employee", "EmploymentDetails", "Compensation", "Performance"]
+BATCH_ROWS = 5000
+
+DIRECTORY_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS EmployeeShard (
+    EmployeeID INT AUTO_INCREMENT PRIMARY KEY,
+    Shard VARCHAR(32) NOT NULL,
+    BusinessUnit VARCHAR(100),
+    CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_employee_shard_shard (Shard)
+) ENGINE=InnoDB;
+"""
+
+def parse_mapping(value: str) -> dict:
+    mapping = {}
+    for item in value.split(","):
+        name, _, target = item.partition("=")
+        if name.strip() and target.strip():
+            mapping[name.strip()] = target.strip()
+    return mapping
+
+def connect(host: str, port: int = 3306, database: str = None):
+    return mysql.connector.connect(host=host, port=port, user=MYSQL_USER, password=MYSQL_PASSWORD,
+                                   database=database, auth_plugin=MYSQL_AUTH_PLUGIN)
+
+# -----------------------------------------------------------------
+# 2. Shard Assignment
+# -----------------------------------------------------------------
+def assign_shards(cur, units: dict, default: str) -> dict:
+    """EmployeeID -> (shard, BusinessUnit) for every employee in the source."""
+    cur.execute("SELECT E.EmployeeID, ED.BusinessUnit FROM Employee E "
+                "LEFT JOIN EmploymentDetails ED ON ED.EmployeeID = E.EmployeeID;")
+    return {employee_id: (units.get(unit, default), unit) for employee_id, unit in cur.fetchall()}
+
+def create_shard_tables(source_cur, shard_cur):
+    shard_cur.execute(f"CREATE DATABASE IF NOT EXISTS {MYSQL_DATABASE};")
+    shard_cur.execute(f"USE {MYSQL_DATABASE};")
+    shard_cur.execute("SET FOREIGN_KEY_CHECKS=0;")
+    for table in reversed(TABLES):
+        shard_cur.execute(f"DROP TABLE IF EXISTS {table};")
+    for table in TABLES:
+        source_cur.execute(f"SHOW CREATE TABLE {table};")
+        ddl = source_cur.fetchone()[1]
+        lines = [line for line in ddl.split("\n") if "FOREIGN KEY (`ManagerID`)" not in line]
+        # Dropping the last constraint leaves a dangling comma before ")"
+        for i in range(1, len(lines)):
+            if lines[i].startswith(")") and lines[i - 1].endswith(","):
+                lines[i - 1] = lines[i - 1][:-1]
+        shard_cur.execute("\n".join(lines))
+    shard_cur.execute("SET FOREIGN_KEY_CHECKS=1;")
+
+def copy_table(source_cur, shard_conn, table: str, employee_ids: list):
+    shard_cur = shard_conn.cursor()
+    copied = 0
+    for start in range(0, len(employee_ids), BATCH_ROWS):
+        ids = employee_ids[start:start + BATCH_ROWS]
+        placeholders = ", ".join(["%s"] * len(ids))
+        source_cur.execute(f"SELECT * FROM {table} WHERE EmployeeID IN ({placeholders});", ids)
+        rows = source_cur.fetchall()
+        if not rows:
+            continue
+        columns = ", ".join(d[0] for d in source_cur.description)
+        values = ", ".join(["%s"] * len(source_cur.description))
+        shard_cur.executemany(f"INSERT INTO {table} ({columns}) VALUES ({values});", rows)
+        copied += len(rows)
+    shard_conn.commit()
+    shard_cur.close()
+    return copied
+
+def write_directory(source_conn, owners: dict):
+    cur = source_conn.cursor()
+    cur.execute(DIRECTORY_TABLE_SQL)
+    cur.execute("DELETE FROM EmployeeShard;")
+    rows = [(employee_id, shard, unit) for employee_id, (shard, unit) in sorted(owners.items())]
+    for start in range(0, len(rows), BATCH_ROWS):
+        cur.executemany("INSERT INTO EmployeeShard (EmployeeID, Shard, BusinessUnit) VALUES (%s, %s, %s);",
+                        rows[start:start + BATCH_ROWS])
+    # New EmployeeIDs continue after the highest existing one
+    cur.execute("SELECT COALESCE(MAX(EmployeeID), 0) + 1 FROM Employee;")
+    next_id = cur.fetchone()[0]
+    cur.execute(f"ALTER TABLE EmployeeShard AUTO_INCREMENT = {next_id};")
+    source_conn.commit()
+    cur.close()
+
+# -----------------------------------------------------------------
+# 3. Main
+# -----------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Split SuccessFactorsDB across shards by BusinessUnit.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report how employees would be placed")
+    args = parser.parse_args()
+
+    shards = {}
+    for name, address in parse_mapping(SUCCESSFACTORS_SHARDS).items():
+        host, _, port = address.partition(":")
+        shards[name] = (host, int(port) if port else 3306)
+    if not shards:
+        parser.error("SUCCESSFACTORS_SHARDS is not set")
+    units = parse_mapping(SUCCESSFACTORS_SHARD_UNITS)
+    default = SUCCESSFACTORS_DEFAULT_SHARD or next(iter(shards))
+    unknown = {s for s in [default, *units.values()] if s not in shards}
+    if unknown:
+        parser.error(f"Unknown shards in SUCCESSFACTORS_SHARD_UNITS/DEFAULT_SHARD: {', '.join(sorted(unknown))}")
+
+    source_conn = connect(MYSQL_HOST, database=MYSQL_DATABASE)
+    source_cur = source_conn.cursor()
+    owners = assign_shards(source_cur, units, default)
+    by_shard = defaultdict(list)
+    for employee_id, (shard, _) in owners.items():
+        by_shard[shard].append(employee_id)
+    for name in shards:
+        logger.info(f"{name}: {len(by_shard[name])} employees")
+    if args.dry_run:
+        return
+
+    for name, (host, port) in shards.items():
+        shard_conn = connect(host, port)
+        shard_cur = shard_conn.cursor()
+        create_shard_tables(source_cur, shard_cur)
+        shard_cur.close()
+        for table in TABLES:
+            copied = copy_table(source_cur, shard_conn, table, sorted(by_shard[name]))
+            logger.info(f"{name} ({host}:{port}): {table} {copied} rows")
+        shard_conn.close()
+
+    write_directory(source_conn, owners)
+    source_cur.close()
+    source_conn.close()
+    logger.info(f"Directory written: {len(owners)} employees over {len(shards)} shards.")
+
+if __name__ == "__main__":
+    main()
@@ -69,7 +69,9 @@ CREATE TABLE IF NOT EXISTS AttendanceRecords (
     EarlyBy TIME,
     Notes TEXT,
     CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    UpdatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    UpdatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_attendance_employee_date (EmployeeID, AttendanceDate),
+    INDEX idx_attendance_date (AttendanceDate)
 ) ENGINE=InnoDB;
 """
 ta_cur.execute(attendance_table_sql)
@@ -86,7 +88,10 @@ CREATE TABLE IF NOT EXISTS LeaveRecords (
     Status VARCHAR(10),
     Reason TEXT,
     ApprovedBy INT,
-    CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_leave_employee_start (EmployeeID, StartDate),
+    INDEX idx_leave_status_type (Status, LeaveType),
+    INDEX idx_leave_start_date (StartDate)
 ) ENGINE=InnoDB;
 """
 ta_cur.execute(leave_table_sql)
@@ -100,7 +105,9 @@ CREATE TABLE IF NOT EXISTS ShiftSchedules (
     ScheduledIn TIME,
     ScheduledOut TIME,
     ShiftType VARCHAR(20),
-    CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_shift_employee_date (EmployeeID, ShiftDate),
+    INDEX idx_shift_date (ShiftDate)
 ) ENGINE=InnoDB;
 """
 ta_cur.execute(shift_table_sql)
@@ -113,7 +120,10 @@ CREATE TABLE IF NOT EXISTS OvertimeRecords (
     OvertimeDate DATE,
     OvertimeHours DECIMAL(5,2),
     ApprovedBy INT,
-    CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_overtime_employee_date (EmployeeID, OvertimeDate),
+    INDEX idx_overtime_date (OvertimeDate),
+    INDEX idx_overtime_approved_by (ApprovedBy)
 ) ENGINE=InnoDB;
 """
 ta_cur.execute(overtime_table_sql)
@@ -1,6 +1,7 @@
 import os
 import requests
 import pymongo
+from mongoIndexes import ensure_atlas_indexes
 from datetime import datetime, date, timedelta
 from collections import defaultdict
 from dotenv import load_dotenv
@@ -14,6 +15,8 @@ load_dotenv()
 SUCCESSFACTORS_URL = os.getenv("SUCCESSFACTORS_URL")
 # Exit Management API base URL
 EXITMANAGEMENT_URL = os.getenv("EXITMANAGEMENT_URL")
+# Optional base URL of a shared /token issuer whose tokens every API accepts
+AUTH_URL = os.getenv("AUTH_URL")
 
 # Credentials for obtaining JWT token (assumed same for both APIs)
 API_USERNAME = os.getenv("ADMIN_USERNAME")
@@ -24,6 +27,9 @@ MONGO_URI = os.getenv("MONGO_ATLAS_URI")
 MONGO_DB = os.getenv("MONGO_ATLAS_DB")
 ATTRITION_COLLECTION = "Attrition"
 
+# /as_of dates per POST /batch, the APIs' default BATCH_MAX_REQUESTS
+AS_OF_BATCH_SIZE = 100
+
 # Predefined voluntary exit reasons
 resignation_reasons = [
     "Personal reasons",
@@ -52,21 +58,35 @@ def get_employees(token):
     response.raise_for_status()
     return response.json()
 
-def get_employment_details(token, employee_id):
-    """Fetch employment details for a given employee from SuccessFactors API."""
-    url = f"{SUCCESSFACTORS_URL}/employment_details/{employee_id}"
+def get_all_employment_details(token):
+    """Fetch employment details for every employee in one call, keyed by EmployeeID."""
+    url = f"{SUCCESSFACTORS_URL}/employment_details"
     headers = {"Authorization": f"Bearer {token}"}
     response = requests.get(url, headers=headers)
-    if response.status_code == 404:
-        return None
     response.raise_for_status()
-    return response.json()
+    return {details["EmployeeID"]: details for details in response.json()}
+
+def get_headcounts(token, days):
+    """Headcount on each of the days, from the SuccessFactors API's employment history (/as_of)."""
+    url = f"{SUCCESSFACTORS_URL}/batch"
+    headers = {"Authorization": f"Bearer {token}"}
+    headcounts = {}
+    for i in range(0, len(days), AS_OF_BATCH_SIZE):
+        batch = [{"id": d.isoformat(), "path": f"/as_of?date={d.isoformat()}"} for d in days[i:i + AS_OF_BATCH_SIZE]]
+        response = requests.post(url, headers=headers, json={"requests": batch})
+        response.raise_for_status()
+        for sub in response.json()["responses"]:
+            if sub["status"] != 200:
+                raise Exception(f"/as_of for {sub['id']} failed with status {sub['status']}: {sub['body']}")
+            headcounts[date.fromisoformat(sub["id"])] = sub["body"]["headcount"]
+    return headcounts
 
-def get_resignation_requests(token):
-    """Fetch all resignation requests from Exit Management API."""
+def get_resignation_requests(token, reasons=None):
+    """Fetch resignation requests from Exit Management API, optionally only for the given reasons."""
     url = f"{EXITMANAGEMENT_URL}/resignation_requests"
     headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(url, headers=headers)
+    params = {"reason": reasons} if reasons else None
+    response = requests.get(url, headers=headers, params=params)
     response.raise_for_status()
     return response.json()
 
@@ -100,6 +120,17 @@ def get_period_start(frequency, period):
     else:
         return None
 
+def get_month_starts(first, last):
+    """The first day of every month between first and last, inclusive."""
+    year, month = first.year, first.month
+    if first.day > 1:
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    days = []
+    while date(year, month, 1) <= last:
+        days.append(date(year, month, 1))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return days
+
 def init_attrition_agg():
     return {
         "new_hires": 0,
@@ -133,8 +164,11 @@ def main():
     print("Obtained JWT tokens for SuccessFactors and Exit Management APIs.")
     
     # 1. Get JWT tokens for both APIs
-    token_sf = get_jwt_token(SUCCESSFACTORS_URL)
-    token_exit = get_jwt_token(EXITMANAGEMENT_URL)
+    if AUTH_URL:
+        token_sf = token_exit = get_jwt_token(AUTH_URL)
+    else:
+        token_sf = get_jwt_token(SUCCESSFACTORS_URL)
+        token_exit = get_jwt_token(EXITMANAGEMENT_URL)
     
     # Clear the Attrition collection
     result = attrition_coll.delete_many({})
@@ -142,10 +176,11 @@ def main():
 
     # 2. Fetch employees from SuccessFactors API and build a dictionary of employment details.
     employees = get_employees(token_sf)
+    all_details = get_all_employment_details(token_sf)
     emp_data = {}  # key: EmployeeID, value: dict with HireDate, TerminationDate, Department
     for emp in employees:
         emp_id = emp.get("EmployeeID")
-        details = get_employment_details(token_sf, emp_id)
+        details = all_details.get(emp_id)
         if not details or not details.get("HireDate"):
             continue
         try:
@@ -167,7 +202,7 @@ def main():
     print(f"Processed employment details for {len(emp_data)} employees.")
 
     # 3. Fetch voluntary exit requests from Exit Management API.
-    resignation_requests = get_resignation_requests(token_exit)
+    resignation_requests = get_resignation_requests(token_exit, resignation_reasons)
     # Filter only voluntary exits (Reason in resignation_reasons and EffectiveDate exists)
     voluntary_requests = []
     for req in resignation_requests:
@@ -187,7 +222,7 @@ def main():
     today = date.today()
 
     # 5. Aggregate employee data from SuccessFactors.
-    # For each employee, determine new hires and active employees by period.
+    # For each employee, count new hires by period.
     for emp_id, data in emp_data.items():
         hire_date = data["HireDate"]
         termination_date = data["TerminationDate"]
@@ -198,40 +233,33 @@ def main():
         agg_data["month"][month_key]["new_hires"] += 1
         agg_data["quarter"][quarter_key]["new_hires"] += 1
         agg_data["year"][year_key]["new_hires"] += 1
-        # Active employees: For each period from hire year to current,
-        # if the employee was active at the start of that period (i.e. termination_date is None or >= period start).
-        start_year = hire_date.year
-        current_year = today.year
-        for year in range(start_year, current_year + 1):
-            # Monthly aggregation for this year
-            for m in range(1, 13):
-                period_date = date(year, m, 1)
-                if period_date < hire_date or period_date > today:
-                    continue
-                if termination_date is None or termination_date >= period_date:
-                    period_key = f"{year}-{m:02d}"
-                    agg_data["month"][period_key]["active_employees"] += 1
-            # Quarterly aggregation
-            for q in range(1, 5):
-                month_start = (q - 1) * 3 + 1
-                period_date = date(year, month_start, 1)
-                if period_date < hire_date or period_date > today:
-                    continue
-                if termination_date is None or termination_date >= period_date:
-                    period_key = f"{year}-Q{q}"
-                    agg_data["quarter"][period_key]["active_employees"] += 1
-            # Yearly aggregation
-            period_date = date(year, 1, 1)
-            if period_date >= hire_date and period_date <= today:
-                if termination_date is None or termination_date >= period_date:
-                    period_key = str(year)
-                    agg_data["year"][period_key]["active_employees"] += 1
         # Last 5 months: if hire_date is within last 150 days and employee active in that window.
         if (today - hire_date).days <= 150:
             if termination_date is None or termination_date >= (today - timedelta(days=150)):
                 agg_data["last_5_months"]["last_5_months"]["active_employees"] += 1
                 agg_data["last_5_months"]["last_5_months"]["new_hires"] += 1
 
+    # Active employees at the start of each month, quarter and year since the
+    # first hire, from the effective-dated history kept by the SuccessFactors API.
+    # /as_of no longer counts someone on their TerminationDate; they are added
+    # back, so an employee still counts as active on the day they leave.
+    if emp_data:
+        period_dates = get_month_starts(min(data["HireDate"] for data in emp_data.values()), today)
+        headcounts = get_headcounts(token_sf, period_dates)
+        leaving = defaultdict(int)
+        for data in emp_data.values():
+            if data["TerminationDate"] and data["HireDate"] <= data["TerminationDate"]:
+                leaving[data["TerminationDate"]] += 1
+        for period_date in period_dates:
+            active = headcounts[period_date] + leaving[period_date]
+            if not active:
+                continue
+            agg_data["month"][get_month_key(period_date)]["active_employees"] = active
+            if period_date.month % 3 == 1:
+                agg_data["quarter"][get_quarter_key(period_date)]["active_employees"] = active
+            if period_date.month == 1:
+                agg_data["year"][get_year_key(period_date)]["active_employees"] = active
+
     # 6. Aggregate voluntary exit requests (from Exit Management API).
     # For each voluntary exit, use its EffectiveDate to determine the period.
     for req in voluntary_requests:
@@ -285,8 +313,10 @@ def main():
     db = client[MONGO_DB]
     attrition_coll = db["Attrition"]
 
-    # Wipe previous attrition documents
+    # Wipe previous attrition documents; the unique index can only be built
+    # once any duplicates left by older runs are gone
     attrition_coll.delete_many({})
+    ensure_atlas_indexes(db, [ATTRITION_COLLECTION])
     if attrition_docs:
         attrition_coll.insert_many(attrition_docs)
         print(f"Inserted {len(attrition_docs)} Attrition documents into collection 'Attrition'.")
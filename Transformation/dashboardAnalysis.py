@@ -23,6 +23,10 @@ API_PASSWORD = os.getenv("ADMIN_PASSWORD")
 if not SUCCESSFACTORS_URL or not MONGO_URI or not MONGO_DB:
    raise Exception("Missing required environment variables.")
 
+# The dashboard reports on April 2021 and the four months before it
+REPORT_DATE = date(2021, 4, 30)
+REPORT_MONTHS = 5
+
 # ---------------------------
 # Helper functions for date boundaries
 # ---------------------------
@@ -67,21 +71,63 @@ def get_jwt_token():
    response.raise_for_status()
    return response.json()["access_token"]
 
-def fetch_employee_data():
-   """Fetch all employees from SuccessFactors API."""
-   token = get_jwt_token()
-   url = f"{SUCCESSFACTORS_URL}/employees"
-   headers = {"Authorization": f"Bearer {token}"}
-   response = requests.get(url, headers=headers)
+def get_report_window():
+   """First and last day of the months the dashboard covers."""
+   year, month = REPORT_DATE.year, REPORT_DATE.month
+   for _ in range(REPORT_MONTHS - 1):
+       year, month = get_previous_month(year, month)
+   return date(year, month, 1), get_month_boundaries(REPORT_DATE.year, REPORT_DATE.month)[1]
+
+def fetch_employee_data(headers):
+   """Fetch the employees relevant to the report window, with their employment details.
+
+   Only employees hired by the end of the window are fetched: those still
+   active, and those terminated within or after the window. The filters run
+   in the SuccessFactors API's SQL instead of here.
+   """
+   window_start, window_end = get_report_window()
+   employees = []
+   for params in ({"status": "Active", "hire_date_to": window_end.isoformat()},
+                  {"status": "Terminated", "hire_date_to": window_end.isoformat(),
+                   "termination_date_from": window_start.isoformat()}):
+       response = requests.get(f"{SUCCESSFACTORS_URL}/employees", headers=headers, params=params)
+       response.raise_for_status()
+       people = {e["EmployeeID"]: e for e in response.json()}
+       response = requests.get(f"{SUCCESSFACTORS_URL}/employment_details", headers=headers, params=params)
+       response.raise_for_status()
+       for details in response.json():
+           employees.append({**people.get(details["EmployeeID"], {}), **details})
+   return employees
+
+def get_month_ends():
+   """Last day of each month of the report window, newest first."""
+   year, month = REPORT_DATE.year, REPORT_DATE.month
+   month_ends = []
+   for _ in range(REPORT_MONTHS + 1):  # and the month before, for MoM growth
+       month_ends.append(get_month_boundaries(year, month)[1])
+       year, month = get_previous_month(year, month)
+   return month_ends
+
+def fetch_headcounts(headers):
+   """Headcount at each month end, from the SuccessFactors API's effective-dated history (/as_of).
+
+   All month ends go in one POST /batch.
+   """
+   batch = [{"id": d.isoformat(), "path": f"/as_of?date={d.isoformat()}"} for d in get_month_ends()]
+   response = requests.post(f"{SUCCESSFACTORS_URL}/batch", headers=headers, json={"requests": batch})
    response.raise_for_status()
-   return response.json()
+   headcounts = {}
+   for sub in response.json()["responses"]:
+       if sub["status"] != 200:
+           raise Exception(f"/as_of for {sub['id']} failed with status {sub['status']}: {sub['body']}")
+       headcounts[date.fromisoformat(sub["id"])] = sub["body"]["headcount"]
+   return headcounts
 
 # ---------------------------
 # Compute Dashboard Metrics
 # ---------------------------
-def compute_dashboard_metrics(employees):
-   # Set current date to April 2021
-   today = date(2021, 4, 30)
+def compute_dashboard_metrics(employees, headcounts):
+   today = REPORT_DATE
    
    # Debug: Print first few employees to check structure
    print(f"Sample employee data (first item): {employees[0] if employees else 'No employees'}")
@@ -108,7 +154,8 @@ def compute_dashboard_metrics(employees):
    def get_termination_date(e):
        return e.get("TerminationDate") or e.get("terminationDate")
 
-   # Updated active employees logic with more robust checks
+   # Active employees themselves, for the gender ratio and tenure; headcounts
+   # come from the API's employment history
    active_employees = []
    for e in employees:
        hire_date_str = get_hire_date(e)
@@ -121,7 +168,7 @@ def compute_dashboard_metrics(employees):
            active_employees.append(e)
    
    print(f"Active employees found: {len(active_employees)}")
-   total_active = len(active_employees)
+   total_active = headcounts[current_end]
    
    # New hires in current month and departures in current month
    new_hires = []
@@ -148,18 +195,8 @@ def compute_dashboard_metrics(employees):
    prev_year, prev_month = get_previous_month(current_year, current_month)
    prev_start, prev_end = get_month_boundaries(prev_year, prev_month)
    
-   active_prev = []
-   for e in employees:
-       hire_date_str = get_hire_date(e)
-       term_date_str = get_termination_date(e)
-       
-       hire_date = parse_iso_date(hire_date_str)
-       term_date = parse_iso_date(term_date_str)
-       
-       if hire_date and hire_date <= prev_end and (not term_date or term_date > prev_end):
-           active_prev.append(e)
-   
-   print(f"Previous month active employees: {len(active_prev)}")
+   total_active_prev = headcounts[prev_end]
+   print(f"Previous month active employees: {total_active_prev}")
    
    new_hires_prev = []
    for e in employees:
@@ -177,8 +214,6 @@ def compute_dashboard_metrics(employees):
        if term_date and prev_start <= term_date <= prev_end:
            departures_prev.append(e)
    
-   total_active_prev = len(active_prev)
-   
    mom_growth = ((total_active - total_active_prev) / total_active_prev * 100) if total_active_prev > 0 else None
    current_attrition_rate = (len(departures) / total_active_prev * 100) if total_active_prev > 0 else None
    prev_attrition_rate = (len(departures_prev) / total_active_prev * 100) if total_active_prev > 0 else None
@@ -221,7 +256,7 @@ def compute_dashboard_metrics(employees):
 
    # Metrics for the past 5 months
    metrics_past_5_months = []
-   for i in range(5):
+   for i in range(REPORT_MONTHS):
        year, month = current_year, current_month - i
        while month <= 0:
            month += 12
@@ -230,7 +265,6 @@ def compute_dashboard_metrics(employees):
        
        new_hires_month = 0
        departures_month = 0
-       active_month = 0
        
        for e in employees:
            hire_date_str = get_hire_date(e)
@@ -244,15 +278,12 @@ def compute_dashboard_metrics(employees):
                
            if term_date and m_start <= term_date <= m_end:
                departures_month += 1
-               
-           if hire_date and hire_date <= m_end and (not term_date or term_date > m_end):
-               active_month += 1
        
        metrics_past_5_months.append({
            "month": f"{year}-{str(month).zfill(2)}",
            "newHires": new_hires_month,
            "departures": departures_month,
-           "totalActiveEmployees": active_month,
+           "totalActiveEmployees": headcounts[m_end],
        })
 
    # Recent activity for current month
@@ -291,13 +322,16 @@ def compute_dashboard_metrics(employees):
 # ---------------------------
 def main():
    try:
-       employees = fetch_employee_data()
+       token = get_jwt_token()
+       headers = {"Authorization": f"Bearer {token}"}
+       employees = fetch_employee_data(headers)
        print(f"Fetched {len(employees)} employees from SuccessFactors API.")
+       headcounts = fetch_headcounts(headers)
    except Exception as e:
        print(f"Error fetching employees: {e}")
        return
 
-   dashboardData = compute_dashboard_metrics(employees)
+   dashboardData = compute_dashboard_metrics(employees, headcounts)
 
    try:
        client = MongoClient(MONGO_URI)
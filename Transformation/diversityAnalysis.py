@@ -1,6 +1,7 @@
 import os
 import requests
 import pymongo
+from mongoIndexes import ensure_atlas_indexes
 from datetime import datetime, date, timedelta
 from collections import defaultdict
 from dotenv import load_dotenv
@@ -328,7 +329,9 @@ def main():
         diversity_docs.append(make_doc("year", period, agg))
     diversity_docs.append(make_doc("last_5_months", "last_5_months", last_5_months))
 
-    # Insert Diversity Documents into MongoDB Atlas
+    # Insert Diversity Documents into MongoDB Atlas (the collection was
+    # cleared above, so the unique index builds even over an old collection)
+    ensure_atlas_indexes(db, [DIVERSITY_COLLECTION])
     if diversity_docs:
         diversity_coll.insert_many(diversity_docs)
         print(f"Inserted {len(diversity_docs)} Diversity documents into collection '{DIVERSITY_COLLECTION}'.")
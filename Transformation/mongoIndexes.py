@@ -0,0 +1,29 @@
+import pymongo
+
+# -----------------------------------------------------------------
+# Index Provisioning for the Atlas Analytics Collections
+# -----------------------------------------------------------------
+# Employees is upserted by EmployeeID; Attrition and Diversity are read by
+# the dashboard with {frequency, period} (a single period or a $in list), and
+# each job writes exactly one document per frequency/period pair.
+#
+# The Employees index is partial because the dashboard's "Add Employee" form
+# inserts documents without an EmployeeID.
+ATLAS_INDEXES = {
+    "Employees": [
+        ([("EmployeeID", pymongo.ASCENDING)],
+         {"unique": True, "partialFilterExpression": {"EmployeeID": {"$exists": True}}}),
+    ],
+    "Attrition": [
+        ([("frequency", pymongo.ASCENDING), ("period", pymongo.ASCENDING)], {"unique": True}),
+    ],
+    "Diversity": [
+        ([("frequency", pymongo.ASCENDING), ("period", pymongo.ASCENDING)], {"unique": True}),
+    ],
+}
+
+def ensure_atlas_indexes(db, collections=None):
+    """Create the indexes for the given collections (default: all); existing ones are left as is."""
+    for name in collections or ATLAS_INDEXES:
+        for keys, options in ATLAS_INDEXES[name]:
+            db[name].create_index(keys, **options)
@@ -1,6 +1,7 @@
 import os
 import requests
 import pymongo
+from mongoIndexes import ensure_atlas_indexes
 from datetime import datetime, date
 from dotenv import load_dotenv
 
@@ -150,6 +151,9 @@ def main():
     # We can insert them all at once, or upsert by EmployeeID if you want updates.
     # For simplicity, let's just do a bulk insert (or replace).
     # If you want to avoid duplicates, you could do upsert logic with e.g. update_one(..., upsert=True).
+    # The unique EmployeeID index is created only now that the collection is
+    # cleared, since building it over leftover duplicates would fail.
+    ensure_atlas_indexes(db, [EMPLOYEES_COLLECTION])
     for doc in docs_to_insert:
         employees_coll.update_one(
             {"EmployeeID": doc["EmployeeID"]},  # filter